@@ -86,6 +86,8 @@ from ensemble import (
     OptionalEnsemble, join_ensembles
 )
 
+from compiled_ensemble import CompiledEnsemble
+
 from high_level.interface_set import (
     InterfaceSet, VolumeInterfaceSet, PeriodicVolumeInterfaceSet
 )
@@ -128,7 +130,8 @@ from pathmover import (
 
 from pathsimulator import (
     PathSimulator, FullBootstrapping, Bootstrapping, PathSampling, MCStep,
-    CommittorSimulation, DirectSimulation, ShootFromSnapshotsSimulation
+    CommittorSimulation, DirectSimulation, ShootFromSnapshotsSimulation,
+    ShotExecutor, ThreadShotExecutor, ProcessShotExecutor
 )
 
 from sample import Sample, SampleSet
@@ -97,25 +97,29 @@ class ReplicaNetwork(object):
         n_trials = 0
         self.analysis['n_trials'] = {}
         self.analysis['n_accepted'] = {}
-        prev = None
-        for step in steps:
-            pmc = step.change
-
-            if pmc.canonical.mover is not None and pmc.canonical.mover.is_ensemble_change_mover:
-                n_trials += 1
-                hops = []
-                for old in prev.active:
-                    new = step.active
-                    if old.replica != new[old.ensemble].replica:
-                        # i.e., the prev and step have diff rep in same ens
-                        hops.append((old.ensemble, new[old.replica].ensemble))
-                for hop in hops:
-                    try:
-                        self.analysis['n_accepted'][hop] += 1
-                    except KeyError:
-                        self.analysis['n_accepted'][hop] = 1
-
-            prev = step
+        table = paths.storage.StepStatistics.from_steps(steps)
+        if table is not None:
+            n_trials = self._analyze_exchanges_from_table(table)
+        else:
+            prev = None
+            for step in steps:
+                pmc = step.change
+
+                if pmc.canonical.mover is not None and pmc.canonical.mover.is_ensemble_change_mover:
+                    n_trials += 1
+                    hops = []
+                    for old in prev.active:
+                        new = step.active
+                        if old.replica != new[old.ensemble].replica:
+                            # i.e., the prev and step have diff rep in same ens
+                            hops.append((old.ensemble, new[old.replica].ensemble))
+                    for hop in hops:
+                        try:
+                            self.analysis['n_accepted'][hop] += 1
+                        except KeyError:
+                            self.analysis['n_accepted'][hop] = 1
+
+                prev = step
 
         # TODO: n_trials no longer needs to be a dict, but other functions
         # expect that in output, so we return it
@@ -123,6 +127,38 @@ class ReplicaNetwork(object):
             self.analysis['n_trials'][key] = n_trials
         return (self.analysis['n_trials'], self.analysis['n_accepted'])
 
+    def _analyze_exchanges_from_table(self, table):
+        """
+        Count the accepted exchanges using the statistics table of steps
+
+        Returns the number of trials and fills `self.analysis['n_accepted']`
+        like `analyze_exchanges`, but does not load the steps.
+        """
+        n_trials = 0
+        prev = None
+        for pos in range(len(table)):
+            node = table.canonical(pos)
+            mover = None
+            if node is not None:
+                mover = table.mover(table.movers[pos][node])
+
+            if mover is not None and mover.is_ensemble_change_mover:
+                n_trials += 1
+                new = table.replica_ensembles(pos)
+                new_replica = {ens: rep for rep, ens in new.items()}
+                for replica, ensemble in prev.items():
+                    if replica != new_replica[ensemble]:
+                        hop = (table.ensemble(ensemble),
+                               table.ensemble(new[replica]))
+                        try:
+                            self.analysis['n_accepted'][hop] += 1
+                        except KeyError:
+                            self.analysis['n_accepted'][hop] = 1
+
+            prev = table.replica_ensembles(pos)
+
+        return n_trials
+
 
     def analyze_traces(self, steps, force=False):
         """
@@ -442,7 +442,7 @@ class StoredDict(ChainDict):
         return self.value_store.get(item)
 
     def _get_list(self, items):
-        return map(self._get, items)
+        return self.value_store.get_list(items)
 
     def sync(self):
         pass
@@ -1,9 +1,9 @@
 import chaindict as cd
 from openpathsampling.netcdfplus import StorableNamedObject, WeakKeyCache, \
-    ObjectJSON, create_to_dict, ObjectStore
+    ObjectJSON, create_to_dict, ObjectStore, SizeAwareCache
 
 import openpathsampling.engines as peng
-from openpathsampling.engines.openmm.tools import trajectory_to_mdtraj
+from openpathsampling.engines.openmm.tools import cached_trajectory_to_mdtraj
 
 
 # ==============================================================================
@@ -99,6 +99,67 @@ class CollectiveVariable(cd.Wrap, StorableNamedObject):
         self.diskcache_enabled = False
         return self
 
+    @property
+    def cache(self):
+        """
+        :class:`openpathsampling.netcdfplus.cache.Cache` : the in-memory cache
+            holding computed values
+        """
+        return self._cache_dict.cache
+
+    def set_cache(self, cache):
+        """
+        Replace the in-memory cache of computed values
+
+        Already cached values are transferred to the new cache.
+
+        Parameters
+        ----------
+        cache : :class:`openpathsampling.netcdfplus.cache.Cache`
+            the new cache. Keys are snapshots, values are the CV values
+
+        """
+        self._cache_dict.cache = cache.transfer(self._cache_dict.cache)
+        return self
+
+    def with_cache_limit(self, max_bytes, policy='lru', spill=False):
+        """
+        Use a memory bounded cache for computed values
+
+        Parameters
+        ----------
+        max_bytes : int
+            the maximal number of bytes used by cached values
+        policy : str
+            the eviction policy, `lru` (default) or `lfu`
+        spill : bool
+            if `True` evicted values are written to the attached disk
+            cache (if any) before they are dropped from memory
+
+        Returns
+        -------
+        :class:`openpathsampling.CollectiveVariable`
+            the CV itself
+
+        See Also
+        --------
+        :class:`openpathsampling.netcdfplus.cache.SizeAwareCache`
+
+        """
+        return self.set_cache(SizeAwareCache(
+            max_bytes=max_bytes,
+            policy=policy,
+            spill=self._spill if spill else None
+        ))
+
+    def _spill(self, snapshot, value):
+        # only stores in incomplete mode accept single values for arbitrary
+        # snapshots. Complete stores are filled by `complete_cv`
+        if self._store_dict is not None:
+            value_store = self._store_dict.value_store
+            if value_store.allow_incomplete:
+                value_store[snapshot] = value
+
     def set_cache_store(self, value_store):
         """
         Attach store variables to the collective variables.
@@ -640,6 +701,12 @@ class MDTrajFunctionCV(CoordinateFunctionCV):
     :class:`openpathsampling.Trajectory` one using
     `f(traj.to_mdtraj(), **kwargs)`
 
+    Inside a `with` block of
+    :obj:`openpathsampling.engines.openmm.mdtraj_conversion_cache` all
+    mdtraj based CVs evaluated on the same snapshots share one conversion.
+    Its arrays are read-only there, so `f` must not modify the trajectory
+    in place.
+
     Examples
     --------
     >>> # To create an order parameter which calculates the dihedral formed
@@ -694,7 +761,8 @@ class MDTrajFunctionCV(CoordinateFunctionCV):
     def _eval(self, items):
         trajectory = peng.Trajectory(items)
 
-        t = trajectory_to_mdtraj(trajectory, self.topology.mdtraj)
+        t = cached_trajectory_to_mdtraj(
+            trajectory, self.topology.mdtraj)
         return self.cv_callable(t, **self.kwargs)
 
     @property
@@ -786,7 +854,8 @@ class MSMBFeaturizerCV(CoordinateGeneratorCV):
         trajectory = peng.Trajectory(items)
 
         # create an mdtraj trajectory out of it
-        ptraj = trajectory_to_mdtraj(trajectory, self.topology.mdtraj)
+        ptraj = cached_trajectory_to_mdtraj(
+            trajectory, self.topology.mdtraj)
 
         # run the featurizer
         return self._instance.partial_transform(ptraj)
@@ -870,7 +939,8 @@ class PyEMMAFeaturizerCV(MSMBFeaturizerCV):
     def _eval(self, items):
         trajectory = peng.Trajectory(items)
 
-        t = trajectory_to_mdtraj(trajectory, self.topology.mdtraj)
+        t = cached_trajectory_to_mdtraj(
+            trajectory, self.topology.mdtraj)
         return self._instance.transform(t)
 
     def to_dict(self):
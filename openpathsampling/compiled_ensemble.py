@@ -0,0 +1,527 @@
+"""
+Evaluation of ensembles from precomputed per-frame volume masks.
+
+Checking many (sub-)trajectories of a long trajectory against an ensemble
+calls the same volumes for the same frames over and over. A
+:class:`CompiledEnsemble` evaluates each volume used in the ensemble once
+per frame into a boolean matrix (volumes x frames) and answers the
+ensemble functions for any window of frames from prefix sums of that
+matrix.
+"""
+
+import itertools
+import logging
+
+import numpy as np
+
+from ensemble import (
+    AllInXEnsemble, AllOutXEnsemble, AppendedNameEnsemble, EmptyEnsemble,
+    EnsembleCombination, EntersXEnsemble, ExitsXEnsemble, FullEnsemble,
+    LengthEnsemble, NegatedEnsemble, OptionalEnsemble, PartInXEnsemble,
+    PartOutXEnsemble, SequentialEnsemble, SingleFrameEnsemble,
+    iter_valid_windows
+)
+
+logger = logging.getLogger(__name__)
+
+
+class FrameMasks(object):
+    """
+    Per-frame volume results for one trajectory
+
+    Attributes
+    ----------
+    trajectory : :class:`openpathsampling.Trajectory`
+        the trajectory the masks were computed for
+    masks : numpy.ndarray, shape=(n_volumes, n_frames), dtype=bool
+        `masks[i, j]` is True if frame `j` is in volume `i`
+    """
+
+    def __init__(self, trajectory, volumes):
+        self.trajectory = trajectory
+        n_frames = len(trajectory)
+        self.masks = np.zeros((len(volumes), n_frames), dtype=bool)
+        for idx, volume in enumerate(volumes):
+            self.masks[idx] = volume.evaluate(trajectory)
+
+        # prefix sums as lists: single lookups are much faster than
+        # indexing numpy arrays
+        self._n_in = [self._prefix_sum(mask) for mask in self.masks]
+        self._n_exits = {}
+        self._n_enters = {}
+
+    @staticmethod
+    def _prefix_sum(mask):
+        return np.concatenate([[0], np.cumsum(mask)]).tolist()
+
+    def n_in(self, volume_idx, start, end):
+        """Number of frames in `[start:end]` inside the volume"""
+        n_in = self._n_in[volume_idx]
+        return n_in[end] - n_in[start]
+
+    def n_exits(self, volume_idx, start, end):
+        """Number of pairs of frames in `[start:end]` leaving the volume"""
+        try:
+            n_exits = self._n_exits[volume_idx]
+        except KeyError:
+            mask = self.masks[volume_idx]
+            n_exits = self._prefix_sum(mask[:-1] & ~mask[1:])
+            self._n_exits[volume_idx] = n_exits
+        if end - start < 2:
+            return 0
+        return n_exits[end - 1] - n_exits[start]
+
+    def n_enters(self, volume_idx, start, end):
+        """Number of pairs of frames in `[start:end]` entering the volume"""
+        try:
+            n_enters = self._n_enters[volume_idx]
+        except KeyError:
+            mask = self.masks[volume_idx]
+            n_enters = self._prefix_sum(~mask[:-1] & mask[1:])
+            self._n_enters[volume_idx] = n_enters
+        if end - start < 2:
+            return 0
+        return n_enters[end - 1] - n_enters[start]
+
+
+class CompiledEnsemble(object):
+    """
+    Ensemble functions evaluated from precomputed volume masks
+
+    All volumes used by :class:`.VolumeEnsemble` parts of the ensemble are
+    evaluated once per frame of the given trajectory. Calls, `can_append`
+    and `can_prepend` of volume, length, combined and wrapped ensembles are
+    then O(1) per window of frames; sequential ensembles use the same
+    assignment of frames to subensembles as
+    :class:`.SequentialEnsemble`. Parts of the ensemble which cannot be
+    compiled (e.g. :class:`.PrefixTrajectoryEnsemble`) are evaluated by
+    calling them on the sub-trajectory.
+
+    The results follow the definitions of the ensemble functions without
+    the use of caches, i.e. `ensemble(trajectory, trusted=False)`.
+
+    Parameters
+    ----------
+    ensemble : :class:`.Ensemble`
+        the ensemble to compile
+
+    Attributes
+    ----------
+    volumes : list of :class:`.Volume`
+        the volumes evaluated for each frame, in the order of the rows of
+        :attr:`FrameMasks.masks`
+
+    Examples
+    --------
+    >>> compiled = ensemble.compiled()
+    >>> for traj in storage.trajectories:
+    >>>     subtrajs = compiled.split(traj)
+    """
+
+    def __init__(self, ensemble):
+        self.ensemble = ensemble
+        self.volumes = []
+        self._root = self._compile(ensemble)
+
+    def _volume_index(self, volume):
+        for idx, vol in enumerate(self.volumes):
+            if vol is volume:
+                return idx
+        self.volumes.append(volume)
+        return len(self.volumes) - 1
+
+    def _compile(self, ensemble):
+        if isinstance(ensemble, AllInXEnsemble):
+            return _AllInXNode(
+                self._volume_index(ensemble.volume),
+                isinstance(ensemble, AllOutXEnsemble)
+            )
+        elif isinstance(ensemble, PartInXEnsemble):
+            return _PartInXNode(
+                self._volume_index(ensemble.volume),
+                isinstance(ensemble, PartOutXEnsemble)
+            )
+        elif isinstance(ensemble, ExitsXEnsemble):
+            return _ExitsXNode(
+                self._volume_index(ensemble.volume),
+                isinstance(ensemble, EntersXEnsemble)
+            )
+        elif isinstance(ensemble, LengthEnsemble):
+            return _LengthNode(ensemble.length)
+        elif isinstance(ensemble, EnsembleCombination):
+            return _CombinationNode(ensemble.fnc,
+                                    self._compile(ensemble.ensemble1),
+                                    self._compile(ensemble.ensemble2))
+        elif isinstance(ensemble, NegatedEnsemble):
+            return _NegatedNode(self._compile(ensemble.ensemble))
+        elif isinstance(ensemble, SequentialEnsemble):
+            return _SequentialNode(
+                [self._compile(ens) for ens in ensemble.ensembles]
+            )
+        elif type(ensemble) in [AppendedNameEnsemble,
+                                OptionalEnsemble,
+                                SingleFrameEnsemble]:
+            # these do not alter the trajectory
+            return self._compile(ensemble._new_ensemble)
+        elif type(ensemble) is FullEnsemble:
+            return _ConstantNode(True)
+        elif type(ensemble) is EmptyEnsemble:
+            return _ConstantNode(False)
+        else:
+            logger.debug("Cannot compile " + ensemble.__class__.__name__ +
+                         ": calling it on sub-trajectories")
+            return _SubtrajectoryNode(ensemble)
+
+    def masks(self, trajectory):
+        """
+        Evaluate all volumes of the ensemble for each frame
+
+        Parameters
+        ----------
+        trajectory : :class:`openpathsampling.Trajectory`
+            the trajectory to evaluate
+
+        Returns
+        -------
+        :class:`FrameMasks`
+            the masks for the trajectory; these can be passed to the other
+            functions instead of the trajectory to reuse them
+        """
+        if isinstance(trajectory, FrameMasks):
+            return trajectory
+        return FrameMasks(trajectory, self.volumes)
+
+    def __call__(self, trajectory):
+        frames = self.masks(trajectory)
+        return self._root.call(frames, 0, len(frames.trajectory))
+
+    def can_append(self, trajectory):
+        frames = self.masks(trajectory)
+        return self._root.can_append(frames, 0, len(frames.trajectory))
+
+    def can_prepend(self, trajectory):
+        frames = self.masks(trajectory)
+        return self._root.can_prepend(frames, 0, len(frames.trajectory))
+
+    def strict_can_append(self, trajectory):
+        frames = self.masks(trajectory)
+        return self._root.can_append(frames, 0, len(frames.trajectory),
+                                     strict=True)
+
+    def strict_can_prepend(self, trajectory):
+        frames = self.masks(trajectory)
+        return self._root.can_prepend(frames, 0, len(frames.trajectory),
+                                      strict=True)
+
+    def iter_valid_slices(self, trajectory, max_length=None, min_length=1,
+                          overlap=1, reverse=False):
+        """
+        Return an iterator over slices of subtrajectories in the ensemble
+
+        Same as :meth:`.Ensemble.iter_valid_slices`.
+        """
+        frames = self.masks(trajectory)
+        root = self._root
+        return iter_valid_windows(
+            length=len(frames.trajectory),
+            strict_can_append=lambda start, end, trusted:
+                root.can_append(frames, start, end, strict=True),
+            can_prepend=lambda start, end, trusted:
+                root.can_prepend(frames, start, end),
+            call=lambda start, end: root.call(frames, start, end),
+            max_length=max_length,
+            min_length=min_length,
+            overlap=overlap,
+            reverse=reverse
+        )
+
+    def split(self, trajectory, max_length=None, min_length=1, overlap=1,
+              reverse=False, n_results=0):
+        """
+        Return list of subtrajectories in the ensemble
+
+        Same as :meth:`.Ensemble.split`.
+        """
+        frames = self.masks(trajectory)
+        trajectory = frames.trajectory
+        slices = self.iter_valid_slices(frames, max_length, min_length,
+                                        overlap, reverse)
+        if n_results > 0:
+            slices = itertools.islice(slices, n_results)
+        return [trajectory[part] for part in slices]
+
+
+# Nodes of a compiled ensemble. Each function acts on the frames
+# `[start:end]` of the trajectory of a FrameMasks object.
+
+class _SubtrajectoryNode(object):
+    """Evaluates an ensemble by calling it on the sub-trajectory"""
+
+    def __init__(self, ensemble):
+        self.ensemble = ensemble
+
+    def call(self, frames, start, end):
+        return self.ensemble(frames.trajectory[start:end])
+
+    def can_append(self, frames, start, end, strict=False):
+        subtraj = frames.trajectory[start:end]
+        if strict:
+            return self.ensemble.strict_can_append(subtraj)
+        return self.ensemble.can_append(subtraj)
+
+    def can_prepend(self, frames, start, end, strict=False):
+        subtraj = frames.trajectory[start:end]
+        if strict:
+            return self.ensemble.strict_can_prepend(subtraj)
+        return self.ensemble.can_prepend(subtraj)
+
+
+class _ConstantNode(object):
+    def __init__(self, value):
+        self.value = value
+
+    def call(self, frames, start, end):
+        return self.value
+
+    def can_append(self, frames, start, end, strict=False):
+        return self.value
+
+    can_prepend = can_append
+
+
+class _LengthNode(object):
+    def __init__(self, length):
+        self.length = length
+
+    def call(self, frames, start, end):
+        length = end - start
+        if type(self.length) is int:
+            return length == self.length
+        else:
+            return length >= self.length.start and (
+                self.length.stop is None or length < self.length.stop)
+
+    def can_append(self, frames, start, end, strict=False):
+        length = end - start
+        if type(self.length) is int:
+            return length < self.length
+        else:
+            return self.length.stop is None or length < self.length.stop - 1
+
+    can_prepend = can_append
+
+
+class _AllInXNode(object):
+    def __init__(self, volume_idx, outside):
+        self.volume_idx = volume_idx
+        self.outside = outside
+
+    def _all(self, frames, start, end):
+        n_in = frames.n_in(self.volume_idx, start, end)
+        if self.outside:
+            return n_in == 0
+        else:
+            return n_in == end - start
+
+    def call(self, frames, start, end):
+        return end > start and self._all(frames, start, end)
+
+    def can_append(self, frames, start, end, strict=False):
+        return self._all(frames, start, end)
+
+    can_prepend = can_append
+
+
+class _PartInXNode(object):
+    def __init__(self, volume_idx, outside):
+        self.volume_idx = volume_idx
+        self.outside = outside
+
+    def call(self, frames, start, end):
+        n_in = frames.n_in(self.volume_idx, start, end)
+        if self.outside:
+            return n_in < end - start
+        else:
+            return n_in > 0
+
+    def can_append(self, frames, start, end, strict=False):
+        return True
+
+    can_prepend = can_append
+
+
+class _ExitsXNode(_PartInXNode):
+    def __init__(self, volume_idx, enters):
+        super(_ExitsXNode, self).__init__(volume_idx, False)
+        self.enters = enters
+
+    def call(self, frames, start, end):
+        if self.enters:
+            return frames.n_enters(self.volume_idx, start, end) > 0
+        else:
+            return frames.n_exits(self.volume_idx, start, end) > 0
+
+
+class _NegatedNode(object):
+    def __init__(self, node):
+        self.node = node
+
+    def call(self, frames, start, end):
+        return not self.node.call(frames, start, end)
+
+    def can_append(self, frames, start, end, strict=False):
+        return True
+
+    can_prepend = can_append
+
+
+class _CombinationNode(object):
+    def __init__(self, fnc, node1, node2):
+        self.fnc = fnc
+        self.node1 = node1
+        self.node2 = node2
+
+    def _combine(self, a, f2):
+        # short-circuit as in EnsembleCombination
+        res_true = self.fnc(a, True)
+        if res_true == self.fnc(a, False):
+            return res_true
+        return self.fnc(a, f2())
+
+    def call(self, frames, start, end):
+        return self._combine(
+            self.node1.call(frames, start, end),
+            lambda: self.node2.call(frames, start, end)
+        )
+
+    def can_append(self, frames, start, end, strict=False):
+        return self._combine(
+            self.node1.can_append(frames, start, end, strict),
+            lambda: self.node2.can_append(frames, start, end, strict)
+        )
+
+    def can_prepend(self, frames, start, end, strict=False):
+        return self._combine(
+            self.node1.can_prepend(frames, start, end, strict),
+            lambda: self.node2.can_prepend(frames, start, end, strict)
+        )
+
+
+class _SequentialNode(object):
+    """
+    Same algorithms as :class:`.SequentialEnsemble` without caching, on
+    windows of frames
+    """
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    @staticmethod
+    def _find_subtraj_final(frames, node, subtraj_first, traj_final):
+        subtraj_final = subtraj_first
+        while (subtraj_final < traj_final and
+               (node.can_append(frames, subtraj_first, subtraj_final + 1) or
+                node.call(frames, subtraj_first, subtraj_final + 1))):
+            subtraj_final += 1
+        return subtraj_final
+
+    @staticmethod
+    def _find_subtraj_first(frames, node, subtraj_final, traj_first):
+        subtraj_first = subtraj_final
+        while (subtraj_first > traj_first and
+               (node.can_prepend(frames, subtraj_first - 1, subtraj_final) or
+                node.call(frames, subtraj_first - 1, subtraj_final))):
+            subtraj_first -= 1
+        return subtraj_first
+
+    def transition_frames(self, frames, start, end):
+        ens_num = 0
+        subtraj_first = start
+        final_ens = len(self.nodes) - 1
+        transitions = []
+        while ens_num <= final_ens:
+            node = self.nodes[ens_num]
+            subtraj_final = self._find_subtraj_final(frames, node,
+                                                     subtraj_first, end)
+            if subtraj_final - subtraj_first > 0:
+                transitions.append(subtraj_final)
+                if ens_num == final_ens:
+                    return transitions
+            elif not node.call(frames, subtraj_final, subtraj_final):
+                return transitions
+            else:
+                transitions.append(subtraj_final)
+            ens_num += 1
+            subtraj_first = subtraj_final
+        return transitions
+
+    def call(self, frames, start, end):
+        transitions = self.transition_frames(frames, start, end)
+        if len(transitions) != len(self.nodes) or transitions[-1] != end:
+            return False
+
+        subtraj_first = start
+        for node, subtraj_final in zip(self.nodes, transitions):
+            if not node.call(frames, subtraj_first, subtraj_final):
+                return False
+            subtraj_first = subtraj_final
+        return True
+
+    def can_append(self, frames, start, end, strict=False):
+        subtraj_first = start
+        ens_num = 0
+        ens_first = 0
+        final_ens = len(self.nodes) - 1
+        while True:
+            node = self.nodes[ens_num]
+            subtraj_final = self._find_subtraj_final(frames, node,
+                                                     subtraj_first, end)
+            if subtraj_final - subtraj_first > 0:
+                if ens_num == final_ens:
+                    if subtraj_final == end:
+                        return node.can_append(frames, subtraj_first, end)
+                    else:
+                        return False  # in final ensemble, not all assigned
+                else:
+                    ens_num += 1
+                    subtraj_first = subtraj_final
+            elif subtraj_final == end:
+                return True
+            elif (ens_num < final_ens and
+                  node.call(frames, subtraj_final, subtraj_final)):
+                ens_num += 1
+            elif ens_first == final_ens or strict:
+                return False
+            else:
+                ens_first += 1
+                ens_num = ens_first
+                subtraj_first = start
+
+    def can_prepend(self, frames, start, end, strict=False):
+        subtraj_final = end
+        ens_num = len(self.nodes) - 1
+        ens_final = ens_num
+        while True:
+            node = self.nodes[ens_num]
+            subtraj_first = self._find_subtraj_first(frames, node,
+                                                     subtraj_final, start)
+            if subtraj_final - subtraj_first > 0:
+                if ens_num == 0:
+                    if subtraj_first == start:
+                        return node.can_prepend(frames, start, subtraj_final)
+                    else:
+                        return False  # in first ensemble, not all assigned
+                else:
+                    ens_num -= 1
+                    subtraj_final = subtraj_first
+            elif subtraj_first == start:
+                return True
+            elif ens_num > 0 and node.call(frames, subtraj_first,
+                                           subtraj_first):
+                ens_num -= 1
+            elif ens_final == 0 or strict:
+                return False
+            else:
+                ens_final -= 1
+                ens_num = ens_final
+                subtraj_final = end
@@ -1,5 +1,6 @@
 import signal
 import logging
+import threading
 
 
 # class based on: http://stackoverflow.com/a/21919644/487556
@@ -14,6 +15,13 @@ class DelayedInterrupt(object):
     def __enter__(self):
         self.signal_received = {}
         self.old_handlers = {}
+        # signal handlers can only be set from the main thread; in other
+        # threads the signals are delivered to the main thread anyway
+        self.active = isinstance(threading.current_thread(),
+                                 threading._MainThread)
+        if not self.active:
+            return
+
         for sig in self.sigs:
             self.signal_received[sig] = False
             self.old_handlers[sig] = signal.getsignal(sig)
@@ -28,6 +36,9 @@ class DelayedInterrupt(object):
             signal.signal(sig, handler)
 
     def __exit__(self, type, value, traceback):
+        if not self.active:
+            return
+
         for sig in self.sigs:
             signal.signal(sig, self.old_handlers[sig])
             if self.signal_received[sig] and self.old_handlers[sig]:
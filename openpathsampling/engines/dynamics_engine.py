@@ -366,6 +366,38 @@ class DynamicsEngine(StorableNamedObject):
 
         return stop
 
+    @staticmethod
+    def _as_checker(condition):
+        """
+        Replace `Ensemble.can_append`/`can_prepend` by a streaming checker.
+
+        The checker gives the same result, but only looks at the new frame
+        each time the trajectory grows, instead of rescanning it.
+
+        Parameters
+        ----------
+        condition : function(Trajectory, bool)
+            a running condition as given to :meth:`iter_generate`
+
+        Returns
+        -------
+        function(Trajectory, bool)
+            the :class:`openpathsampling.ensemble.EnsembleChecker` for
+            bound `can_append`/`can_prepend` methods of ensembles, otherwise
+            the unchanged condition
+        """
+        ensemble = getattr(condition, '__self__', None)
+        if ensemble is None or not hasattr(ensemble, 'checker'):
+            return condition
+
+        name = getattr(condition, '__name__', None)
+        if name == 'can_append':
+            return ensemble.checker(+1)
+        elif name == 'can_prepend':
+            return ensemble.checker(-1)
+        else:
+            return condition
+
     def generate(self, snapshot, running=None, direction=+1):
         r"""
         Generate a trajectory consisting of ntau segments of tau_steps in
@@ -461,6 +493,8 @@ class DynamicsEngine(StorableNamedObject):
         except TypeError:
             running = [running]
 
+        running = [self._as_checker(condition) for condition in running]
+
         if hasattr(initial, '__iter__'):
             initial = Trajectory(initial)
         else:
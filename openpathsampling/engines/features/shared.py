@@ -1,9 +1,204 @@
 import copy
+import hashlib
 
 import numpy as np
 from simtk import unit as u
 
-from openpathsampling.netcdfplus import StorableObject, ObjectStore, WeakLRUCache
+from openpathsampling.netcdfplus import StorableObject, ObjectStore, \
+    WeakLRUCache, LRUCache, LoaderProxy
+
+
+class ContentStore(ObjectStore):
+    """
+    An ObjectStore that saves containers with identical content only once
+
+    If a new container has the same arrays as a container saved before, the
+    reference to the saved one is returned instead of writing a new row.
+    The content of the last `content_cache_size` saved containers is
+    remembered. Containers in files opened for appending are not checked.
+
+    Attributes
+    ----------
+    deduplicate : bool
+        if `False` every container is saved
+    """
+
+    content_cache_size = 100000
+
+    def __init__(self, content_class, json=False):
+        super(ContentStore, self).__init__(content_class, json=json)
+        self.deduplicate = True
+        self._content_index = LRUCache(self.content_cache_size)
+
+    @staticmethod
+    def content_key(obj):
+        """
+        Return a hashable key for the content of a container
+
+        Parameters
+        ----------
+        obj : :class:`openpathsampling.netcdfplus.StorableObject`
+
+        Returns
+        -------
+        str
+            the digest of all arrays returned by `to_dict`
+        """
+        digest = hashlib.sha1()
+        for key, value in sorted(obj.to_dict().items()):
+            digest.update(key)
+            if isinstance(value, u.Quantity):
+                digest.update(str(value.unit))
+                value = value._value
+
+            if value is None:
+                digest.update('None')
+            else:
+                value = np.ascontiguousarray(value)
+                digest.update(str(value.dtype) + str(value.shape))
+                digest.update(value.data)
+
+        return digest.digest()
+
+    def save(self, obj, idx=None):
+        if not self.deduplicate or idx is not None or \
+                isinstance(obj, LoaderProxy) or obj.__uuid__ in self.index:
+            return super(ContentStore, self).save(obj, idx)
+
+        key = self.content_key(obj)
+        uuid = self._content_index.get(key)
+        if uuid is not None and uuid in self.index:
+            return uuid
+
+        ref = super(ContentStore, self).save(obj, idx)
+        self._content_index[key] = obj.__uuid__
+
+        return ref
+
+
+def _take_atoms(values, atom_indices):
+    # select atoms from an array and keep the unit
+    if isinstance(values, u.Quantity):
+        return u.Quantity(values._value[atom_indices], values.unit)
+    else:
+        return values[atom_indices]
+
+
+def _expand_atoms(values, atom_indices, n_atoms):
+    # return a full size copy with `nan` for the atoms not in `atom_indices`
+    unit = None
+    if isinstance(values, u.Quantity):
+        unit = values.unit
+        values = values._value
+
+    expanded = np.empty((n_atoms,) + values.shape[1:], dtype=values.dtype)
+    expanded.fill(np.nan)
+    expanded[atom_indices] = values
+
+    if unit is not None:
+        return u.Quantity(expanded, unit)
+    else:
+        return expanded
+
+
+class AtomContentStore(ContentStore):
+    """
+    A ContentStore for containers with one array row per atom
+
+    If the snapshot store has the dimension `n_subset_atoms` the store can
+    also save partial containers, which keep only a subset of atoms. Their
+    arrays are written to separate variables of the subset size and the row
+    of the full size variable is not written. The unwritten row still uses
+    disk space if the storage layout puts several rows into one chunk.
+    """
+
+    subset_dimension = 'n_subset_atoms'
+
+    @property
+    def n_atoms(self):
+        """
+        int : the number of atoms in a full container
+        """
+        self.storage.wait_for_writer()
+        return len(self.storage.dimensions[self.dimension_prefix + 'n_atoms'])
+
+    @property
+    def has_subsets(self):
+        """
+        bool : if `True` partial containers can be saved
+        """
+        return self.prefix + '_partial' in self.storage.variables
+
+    def _create_subset_variables(self, name, simtk_unit):
+        if self.dimension_prefix + self.subset_dimension not in \
+                self.storage.dimensions:
+            return
+
+        self.create_variable(
+            'partial', 'bool',
+            description="if `True` only the atoms in 'subset_atom_indices' "
+                        "of container '{idx}' are stored.")
+
+        self.create_variable(
+            'subset_atom_indices', 'numpy.int32',
+            dimensions=(self.subset_dimension,),
+            chunksizes=(self.subset_dimension,))
+
+        self.create_variable(
+            'subset_' + name, 'numpy.float32',
+            dimensions=(self.subset_dimension, 'n_spatial'),
+            chunksizes=(self.subset_dimension, 'n_spatial'),
+            simtk_unit=simtk_unit)
+
+    def _write_atoms(self, name, container, idx):
+        atom_indices = getattr(container, 'atom_indices', None)
+        if atom_indices is None:
+            self.vars[name][idx] = getattr(container, name)
+            if self.has_subsets:
+                self.vars['partial'][idx] = False
+
+        elif self.has_subsets:
+            self.vars['subset_' + name][idx] = \
+                getattr(container, 'subset_' + name)
+            self.vars['subset_atom_indices'][idx] = atom_indices
+            self.vars['partial'][idx] = True
+
+        else:
+            raise ValueError(
+                'Partial containers can only be saved for snapshots with '
+                'the dimension `%s`' % self.subset_dimension)
+
+    def _read_atoms(self, name, idxs):
+        """
+        Read the per atom arrays of several containers
+
+        Parameters
+        ----------
+        name : str
+            the name of the full size variable
+        idxs : list of int
+            the rows to be read
+
+        Returns
+        -------
+        list of tuple
+            the array and the atom indices for partial containers or `None`
+            for full ones
+        """
+        if not self.has_subsets:
+            return [(values, None) for values in self._read_rows(name, idxs)]
+
+        partial = self._read_rows('partial', idxs)
+        full = iter(self._read_rows(
+            name, [idx for idx, part in zip(idxs, partial) if not part]))
+        partial_idxs = [idx for idx, part in zip(idxs, partial) if part]
+        subsets = iter(self._read_rows('subset_' + name, partial_idxs))
+        atom_indices = iter(
+            self._read_rows('subset_atom_indices', partial_idxs))
+
+        return [
+            (next(subsets), next(atom_indices)) if part else (next(full), None)
+            for part in partial]
 
 
 # =============================================================================
@@ -27,6 +222,9 @@ class StaticContainer(StorableObject):
     # Class variables to store the global storage and the system context
     # describing the system to be saved as configuration_indices
 
+    # partial containers keep only some atoms, see `subset`
+    is_partial = False
+
     def __init__(self, coordinates, box_vectors):
         """
         Create a simulation configuration from either an OpenMM context or
@@ -90,6 +288,26 @@ class StaticContainer(StorableObject):
                                box_vectors=self.box_vectors
                                )
 
+    def subset(self, atom_indices):
+        """
+        Returns a partial copy that keeps only some of the atoms
+
+        Parameters
+        ----------
+        atom_indices : list of int
+            the atoms to be kept
+
+        Returns
+        -------
+        :obj:`PartialStaticContainer`
+        """
+        return PartialStaticContainer(
+            subset_coordinates=_take_atoms(self.coordinates, atom_indices),
+            box_vectors=self.box_vectors,
+            atom_indices=atom_indices,
+            n_atoms=self.n_atoms
+        )
+
     def to_dict(self):
         return {
             'coordinates': self.coordinates,
@@ -97,7 +315,66 @@ class StaticContainer(StorableObject):
         }
 
 
-class StaticContainerStore(ObjectStore):
+class PartialStaticContainer(StaticContainer):
+    """
+    Configuration that keeps the coordinates of a subset of atoms only
+
+    The full `coordinates` are created on access and are `nan` for all
+    atoms that are not kept.
+
+    Attributes
+    ----------
+    subset_coordinates : simtk.unit.Quantity wrapping Mx3 np array
+        the coordinates of the kept atoms
+    atom_indices : numpy.ndarray of int, shape=(M,)
+        the indices of the kept atoms
+    box_vectors : periodic box vectors
+        the periodic box vectors
+    """
+
+    is_partial = True
+
+    def __init__(self, subset_coordinates, box_vectors, atom_indices,
+                 n_atoms):
+        # the full coordinates are a property, so the initialization of
+        # a StaticContainer is skipped
+        StorableObject.__init__(self)
+
+        self.subset_coordinates = subset_coordinates
+        self.box_vectors = box_vectors
+        self.atom_indices = np.asarray(atom_indices, dtype=np.int32)
+        self._n_atoms = n_atoms
+
+    @property
+    def n_atoms(self):
+        return self._n_atoms
+
+    @property
+    def coordinates(self):
+        return _expand_atoms(
+            self.subset_coordinates, self.atom_indices, self._n_atoms)
+
+    def subset(self, atom_indices):
+        raise ValueError('A partial configuration cannot be subset again')
+
+    def copy(self):
+        return PartialStaticContainer(
+            subset_coordinates=self.subset_coordinates,
+            box_vectors=self.box_vectors,
+            atom_indices=self.atom_indices,
+            n_atoms=self._n_atoms
+        )
+
+    def to_dict(self):
+        return {
+            'subset_coordinates': self.subset_coordinates,
+            'box_vectors': self.box_vectors,
+            'atom_indices': self.atom_indices,
+            'n_atoms': self._n_atoms
+        }
+
+
+class StaticContainerStore(AtomContentStore):
     """
     An ObjectStore for Configuration. Allows to store Configuration() instances in a netcdf file.
     """
@@ -109,19 +386,38 @@ class StaticContainerStore(ObjectStore):
 
     def _save(self, configuration, idx):
         # Store configuration.
-        self.vars['coordinates'][idx] = configuration.coordinates
+        self._write_atoms('coordinates', configuration, idx)
         self.vars['box_vectors'][idx] = configuration.box_vectors
 
     def get(self, indices):
         return [self.load(idx) for idx in indices]
 
     def _load(self, idx):
-        coordinates = self.vars["coordinates"][idx]
-        box_vectors = self.vars["box_vectors"][idx]
-
-        configuration = StaticContainer(coordinates=coordinates, box_vectors=box_vectors)
-
-        return configuration
+        return self._load_bulk([idx])[0]
+
+    def _load_bulk(self, idxs):
+        coordinates = self._read_atoms('coordinates', idxs)
+        box_vectors = self._read_rows('box_vectors', idxs)
+
+        configurations = []
+        for (coord, atom_indices), box in zip(coordinates, box_vectors):
+            if atom_indices is not None:
+                configurations.append(PartialStaticContainer(
+                    subset_coordinates=coord,
+                    box_vectors=box,
+                    atom_indices=atom_indices,
+                    n_atoms=self.n_atoms))
+                continue
+
+            # loaded arrays are not copied again. With an exported memory
+            # map they are read-only views into it
+            configuration = StaticContainer(
+                coordinates=None, box_vectors=None)
+            configuration.coordinates = coord
+            configuration.box_vectors = box
+            configurations.append(configuration)
+
+        return configurations
 
     def coordinates_as_numpy(self, frame_indices=None, atom_indices=None):
         """
@@ -140,6 +436,15 @@ class StaticContainerStore(ObjectStore):
         numpy.array, shape=(n_frames, n_atoms)
             the array of atom coordinates in a float32 numpy array
 
+        Notes
+        -----
+        If the storage has a valid memory map exported with
+        `storage.export_mmap()` the result is taken from it. Selections
+        using slices are then read-only views and not copies.
+
+        The rows of partial configurations are not written and contain the
+        fill value of the variable.
+
         """
         if frame_indices is None:
             frame_indices = slice(None)
@@ -147,7 +452,12 @@ class StaticContainerStore(ObjectStore):
         if atom_indices is None:
             atom_indices = slice(None)
 
-        variable = self.storage.variables[self.prefix + '_coordinates']
+        self.flush()
+        mmap = self.storage.mmap(self.prefix + '_coordinates')
+        if mmap is not None:
+            return mmap[frame_indices][..., atom_indices, :]
+
+        variable = self.variables['coordinates']
 
         return variable[frame_indices, atom_indices, :].astype(
             np.float32).copy()
@@ -169,6 +479,8 @@ class StaticContainerStore(ObjectStore):
             chunksizes=('n_spatial', 'n_spatial'),
             simtk_unit=u.nanometers)
 
+        self._create_subset_variables('coordinates', u.nanometers)
+
 
 # =============================================================================
 # SIMULATION MOMENTUM / VELOCITY
@@ -186,6 +498,9 @@ class KineticContainer(StorableObject):
 
     """
 
+    # partial containers keep only some atoms, see `subset`
+    is_partial = False
+
     def __init__(self, velocities):
         """
         Create a simulation momentum from either an OpenMM context or
@@ -219,13 +534,80 @@ class KineticContainer(StorableObject):
 
         return this
 
+    def subset(self, atom_indices):
+        """
+        Returns a partial copy that keeps only some of the atoms
+
+        Parameters
+        ----------
+        atom_indices : list of int
+            the atoms to be kept
+
+        Returns
+        -------
+        :obj:`PartialKineticContainer`
+        """
+        return PartialKineticContainer(
+            subset_velocities=_take_atoms(self.velocities, atom_indices),
+            atom_indices=atom_indices,
+            n_atoms=self.velocities.shape[0]
+        )
+
     def to_dict(self):
         return {
             'velocities': self.velocities
         }
 
 
-class KineticContainerStore(ObjectStore):
+class PartialKineticContainer(KineticContainer):
+    """
+    Momentum that keeps the velocities of a subset of atoms only
+
+    The full `velocities` are created on access and are `nan` for all
+    atoms that are not kept.
+
+    Attributes
+    ----------
+    subset_velocities : simtk.unit.Quantity wrapping Mx3 np array
+        the velocities of the kept atoms
+    atom_indices : numpy.ndarray of int, shape=(M,)
+        the indices of the kept atoms
+    """
+
+    is_partial = True
+
+    def __init__(self, subset_velocities, atom_indices, n_atoms):
+        # see PartialStaticContainer
+        StorableObject.__init__(self)
+
+        self.subset_velocities = subset_velocities
+        self.atom_indices = np.asarray(atom_indices, dtype=np.int32)
+        self._n_atoms = n_atoms
+
+    @property
+    def velocities(self):
+        return _expand_atoms(
+            self.subset_velocities, self.atom_indices, self._n_atoms)
+
+    def subset(self, atom_indices):
+        raise ValueError('A partial momentum cannot be subset again')
+
+    def copy(self):
+        return PartialKineticContainer(
+            subset_velocities=self.subset_velocities,
+            atom_indices=self.atom_indices,
+            n_atoms=self._n_atoms
+        )
+
+    def to_dict(self):
+        return {
+            'subset_velocities': self.subset_velocities,
+            'atom_indices': self.atom_indices,
+            'n_atoms': self._n_atoms
+        }
+
+
+class KineticContainerStore(AtomContentStore):
     """
     An ObjectStore for Momenta. Allows to store Momentum() instances in a netcdf file.
     """
@@ -237,13 +619,27 @@ class KineticContainerStore(ObjectStore):
         return {}
 
     def _save(self, momentum, idx):
-        self.vars['velocities'][idx, :, :] = momentum.velocities
+        self._write_atoms('velocities', momentum, idx)
 
     def _load(self, idx):
-        velocities = self.vars['velocities'][idx]
+        return self._load_bulk([idx])[0]
+
+    def _load_bulk(self, idxs):
+        momenta = []
+        for velocities, atom_indices in self._read_atoms('velocities', idxs):
+            if atom_indices is not None:
+                momenta.append(PartialKineticContainer(
+                    subset_velocities=velocities,
+                    atom_indices=atom_indices,
+                    n_atoms=self.n_atoms))
+                continue
 
-        momentum = KineticContainer(velocities=velocities)
-        return momentum
+            # see StaticContainerStore._load_bulk
+            momentum = KineticContainer(velocities=None)
+            momentum.velocities = velocities
+            momenta.append(momentum)
+
+        return momenta
 
     def velocities_as_numpy(self, frame_indices=None, atom_indices=None):
         """
@@ -257,6 +653,11 @@ class KineticContainerStore(ObjectStore):
         atom_indices : list of int of None
             if not None only the specified atom_indices are returned. Might
             speed up reading a lot.
+
+        Notes
+        -----
+        See `StaticContainerStore.coordinates_as_numpy` for the use of
+        exported memory maps and partial momenta.
         """
 
         if frame_indices is None:
@@ -265,6 +666,11 @@ class KineticContainerStore(ObjectStore):
         if atom_indices is None:
             atom_indices = slice(None)
 
+        self.flush()
+        mmap = self.storage.mmap(self.prefix + '_velocities')
+        if mmap is not None:
+            return mmap[frame_indices][..., atom_indices, :]
+
         v = self.variables['velocities']
 
         return v[frame_indices, atom_indices, :].astype(np.float32).copy()
@@ -305,3 +711,6 @@ class KineticContainerStore(ObjectStore):
                         "'coordinate' of momentum 'momentum'.",
             chunksizes=('n_atoms', 'n_spatial'),
             simtk_unit=u.nanometers / u.picoseconds)
+
+        self._create_subset_variables(
+            'velocities', u.nanometers / u.picoseconds)
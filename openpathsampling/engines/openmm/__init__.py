@@ -1,11 +1,16 @@
 from engine import OpenMMEngine as Engine
+from pool import ContextPool, context_pool
 from tools import (
+    cached_trajectory_to_mdtraj,
     empty_snapshot_from_openmm_topology,
     snapshot_from_pdb,
     snapshot_from_testsystem,
     to_openmm_topology,
     trajectory_from_mdtraj,
-    trajectory_to_mdtraj
+    trajectory_to_mdtraj,
+    trajectory_xyz,
+    MDTrajConversionCache,
+    mdtraj_conversion_cache
 )
 
 import features
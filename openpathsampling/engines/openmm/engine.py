@@ -7,6 +7,8 @@ import simtk.unit as u
 
 from openpathsampling.engines import DynamicsEngine, SnapshotDescriptor
 from snapshot import Snapshot
+from pool import context_pool
+import features
 import numpy as np
 
 logger = logging.getLogger(__name__)
@@ -29,6 +31,9 @@ class OpenMMEngine(DynamicsEngine):
     _default_options = {
         'n_steps_per_frame': 10,
         'n_frames_max': 5000,
+        'use_context_pool': False,
+        'subset_atom_indices': None,
+        'full_frame_interval': 0
     }
 
     base_snapshot_type = Snapshot
@@ -66,6 +71,19 @@ class OpenMMEngine(DynamicsEngine):
                     the openmm specification for the platform to be used,
                     also 'fastest' is allowed   which will pick the currently
                     fastest one available
+                'use_context_pool' : bool, default: False
+                    if `True` the simulation is taken from the shared
+                    :obj:`openpathsampling.engines.openmm.context_pool`
+                    and given back after each generated trajectory
+                'subset_atom_indices' : list of int or None, default: None
+                    if set, generated frames keep only the coordinates and
+                    velocities of these atoms. The last frame of a
+                    trajectory is always complete. Snapshots of this engine
+                    are stored with the extra dimension `n_subset_atoms`
+                'full_frame_interval' : int, default: 0
+                    with `subset_atom_indices`, every n-th generated frame
+                    is kept complete. Shooting point selectors only pick
+                    complete frames. `0` keeps only the last frame complete
 
         Notes
         -----
@@ -83,6 +101,10 @@ class OpenMMEngine(DynamicsEngine):
             'n_spatial': topology.n_spatial
         }
 
+        if options is not None and \
+                options.get('subset_atom_indices') is not None:
+            dimensions['n_subset_atoms'] = len(options['subset_atom_indices'])
+
         descriptor = SnapshotDescriptor.construct(
             Snapshot,
             dimensions
@@ -105,6 +127,12 @@ class OpenMMEngine(DynamicsEngine):
         self._current_box_vectors = None
 
         self._simulation = None
+        self._pool_platform = None
+
+        # the last two partial frames handed out together with their
+        # complete versions, to complete the final frame of a trajectory
+        self._partial_frames = []
+        self._n_generated = 0
 
     def from_new_options(
             self,
@@ -134,6 +162,8 @@ class OpenMMEngine(DynamicsEngine):
                     the openmm specification for the platform to be used,
                     also 'fastest' is allowed which will pick the currently
                     fastest one available
+                'use_context_pool' : bool, default: False
+                    use the shared pool of simulations
 
         Notes
         -----
@@ -164,7 +194,8 @@ class OpenMMEngine(DynamicsEngine):
 
         if self._simulation is not None and \
                 integrator is self.integrator and \
-                not new_properties:
+                not new_properties and \
+                not self.use_context_pool:
 
             # apparently we use a simulation object which is the same as the
             # new one since we do not change the platform or
@@ -202,6 +233,7 @@ class OpenMMEngine(DynamicsEngine):
         """
 
         logger.info('Removed existing OpenMM engine.')
+        self._release_simulation()
         self._simulation = None
 
     def unload_context(self):
@@ -213,7 +245,18 @@ class OpenMMEngine(DynamicsEngine):
 
         """
         if self._simulation is not None:
-            del self._simulation.context
+            if self.use_context_pool:
+                self._release_simulation()
+            else:
+                del self._simulation.context
+            self._simulation = None
+
+    def _release_simulation(self):
+        # give a pooled simulation back, keeping the current state in the
+        # cached snapshot so it can be restored into the next simulation
+        if self._simulation is not None and self.use_context_pool:
+            _ = self.current_snapshot
+            context_pool.release(self._simulation)
             self._simulation = None
 
     def initialize(self, platform=None):
@@ -234,7 +277,16 @@ class OpenMMEngine(DynamicsEngine):
 
         """
 
-        if self._simulation is None:
+        if self._simulation is None and self.use_context_pool:
+            if platform is None:
+                platform = self._pool_platform
+
+            self._pool_platform = platform
+            self._simulation = context_pool.acquire(self, platform)
+            if self._current_snapshot is not None:
+                self._write_context(self._current_snapshot)
+
+        elif self._simulation is None:
             if type(platform) is str:
                 self._simulation = simtk.openmm.app.Simulation(
                     topology=self.topology.mdtraj.to_openmm(),
@@ -336,16 +388,24 @@ class OpenMMEngine(DynamicsEngine):
 
 
     def _build_current_snapshot(self):
-        # TODO: Add caching for this and mark if changed
-
+        # energies are not used by any snapshot feature and computing them
+        # can cost as much as a force evaluation, so we only ask for the
+        # positions and velocities
         state = self.simulation.context.getState(getPositions=True,
-                                                 getVelocities=True,
-                                                 getEnergy=True)
+                                                 getVelocities=True)
+
+        # the arrays returned by the state are new objects, so the
+        # containers can use them without another deep copy
+        statics = Snapshot.StaticContainer(coordinates=None, box_vectors=None)
+        statics.coordinates = state.getPositions(asNumpy=True)
+        statics.box_vectors = state.getPeriodicBoxVectors(asNumpy=True)
+
+        kinetics = Snapshot.KineticContainer(velocities=None)
+        kinetics.velocities = state.getVelocities(asNumpy=True)
 
         snapshot = Snapshot.construct(
-            coordinates=state.getPositions(asNumpy=True),
-            box_vectors=state.getPeriodicBoxVectors(asNumpy=True),
-            velocities=state.getVelocities(asNumpy=True),
+            statics=statics,
+            kinetics=kinetics,
             engine=self
         )
 
@@ -353,10 +413,17 @@ class OpenMMEngine(DynamicsEngine):
 
     @staticmethod
     def is_valid_snapshot(snapshot):
-        if np.isnan(np.min(snapshot.coordinates._value)):
+        # partial frames contain `nan` for all atoms that are not kept
+        statics = snapshot.statics
+        coordinates = statics.subset_coordinates \
+            if statics.is_partial else statics.coordinates
+        if np.isnan(np.min(coordinates._value)):
             return False
 
-        if np.isnan(np.min(snapshot.velocities._value)):
+        kinetics = snapshot.kinetics
+        velocities = kinetics.subset_velocities \
+            if kinetics.is_partial else kinetics.velocities
+        if np.isnan(np.min(velocities._value)):
             return False
 
         return True
@@ -375,19 +442,19 @@ class OpenMMEngine(DynamicsEngine):
     def current_snapshot(self, snapshot):
         self.check_snapshot_type(snapshot)
 
-        if snapshot is not self._current_snapshot:
-            # if snapshot.coordinates is not None:
-            self.simulation.context.setPositions(snapshot.coordinates)
+        partial = (
+            features.PartialStaticContainer, features.PartialKineticContainer)
+        if isinstance(snapshot.statics, partial) or \
+                isinstance(snapshot.kinetics, partial):
+            raise ValueError(
+                'Cannot start the engine from a partial snapshot. Use a '
+                'complete frame, e.g. by setting `full_frame_interval`.')
 
-            # if snapshot.box_vectors is not None:
-            self.simulation.context.setPeriodicBoxVectors(
-                snapshot.box_vectors[0],
-                snapshot.box_vectors[1],
-                snapshot.box_vectors[2]
-            )
+        self._partial_frames = []
+        self._n_generated = 0
 
-            # if snapshot.velocities is not None:
-            self.simulation.context.setVelocities(snapshot.velocities)
+        if snapshot is not self._current_snapshot:
+            self._write_context(snapshot)
 
             # After the updates cache the new snapshot
             if snapshot.engine is self:
@@ -396,13 +463,75 @@ class OpenMMEngine(DynamicsEngine):
             else:
                 self._current_snapshot = self._build_current_snapshot()
 
+    def _write_context(self, snapshot):
+        context = self.simulation.context
+
+        # if snapshot.coordinates is not None:
+        context.setPositions(snapshot.coordinates)
+
+        # if snapshot.box_vectors is not None:
+        context.setPeriodicBoxVectors(
+            snapshot.box_vectors[0],
+            snapshot.box_vectors[1],
+            snapshot.box_vectors[2]
+        )
+
+        # if snapshot.velocities is not None:
+        context.setVelocities(snapshot.velocities)
+
+    def stop(self, trajectory):
+        self._complete_final_frame(trajectory)
+        self._partial_frames = []
+
+        # other engines may use a pooled simulation between trajectories
+        self._release_simulation()
+
+    def _complete_final_frame(self, trajectory):
+        # the engine cannot know in advance which frame is the last one, so
+        # a partial final frame is replaced by its complete version. The
+        # partial snapshot itself is not changed. Forward trajectories end
+        # with the generated frame, backward ones start with its reversal
+        if len(trajectory) == 0:
+            return
+
+        for partial, complete in self._partial_frames:
+            if trajectory[-1] is partial:
+                trajectory[-1] = complete
+            elif partial._reversed is not None and \
+                    trajectory[0] is partial._reversed:
+                trajectory[0] = complete.reversed
+
+    def _partial_snapshot(self, snapshot):
+        atom_indices = self.subset_atom_indices
+        return Snapshot.construct(
+            statics=snapshot.statics.subset(atom_indices),
+            kinetics=snapshot.kinetics.subset(atom_indices),
+            engine=self
+        )
+
     def generate_next_frame(self):
         self.simulation.step(self.n_steps_per_frame)
         self._current_snapshot = None
-        return self.current_snapshot
+        snapshot = self.current_snapshot
+
+        if self.subset_atom_indices is not None:
+            self._n_generated += 1
+            interval = self.full_frame_interval
+            if not (interval > 0 and self._n_generated % interval == 0):
+                partial = self._partial_snapshot(snapshot)
+
+                # with the max length criterion the last frame is removed
+                # again, so the one before might become the final frame
+                self._partial_frames = \
+                    self._partial_frames[-1:] + [(partial, snapshot)]
+
+                return partial
+
+        return snapshot
 
     def minimize(self):
         self.simulation.minimizeEnergy()
+        self._partial_frames = []
         # make sure that we get the minimized structure on request
         self._current_snapshot = None
 
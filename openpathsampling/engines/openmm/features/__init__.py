@@ -1,4 +1,6 @@
 from openpathsampling.engines.features import *
-from openpathsampling.engines.features.shared import StaticContainer, KineticContainer
+from openpathsampling.engines.features.shared import (
+    StaticContainer, KineticContainer,
+    PartialStaticContainer, PartialKineticContainer)
 import masses
 import instantaneous_temperature
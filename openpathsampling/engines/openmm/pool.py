@@ -0,0 +1,284 @@
+import logging
+import threading
+import xml.etree.ElementTree as ElementTree
+
+import simtk.openmm
+import simtk.openmm.app
+
+logger = logging.getLogger(__name__)
+
+
+class ContextPool(object):
+    """
+    Pool of initialized OpenMM simulations shared between engines
+
+    Engines with the option `use_context_pool` do not create their own
+    :class:`simtk.openmm.app.Simulation` but acquire one from this pool and
+    give it back when a trajectory is finished. Simulations are keyed by the
+    system, the integrator, the platform and the platform properties. An
+    idle simulation can also be used for an integrator that differs only in
+    parameters that can be set on a running integrator, like the
+    temperature or the step size. This way the engines of a temperature
+    ladder created with `engine.from_new_options()` share a single context
+    as long as they are not run at the same time. The random seed of the
+    integrator is part of the key, since OpenMM reads it only when the
+    context is created.
+
+    Attributes
+    ----------
+    limits : dict of str : int
+        the maximal number of contexts per platform name. If a new context
+        is needed for a platform at its limit, idle contexts of this
+        platform are removed first
+
+    Notes
+    -----
+    Each pooled simulation uses its own copy of the integrator of the first
+    engine that requested it. Changing the integrator of an engine after
+    its simulation was created has no effect on the pooled simulation.
+    """
+
+    # integrator attributes in the XML serialization and the integrator
+    # methods that change them on an existing context
+    adjustable_parameters = {
+        'temperature': ('setTemperature', float),
+        'friction': ('setFriction', float),
+        'stepSize': ('setStepSize', float),
+        'constraintTolerance': ('setConstraintTolerance', float),
+        'errorTol': ('setErrorTolerance', float)
+    }
+
+    def __init__(self):
+        self.limits = {}
+        self._entries = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @classmethod
+    def integrator_key(cls, integrator):
+        """
+        Split an integrator into a hashable key and adjustable parameters
+
+        Parameters
+        ----------
+        integrator : :class:`simtk.openmm.Integrator`
+
+        Returns
+        -------
+        str
+            the XML serialization without the adjustable parameters
+        dict of str : str
+            the adjustable parameters from the XML serialization
+        """
+        root = ElementTree.fromstring(
+            simtk.openmm.XmlSerializer.serialize(integrator))
+
+        parameters = {}
+        for name, (setter, _) in cls.adjustable_parameters.items():
+            if name in root.attrib and hasattr(integrator, setter):
+                parameters[name] = root.attrib.pop(name)
+
+        return ElementTree.tostring(root), parameters
+
+    @staticmethod
+    def platform_name(platform):
+        """
+        Return the name of the platform a new context will run on
+
+        Parameters
+        ----------
+        platform : str or `simtk.openmm.Platform` or None
+            the platform name or object. `None` is resolved to the fastest
+            platform, which OpenMM picks if no platform is given
+
+        Returns
+        -------
+        str
+        """
+        if platform is None:
+            platforms = [
+                simtk.openmm.Platform.getPlatform(idx)
+                for idx in range(simtk.openmm.Platform.getNumPlatforms())]
+            # the first of the fastest platforms like OpenMM does
+            return max(platforms, key=lambda p: p.getSpeed()).getName()
+        elif type(platform) is str:
+            return platform
+        else:
+            return platform.getName()
+
+    def _key(self, engine, platform_name):
+        integrator_key, parameters = self.integrator_key(engine.integrator)
+        properties = tuple(sorted(
+            (str(key), str(value))
+            for key, value in engine.openmm_properties.items()))
+
+        return (
+            id(engine.system),
+            integrator_key,
+            platform_name,
+            properties
+        ), parameters
+
+    def acquire(self, engine, platform=None):
+        """
+        Return a simulation for the engine that is not used by others
+
+        Parameters
+        ----------
+        engine : :class:`openpathsampling.engines.openmm.OpenMMEngine`
+            the engine that will use the simulation
+        platform : str or `simtk.openmm.Platform` or None
+            the platform name or object. `None` uses the fastest platform
+
+        Returns
+        -------
+        :class:`simtk.openmm.app.Simulation`
+        """
+        platform_name = self.platform_name(platform)
+        key, parameters = self._key(engine, platform_name)
+
+        with self._lock:
+            entry = None
+            for candidate in self._entries:
+                if not candidate['in_use'] and candidate['key'] == key:
+                    # prefer a context that needs no changes at all
+                    if entry is None or \
+                            candidate['parameters'] == parameters:
+                        entry = candidate
+
+            if entry is not None:
+                # move to the end so eviction removes older contexts first
+                self._entries.remove(entry)
+                self._entries.append(entry)
+                entry['in_use'] = True
+            else:
+                self._make_room(platform_name)
+
+        if entry is None:
+            entry = self._create(engine, platform, key, parameters)
+        else:
+            self._adjust(entry, parameters)
+
+        return entry['simulation']
+
+    def release(self, simulation):
+        """
+        Return a simulation to the pool
+
+        Parameters
+        ----------
+        simulation : :class:`simtk.openmm.app.Simulation`
+            a simulation returned by :meth:`acquire`
+        """
+        with self._lock:
+            for entry in self._entries:
+                if entry['simulation'] is simulation:
+                    entry['in_use'] = False
+
+    def clear(self):
+        """
+        Remove all idle simulations from the pool
+        """
+        with self._lock:
+            self._entries = [
+                entry for entry in self._entries if entry['in_use']]
+
+    def usage(self):
+        """
+        Return the number of contexts and particles for each platform
+
+        Returns
+        -------
+        dict of str : dict
+            for each platform name the number of `contexts`, the number of
+            contexts `in_use` and the total number of `particles`, which is
+            a measure of the used memory
+        """
+        result = {}
+        with self._lock:
+            for entry in self._entries:
+                stats = result.setdefault(
+                    entry['platform'],
+                    {'contexts': 0, 'in_use': 0, 'particles': 0})
+                stats['contexts'] += 1
+                stats['in_use'] += int(entry['in_use'])
+                stats['particles'] += entry['particles']
+
+        return result
+
+    def _make_room(self, platform_name):
+        # must be called with the lock held
+        limit = self.limits.get(platform_name)
+        if limit is None:
+            return
+
+        on_platform = [
+            entry for entry in self._entries
+            if entry['platform'] == platform_name]
+
+        n_contexts = len(on_platform)
+        for entry in on_platform:
+            if n_contexts < limit:
+                break
+
+            if not entry['in_use']:
+                self._entries.remove(entry)
+                n_contexts -= 1
+
+        if n_contexts >= limit:
+            logger.warning(
+                'All %d contexts on platform `%s` are in use. Creating '
+                'another one.' % (n_contexts, platform_name))
+
+    def _create(self, engine, platform, key, parameters):
+        # the context gets its own integrator, so it can be adjusted later
+        # without changing the integrator of the engine
+        integrator = simtk.openmm.XmlSerializer.deserialize(
+            simtk.openmm.XmlSerializer.serialize(engine.integrator))
+
+        kwargs = {}
+        if type(platform) is str:
+            kwargs['platform'] = \
+                simtk.openmm.Platform.getPlatformByName(platform)
+        elif platform is not None:
+            kwargs['platform'] = platform
+
+        simulation = simtk.openmm.app.Simulation(
+            topology=engine.topology.mdtraj.to_openmm(),
+            system=engine.system,
+            integrator=integrator,
+            platformProperties=engine.openmm_properties,
+            **kwargs
+        )
+
+        entry = {
+            'key': key,
+            'parameters': parameters,
+            'simulation': simulation,
+            'platform': simulation.context.getPlatform().getName(),
+            'particles': engine.system.getNumParticles(),
+            'in_use': True
+        }
+
+        with self._lock:
+            self._entries.append(entry)
+
+        logger.info(
+            'Created pooled OpenMM context on platform `%s`' %
+            entry['platform'])
+
+        return entry
+
+    def _adjust(self, entry, parameters):
+        integrator = entry['simulation'].integrator
+        for name, value in parameters.items():
+            if entry['parameters'].get(name) != value:
+                setter, convert = self.adjustable_parameters[name]
+                getattr(integrator, setter)(convert(value))
+
+        entry['parameters'] = parameters
+
+
+context_pool = ContextPool()
@@ -5,6 +5,7 @@ import simtk.unit as u
 from snapshot import Snapshot
 from topology import Topology, MDTrajTopology
 from openpathsampling.engines import Trajectory, NoEngine, SnapshotDescriptor
+from openpathsampling.netcdfplus import LRUCache
 
 __author__ = 'Jan-Hendrik Prinz'
 
@@ -327,5 +328,212 @@ def trajectory_to_mdtraj(trajectory, md_topology=None):
     # traj.unitcell_vectors = trajectory.box_vectors
     return trajectory.to_mdtraj(md_topology)
 
+
+def _unitless(value):
+    if type(value) is u.Quantity:
+        return value._value
+    else:
+        return value
+
+
+def trajectory_xyz(trajectory):
+    """
+    Stack the coordinates and box vectors of a list of snapshots
+
+    The arrays are allocated once and filled directly from the
+    :obj:`StaticContainer` of each snapshot. No intermediate arrays with
+    units are created. Like the `xyz` feature the units are dropped, so
+    coordinates are assumed to be in nanometers.
+
+    Parameters
+    ----------
+    trajectory : :obj:`openpathsampling.engines.Trajectory` or list
+        the snapshots to be stacked. They need to have the `statics` feature
+
+    Returns
+    -------
+    xyz : numpy.ndarray, shape=(frames, atoms, 3), dtype=numpy.float32
+        the atomic coordinates
+    box_vectors : numpy.ndarray, shape=(frames, 3, 3) or None
+        the box vectors or `None` if the first snapshot has no box vectors
+    """
+    statics = [snapshot.statics for snapshot in trajectory]
+    n_frames = len(statics)
+
+    first_coordinates = _unitless(statics[0].coordinates)
+    xyz = np.empty(
+        (n_frames,) + first_coordinates.shape, dtype=np.float32)
+
+    if statics[0].box_vectors is not None:
+        box_vectors = np.empty((n_frames, 3, 3), dtype=np.float32)
+    else:
+        box_vectors = None
+
+    for idx, static in enumerate(statics):
+        xyz[idx] = _unitless(static.coordinates)
+        if box_vectors is not None:
+            box_vectors[idx] = _unitless(static.box_vectors)
+
+    return xyz, box_vectors
+
+
+class MDTrajConversionCache(object):
+    """
+    Short-lived cache of :obj:`mdtraj.Trajectory` conversions
+
+    Sharing is opt-in and limited to a scope. Inside a `with` block of the
+    cache, conversions are keyed by the mdtraj topology and the uuids of
+    the converted snapshots, so several mdtraj based CVs evaluated on the
+    same frames share the coordinates of a single conversion. Since
+    snapshots are immutable a uuid always refers to the same coordinates.
+    The cache is cleared when the outermost block is left. Outside of a
+    block every call creates a new :obj:`mdtraj.Trajectory`.
+
+    Every caller gets its own :obj:`mdtraj.Trajectory` object, but the
+    coordinate, time and unitcell arrays of shared conversions are
+    read-only. Functions that change them in place (like `superpose` or
+    `center_coordinates`) raise a `ValueError` inside a block and need to
+    work on a copy.
+
+    Examples
+    --------
+    >>> with mdtraj_conversion_cache:
+    ...     phi = phi_cv(trajectory)
+    ...     psi = psi_cv(trajectory)
+    """
+
+    def __init__(self, size_limit=4):
+        """
+        Parameters
+        ----------
+        size_limit : int
+            the maximal number of conversions that are kept inside a block
+        """
+        self._cache = LRUCache(size_limit)
+        self._depth = 0
+
+    @property
+    def size_limit(self):
+        return self._cache.size_limit
+
+    @size_limit.setter
+    def size_limit(self, value):
+        self._cache.size_limit = value
+
+    @property
+    def active(self):
+        """
+        bool : if conversions are shared, i.e. inside a `with` block
+        """
+        return self._depth > 0
+
+    def __enter__(self):
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._depth -= 1
+        if self._depth == 0:
+            self.clear()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def clear(self):
+        self._cache.clear()
+
+    @staticmethod
+    def _shared_view(traj):
+        # a new trajectory object that uses the same (read-only) arrays, so
+        # replacing an attribute does not change the other callers
+        view = md.Trajectory.__new__(md.Trajectory)
+        view.__dict__.update(traj.__dict__)
+        return view
+
+    @staticmethod
+    def _make_read_only(traj):
+        for arr in [traj.xyz, traj.time, traj.unitcell_lengths,
+                    traj.unitcell_angles]:
+            if arr is not None:
+                arr.flags.writeable = False
+
+    def __call__(self, trajectory, md_topology=None):
+        """
+        Return the :obj:`mdtraj.Trajectory` for a list of snapshots
+
+        Parameters
+        ----------
+        trajectory : :obj:`openpathsampling.engines.Trajectory` or list
+            the snapshots to be converted
+        md_topology : :obj:`mdtraj.Topology` or None
+            the topology to be used. If `None` the topology of the first
+            snapshot is used
+
+        Returns
+        -------
+        :obj:`mdtraj.Trajectory`
+            the converted trajectory. Inside a `with` block of the cache its
+            arrays are read-only and shared with other callers
+        """
+        if len(trajectory) == 0:
+            return trajectory_to_mdtraj(trajectory, md_topology)
+
+        if md_topology is None:
+            md_topology = trajectory[0].topology.mdtraj
+
+        key = None
+        if self.active:
+            key = (
+                id(md_topology),
+                tuple(snapshot.__uuid__ for snapshot in trajectory)
+            )
+
+            if key in self._cache:
+                topology, traj = self._cache[key]
+                # the id of a deleted topology might have been reused
+                if topology is md_topology:
+                    return self._shared_view(traj)
+
+        xyz, box_vectors = trajectory_xyz(trajectory)
+
+        traj = md.Trajectory(xyz, md_topology)
+        traj.unitcell_vectors = box_vectors
+
+        if key is None:
+            return traj
+
+        self._make_read_only(traj)
+        self._cache[key] = (md_topology, traj)
+
+        return self._shared_view(traj)
+
+
+mdtraj_conversion_cache = MDTrajConversionCache()
+
+
+def cached_trajectory_to_mdtraj(trajectory, md_topology=None):
+    """
+    Construct a `mdtraj.Trajectory` using the shared conversion cache
+
+    Same as :func:`trajectory_to_mdtraj` except that the coordinates are
+    stacked directly from the snapshots. Inside a `with
+    mdtraj_conversion_cache:` block the result is shared with other calls
+    on the same snapshots. See :class:`MDTrajConversionCache`.
+
+    Parameters
+    ----------
+    trajectory : :obj:`openpathsampling.engines.Trajectory` or list
+        Input snapshots
+    md_topology : :obj:`mdtraj.Topology` or None
+        the topology to be used
+
+    Returns
+    -------
+    :obj:`mdtraj.Trajectory`
+        the constructed Trajectory instance
+    """
+    return mdtraj_conversion_cache(trajectory, md_topology)
+
+
 def ops_load_trajectory(filename, **kwargs):
     return trajectory_from_mdtraj(md.load(filename, **kwargs))
@@ -4,6 +4,8 @@ from pes import Gaussian, HarmonicOscillator, LinearSlope, OuterWalls, \
 
 from engine import ToyEngine as Engine
 from engine import ToyEngine
+from batch_engine import BatchToyEngine
+from batch_engine import BatchToyEngine as BatchEngine
 from snapshot import ToySnapshot
 from snapshot import ToySnapshot as Snapshot
 
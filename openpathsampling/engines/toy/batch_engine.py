@@ -0,0 +1,172 @@
+import numpy as np
+
+from openpathsampling.engines import (
+    Trajectory, EngineMaxLengthError, EngineNaNError
+)
+from engine import ToyEngine
+from snapshot import ToySnapshot as Snapshot
+
+
+class BatchToyEngine(ToyEngine):
+    """Toy engine that integrates many independent walkers at once.
+
+    All walkers share the potential energy surface, the masses and the
+    integrator. Their positions and velocities are integrated together as
+    arrays of shape (n_walkers, n_spatial), so the costs of the Python
+    overhead are paid once per step and not once per walker and step.
+
+    Single trajectories can still be generated with the usual `generate`,
+    which behaves exactly like :class:`.ToyEngine`.
+
+    Parameters
+    ----------
+    options : dict
+        see :class:`.ToyEngine`
+    topology : :class:`.ToyTopology`
+        see :class:`.ToyEngine`
+
+    Attributes
+    ----------
+    batch_coordinates : numpy.ndarray, shape=(n_walkers, n_atoms, n_spatial)
+        the current coordinates of all walkers during `generate_batch`
+    batch_velocities : numpy.ndarray, shape=(n_walkers, n_atoms, n_spatial)
+        the current velocities of all walkers during `generate_batch`
+    """
+
+    @property
+    def batch_coordinates(self):
+        return self.positions[:, np.newaxis, :]
+
+    @property
+    def batch_velocities(self):
+        return self.velocities[:, np.newaxis, :]
+
+    def _snapshot_of_walker(self, idx):
+        return Snapshot(
+            coordinates=np.array([self.positions[idx]]),
+            velocities=np.array([self.velocities[idx]]),
+            engine=self
+        )
+
+    def generate_batch(self, snapshots, running=None, direction=+1):
+        """
+        Generate one trajectory per initial snapshot at the same time.
+
+        Each walker is integrated until one of its stopping conditions is
+        met. Stopped walkers are removed from the integrated arrays, so
+        the cost of a step only depends on the number of running walkers.
+
+        Parameters
+        ----------
+        snapshots : list of :class:`.ToySnapshot`
+            the initial snapshots, one per walker
+        running : (list of)
+        function(:class:`openpathsampling.trajectory.Trajectory`)
+            callable function of a 'Trajectory' that returns True or False.
+            The conditions are evaluated for each walker separately. If one
+            of these returns False the walker is stopped.
+        direction : -1 or +1 (DynamicsEngine.FORWARD or DynamicsEngine.BACKWARD)
+            If +1 then this will integrate forward, if -1 it will reverse the
+            momenta of the given snapshots and then prepend generated
+            snapshots with reversed momenta. See `generate`.
+
+        Returns
+        -------
+        list of :class:`openpathsampling.Trajectory`
+            the generated trajectories in the order of `snapshots`
+
+        Notes
+        -----
+        The retry options of the engine (`on_nan`, `on_error` and `retry`
+        for `on_max_length`) are not supported in batch mode. Walkers
+        that produce `nan` or hit the maximal length (unless
+        `on_max_length` is `stop`) raise the usual engine errors.
+        """
+        if direction == 0:
+            raise RuntimeError(
+                'direction must be positive (FORWARD) or negative (BACKWARD).')
+
+        if running is not None:
+            try:
+                iter(running)
+            except TypeError:
+                running = [running]
+
+            running = list(running)
+
+        max_length = self.options['n_frames_max']
+
+        trajectories = [Trajectory([snap]) for snap in snapshots]
+        if direction > 0:
+            starts = snapshots
+        else:
+            starts = [snap.reversed for snap in snapshots]
+
+        for snap in starts:
+            self.check_snapshot_type(snap)
+
+        saved_state = (self.positions, self.velocities)
+
+        try:
+            self.positions = np.array(
+                [snap.coordinates[0] for snap in starts], dtype=float)
+            self.velocities = np.array(
+                [snap.velocities[0] for snap in starts], dtype=float)
+
+            walkers = np.array([
+                idx for idx, traj in enumerate(trajectories)
+                if not self.stop_conditions(
+                    trajectory=traj,
+                    continue_conditions=running,
+                    trusted=False)
+            ], dtype=int)
+
+            self.positions = self.positions[walkers]
+            self.velocities = self.velocities[walkers]
+
+            while len(walkers) > 0:
+                for _ in range(self.n_steps_per_frame):
+                    self.integ.step(sys=self)
+
+                finite = np.all(
+                    np.isfinite(self.positions), axis=-1) & np.all(
+                    np.isfinite(self.velocities), axis=-1)
+
+                keep = np.ones(len(walkers), dtype=bool)
+                for pos, idx in enumerate(walkers):
+                    trajectory = trajectories[idx]
+                    if not finite[pos]:
+                        raise EngineNaNError('`nan` in snapshot', trajectory)
+
+                    if max_length and len(trajectory) >= max_length:
+                        if self.on_max_length == 'stop':
+                            keep[pos] = False
+                            continue
+
+                        raise EngineMaxLengthError(
+                            'Hit maximal length of %d frames.' % max_length,
+                            trajectory
+                        )
+
+                    snapshot = self._snapshot_of_walker(pos)
+                    if direction > 0:
+                        trajectory.append(snapshot)
+                    else:
+                        trajectory.insert(0, snapshot.reversed)
+
+                    keep[pos] = not self.stop_conditions(
+                        trajectory=trajectory,
+                        continue_conditions=running)
+
+                if not np.all(keep):
+                    walkers = walkers[keep]
+                    self.positions = self.positions[keep]
+                    self.velocities = self.velocities[keep]
+
+        finally:
+            self.positions, self.velocities = saved_state
+
+        for trajectory in trajectories:
+            self.stop(trajectory)
+
+        return trajectories
@@ -295,6 +295,35 @@ class Trajectory(list, StorableObject):
         """
         return list(self.iter_proxies())
 
+    def preload(self):
+        """
+        Load all snapshots referenced by proxies using bulk reads
+
+        The proxies are grouped by their store and each store loads its
+        snapshots at once using `load_bulk`. This fills the caches so that
+        accessing the snapshots afterwards will not read from the file frame
+        by frame. The trajectory itself still contains the proxies.
+
+        Returns
+        -------
+        list of :obj:`Snapshot`
+            the loaded snapshots
+        """
+        by_store = {}
+        for frame, item in enumerate(list.__iter__(self)):
+            if hasattr(item, '_idx'):
+                by_store.setdefault(item._store, []).append(
+                    (frame, item._idx))
+
+        snapshots = list(list.__iter__(self))
+        for store, items in by_store.items():
+            frames = [frame for frame, _ in items]
+            loaded = store.load_bulk([idx for _, idx in items])
+            for frame, snapshot in zip(frames, loaded):
+                snapshots[frame] = snapshot
+
+        return snapshots
+
     def iter_proxies(self):
         """
         Returns an iterator over all actual elements
@@ -41,6 +41,125 @@ def join_ensembles(ensemble_list):
     return ensemble
 
 
+def iter_valid_windows(length, strict_can_append, can_prepend, call,
+                       max_length=None, min_length=1, overlap=1,
+                       reverse=False):
+    """Search for windows of frames that are in an ensemble.
+
+    This is the search used by :meth:`.Ensemble.iter_valid_slices`. It
+    only works with frame indices, so that it can be used with any way of
+    evaluating the ensemble functions on a window `[start:end]`.
+
+    Parameters
+    ----------
+    length : int
+        number of frames of the trajectory
+    strict_can_append : function(int, int, bool)
+        `strict_can_append` for the window `start, end`; the last
+        argument is the `trusted` flag
+    can_prepend : function(int, int, bool)
+        `can_prepend` for the window `start, end`; the last argument is the
+        `trusted` flag
+    call : function(int, int)
+        `__call__` for the window `start, end`
+    max_length : int > 0, optional
+        maximal size to be tested
+    min_length : int > 0, optional
+        minimal size to be tested
+    overlap : int >= 0, optional
+        allowed overlap of the windows found. Default is 1
+    reverse : bool
+        if `True` this will start searching from the end of the trajectory.
+
+    Returns
+    -------
+    iterator of `slice`
+        the slices of windows in the ensemble
+    """
+    if max_length is None:
+        max_length = length
+
+    max_length = min(length, max_length)
+    min_length = max(1, min_length)
+
+    old_tt_len = 0
+
+    if not reverse:
+        start = 0
+        end = start + min_length
+
+        while start <= length - min_length and end <= length:
+            # print start, end
+            len_tt = end - start
+            can_append_tt = strict_can_append(start, end,
+                                              len_tt == old_tt_len + 1)
+            old_tt_len = len_tt
+
+            if end < length and can_append_tt:
+                end += 1
+                if end - start > max_length + 1:
+                    start += 1
+                    end = start + min_length
+            else:
+                if end - start <= max_length and call(start, end):
+                    yield slice(start, end)
+                    pad = min(overlap, end - start - 1)
+                    start = end - pad
+                    if end == length:
+                        # This means we have reached the end and should stop
+                        # All other possible subtraj can only be contained
+                        # in already existing ones
+                        start = length
+                elif end - start >= min_length + 1 and \
+                        call(start, end - 1):
+                    yield slice(start, end - 1)
+                    pad = min(overlap + 1, end - start - 2)
+                    start = end - pad
+                else:
+                    # TODO: for some ensembles, there are better ways to
+                    # change start. For frame-by-frame ensembles
+                    # (AllInX, AllOutX) we know that we can completely
+                    # stop for all subtrajectories.
+                    start += 1
+                end = start + min_length
+
+    else:
+        end = length
+        start = end - min_length
+
+        while start >= 0 and end >= min_length:
+            len_tt = end - start
+            can_prepend_tt = can_prepend(start, end,
+                                         len_tt == old_tt_len + 1)
+            old_tt_len = len_tt
+
+            if start > 0 and can_prepend_tt:
+                start -= 1
+                if end - start > max_length + 1:
+                    end -= 1
+                    start = end - min_length
+            else:
+                if end - start <= max_length and call(start, end):
+                    yield slice(start, end)
+                    pad = min(overlap, end - start - 1)
+                    end = start + pad
+                    if start == 0:
+                        # This means we have reached the end and should stop
+                        # All other possible subtraj can only be contained
+                        # in already existing ones
+                        end = 0
+
+                elif end - start >= min_length + 1 and \
+                        call(start + 1, end):
+                    yield slice(start + 1, end)
+                    pad = min(overlap + 1, end - start - 2)
+                    end = start + pad
+                else:
+                    end -= 1
+
+                start = end - min_length
+
+
 # note: the cache is not storable, because that would just be silly!
 class EnsembleCache(object):
     """Object used by ensembles to enable fast algorithms for basic functions.
@@ -180,6 +299,544 @@ class EnsembleCache(object):
         return reset
 
 
+# note: checkers are not storable either; they only live during a run
+class EnsembleChecker(object):
+    """Streaming evaluation of an ensemble on a trajectory that grows.
+
+    A checker is bound to one ensemble and one direction. Frames are fed to
+    it one at a time (with :meth:`append` or :meth:`prepend`) and the
+    checker keeps enough state to answer `can_append` (direction > 0) or
+    `can_prepend` (direction < 0) for the trajectory seen so far. The
+    checkers of volume, crossing, combined, sequential, sliced and
+    reversed ensembles only process the new frame. This base class is the
+    generic fallback for all other ensembles: it keeps its own copy of the
+    trajectory and asks the ensemble with `trusted=False`, which scans the
+    whole trajectory for each new frame.
+
+    Checkers follow the untrusted (cache-free) definitions of the ensemble
+    functions, so their answers do not depend on the state of the caches.
+
+    A checker can also be used as a running condition for
+    :meth:`.DynamicsEngine.generate`: calling it with a trajectory syncs
+    its internal state (cheaply, if the trajectory grew by one frame) and
+    returns :attr:`can_extend`.
+
+    Attributes
+    ----------
+    ensemble : :class:`.Ensemble`
+        the ensemble that is checked
+    direction : +1 or -1
+        +1 to check `can_append`, -1 to check `can_prepend`
+    trajectory : :class:`.Trajectory`
+        the trajectory fed to the checker so far
+    """
+
+    def __init__(self, ensemble, direction=+1):
+        if direction not in [+1, -1]:
+            raise ValueError("direction must be +1 or -1, got " +
+                             str(direction))
+        self.ensemble = ensemble
+        self.direction = direction
+        self.trajectory = paths.Trajectory([])
+        self._values = {}
+        self.reset()
+
+    def reset(self, trajectory=None):
+        """Forget the state and start over from the given trajectory.
+
+        Parameters
+        ----------
+        trajectory : :class:`.Trajectory` or None
+            the trajectory to restart from; empty if None
+        """
+        if trajectory is None:
+            self.trajectory = paths.Trajectory([])
+        else:
+            self.trajectory = paths.Trajectory(trajectory.as_proxies())
+        self._values = {}
+        self._reset()
+
+    def append(self, snapshot):
+        """Add a frame at the end of the trajectory
+
+        Parameters
+        ----------
+        snapshot : :class:`.BaseSnapshot`
+            the new final frame
+        """
+        self.trajectory.append(snapshot)
+        self._values = {}
+        self._append(snapshot)
+
+    def prepend(self, snapshot):
+        """Add a frame at the beginning of the trajectory
+
+        Parameters
+        ----------
+        snapshot : :class:`.BaseSnapshot`
+            the new first frame
+        """
+        self.trajectory.insert(0, snapshot)
+        self._values = {}
+        self._prepend(snapshot)
+
+    def _reset(self):
+        """Rebuild the internal state from `self.trajectory`."""
+        pass
+
+    def _append(self, snapshot):
+        # the generic fallback has no state besides the trajectory
+        pass
+
+    def _prepend(self, snapshot):
+        pass
+
+    def _generic_value(self, key, function):
+        if key not in self._values:
+            self._values[key] = function(self.trajectory, trusted=False)
+        return self._values[key]
+
+    @property
+    def can_extend(self):
+        """bool : `can_append` or `can_prepend` of the current trajectory"""
+        if self.direction > 0:
+            return self._generic_value('can_extend', self.ensemble.can_append)
+        else:
+            return self._generic_value('can_extend',
+                                       self.ensemble.can_prepend)
+
+    @property
+    def in_ensemble(self):
+        """bool : whether the current trajectory is in the ensemble"""
+        if self.direction > 0:
+            return self._generic_value('in_ensemble', self.ensemble)
+        else:
+            return self._generic_value('in_ensemble',
+                                       self.ensemble.check_reverse)
+
+    def __call__(self, trajectory, trusted=False):
+        n_frames = len(self.trajectory)
+        if trusted and n_frames > 0 and len(trajectory) == n_frames + 1:
+            if (trajectory.get_as_proxy(0) ==
+                    self.trajectory.get_as_proxy(0) and
+                    trajectory.get_as_proxy(-2) ==
+                    self.trajectory.get_as_proxy(-1)):
+                self.append(trajectory.get_as_proxy(-1))
+                return self.can_extend
+            elif (trajectory.get_as_proxy(-1) ==
+                    self.trajectory.get_as_proxy(-1) and
+                    trajectory.get_as_proxy(1) ==
+                    self.trajectory.get_as_proxy(0)):
+                self.prepend(trajectory.get_as_proxy(0))
+                return self.can_extend
+
+        self.reset(trajectory)
+        return self.can_extend
+
+
+class AllInXEnsembleChecker(EnsembleChecker):
+    """Checker for :class:`.AllInXEnsemble`: keeps a running `all` flag.
+
+    Frames are only tested against the volume when a result is requested,
+    and only as long as all frames so far were inside.
+    """
+
+    def __init__(self, ensemble, direction=+1):
+        self._volume = ensemble._volume
+        super(AllInXEnsembleChecker, self).__init__(ensemble, direction)
+
+    def _reset(self):
+        self._all_in = True
+        self._pending = self.trajectory.as_proxies()
+
+    def _append(self, snapshot):
+        if self._all_in:
+            self._pending.append(snapshot)
+
+    _prepend = _append
+
+    def _update(self):
+        while self._all_in and self._pending:
+            self._all_in = self._volume(self._pending.pop())
+        if not self._all_in:
+            self._pending = []
+        return self._all_in
+
+    @property
+    def can_extend(self):
+        return len(self.trajectory) == 0 or self._update()
+
+    @property
+    def in_ensemble(self):
+        return len(self.trajectory) > 0 and self._update()
+
+
+class PartInXEnsembleChecker(EnsembleChecker):
+    """Checker for :class:`.PartInXEnsemble`: keeps a running `any` flag.
+    """
+
+    def __init__(self, ensemble, direction=+1):
+        self._volume = ensemble._volume
+        super(PartInXEnsembleChecker, self).__init__(ensemble, direction)
+
+    def _reset(self):
+        self._any_in = False
+        self._pending = self.trajectory.as_proxies()
+
+    def _append(self, snapshot):
+        if not self._any_in:
+            self._pending.append(snapshot)
+
+    _prepend = _append
+
+    @property
+    def can_extend(self):
+        return True
+
+    @property
+    def in_ensemble(self):
+        while not self._any_in and self._pending:
+            self._any_in = self._volume(self._pending.pop())
+        if self._any_in:
+            self._pending = []
+        return self._any_in
+
+
+class ExitsXEnsembleChecker(EnsembleChecker):
+    """Checker for :class:`.ExitsXEnsemble`: keeps a running `any` flag.
+
+    Besides the flag only the volume state of the first and the last frame
+    is kept, so a new frame at either end is tested once against the
+    volume and compared with its neighbor.
+    """
+
+    def __init__(self, ensemble, direction=+1):
+        self._volume = ensemble._volume
+        super(ExitsXEnsembleChecker, self).__init__(ensemble, direction)
+
+    @staticmethod
+    def _crossing(first_in, second_in):
+        # first and second frame in order of time
+        return first_in and not second_in
+
+    def _reset(self):
+        self._found = False
+        self._first_in = None
+        self._last_in = None
+        for snapshot in self.trajectory.as_proxies():
+            self._add(snapshot, at_end=True)
+
+    def _add(self, snapshot, at_end):
+        if self._found:
+            return
+
+        is_in = self._volume(snapshot)
+        if self._last_in is None:
+            self._first_in = self._last_in = is_in
+        elif at_end:
+            self._found = self._crossing(self._last_in, is_in)
+            self._last_in = is_in
+        else:
+            self._found = self._crossing(is_in, self._first_in)
+            self._first_in = is_in
+
+    def _append(self, snapshot):
+        self._add(snapshot, at_end=True)
+
+    def _prepend(self, snapshot):
+        self._add(snapshot, at_end=False)
+
+    @property
+    def can_extend(self):
+        return True
+
+    @property
+    def in_ensemble(self):
+        return self._found
+
+
+class EntersXEnsembleChecker(ExitsXEnsembleChecker):
+    """Checker for :class:`.EntersXEnsemble`.
+    """
+
+    @staticmethod
+    def _crossing(first_in, second_in):
+        return not first_in and second_in
+
+
+class SlicedTrajectoryEnsembleChecker(EnsembleChecker):
+    """Checker for :class:`.SlicedTrajectoryEnsemble`.
+
+    Feeds the frames of the slice to a checker of the wrapped ensemble. If
+    a new frame only extends the slice at one end, the frame is passed on.
+    If the slice is unchanged the result is kept. Otherwise, e.g. for a
+    window at the end of the trajectory or for slices with a step, the
+    wrapped checker is restarted with the slice.
+    """
+
+    def __init__(self, ensemble, direction=+1):
+        self._checker = ensemble.ensemble.checker(direction)
+        self._region = ensemble.region
+        super(SlicedTrajectoryEnsembleChecker, self).__init__(ensemble,
+                                                              direction)
+
+    def _bounds(self):
+        start, stop, step = self._region.indices(len(self.trajectory))
+        return max(start, 0), max(stop, start, 0), step
+
+    def _reset(self):
+        self._start, self._stop, _ = self._bounds()
+        self._checker.reset(self.trajectory[self._region])
+
+    def _update(self, shift):
+        # shift is the change of the indices of the old frames
+        old_start, old_stop = self._start + shift, self._stop + shift
+        start, stop, step = self._bounds()
+        self._start, self._stop = start, stop
+        if step != 1:
+            self._checker.reset(self.trajectory[self._region])
+        elif start == old_start and stop == old_stop:
+            pass
+        elif start == old_start and stop == old_stop + 1:
+            self._checker.append(self.trajectory.get_as_proxy(stop - 1))
+        elif start == old_start - 1 and stop == old_stop:
+            self._checker.prepend(self.trajectory.get_as_proxy(start))
+        else:
+            self._checker.reset(self.trajectory[self._region])
+
+    def _append(self, snapshot):
+        self._update(0)
+
+    def _prepend(self, snapshot):
+        self._update(1)
+
+    @property
+    def can_extend(self):
+        return self._checker.can_extend
+
+    @property
+    def in_ensemble(self):
+        return self._checker.in_ensemble
+
+
+class ReversedTrajectoryEnsembleChecker(EnsembleChecker):
+    """Checker for :class:`.ReversedTrajectoryEnsemble`.
+
+    The wrapped ensemble sees the time reversed trajectory, so a frame
+    appended to the trajectory is prepended (reversed) for the checker of
+    the wrapped ensemble and vice versa.
+    """
+
+    def __init__(self, ensemble, direction=+1):
+        self._checker = ensemble.ensemble.checker(direction)
+        super(ReversedTrajectoryEnsembleChecker, self).__init__(ensemble,
+                                                                direction)
+
+    def _reset(self):
+        self._checker.reset(self.trajectory.reversed)
+
+    def _append(self, snapshot):
+        self._checker.prepend(snapshot.reversed)
+
+    def _prepend(self, snapshot):
+        self._checker.append(snapshot.reversed)
+
+    @property
+    def can_extend(self):
+        return self._checker.can_extend
+
+    @property
+    def in_ensemble(self):
+        return self._checker.in_ensemble
+
+
+class EnsembleCombinationChecker(EnsembleChecker):
+    """Checker for :class:`.EnsembleCombination`.
+
+    Both sub-checkers see every frame, but they are only evaluated if the
+    combined result depends on them.
+    """
+
+    def __init__(self, ensemble, direction=+1):
+        self.checker1 = ensemble.ensemble1.checker(direction)
+        self.checker2 = ensemble.ensemble2.checker(direction)
+        super(EnsembleCombinationChecker, self).__init__(ensemble, direction)
+
+    def _reset(self):
+        self.checker1.reset(self.trajectory)
+        self.checker2.reset(self.trajectory)
+
+    def _append(self, snapshot):
+        self.checker1.append(snapshot)
+        self.checker2.append(snapshot)
+
+    def _prepend(self, snapshot):
+        self.checker1.prepend(snapshot)
+        self.checker2.prepend(snapshot)
+
+    def _combine(self, attr):
+        fnc = self.ensemble.fnc
+        a = getattr(self.checker1, attr)
+        res_true = fnc(a, True)
+        if res_true == fnc(a, False):
+            return res_true
+        else:
+            return fnc(a, getattr(self.checker2, attr))
+
+    @property
+    def can_extend(self):
+        return self._combine('can_extend')
+
+    @property
+    def in_ensemble(self):
+        return self._combine('in_ensemble')
+
+
+class SequentialEnsembleChecker(EnsembleChecker):
+    """Checker for the `can_append`/`can_prepend` of a SequentialEnsemble.
+
+    Follows the same assignment of frames to subensembles as
+    :meth:`.SequentialEnsemble.can_append` (non-strict), but remembers
+    where the current subtrajectory starts and keeps a checker for it. A
+    new frame can only change the end of the last subtrajectory, so each
+    frame is fed to a subensemble checker at most once per choice of
+    starting subensemble. Membership (`in_ensemble`) uses the generic
+    fallback.
+
+    For direction < 0 the trajectory is processed in the order the frames
+    were added, with the subensembles in reversed order.
+    """
+
+    def __init__(self, ensemble, direction=+1):
+        self._ensembles = list(ensemble.ensembles)
+        if direction < 0:
+            self._ensembles.reverse()
+        super(SequentialEnsembleChecker, self).__init__(ensemble, direction)
+
+    def _reset(self):
+        self._restart(0)
+
+    def _restart(self, ens_first):
+        self._ens_first = ens_first
+        self._start_subtraj(ens_first, 0)
+
+    def _start_subtraj(self, ens_num, subtraj_first):
+        self._ens_num = ens_num
+        self._subtraj_first = subtraj_first
+        self._subtraj_final = subtraj_first
+        self._subtraj_checker = self._ensembles[ens_num].checker(
+            self.direction)
+        self._subtraj_can_extend = None
+        self._subtraj_done = False
+
+    def _frame(self, idx):
+        # idx-th frame in the order in which frames are added
+        if self.direction > 0:
+            return self.trajectory.get_as_proxy(idx)
+        else:
+            return self.trajectory.get_as_proxy(-1 - idx)
+
+    def _evaluate(self):
+        traj_final = len(self.trajectory)
+        final_ens = len(self._ensembles) - 1
+        while True:
+            checker = self._subtraj_checker
+            while not self._subtraj_done and self._subtraj_final < traj_final:
+                if self.direction > 0:
+                    checker.append(self._frame(self._subtraj_final))
+                else:
+                    checker.prepend(self._frame(self._subtraj_final))
+                if checker.can_extend or checker.in_ensemble:
+                    self._subtraj_can_extend = checker.can_extend
+                    self._subtraj_final += 1
+                else:
+                    self._subtraj_done = True
+
+            if self._subtraj_final > self._subtraj_first:
+                if not self._subtraj_done:
+                    # all frames assigned; the current subtrajectory might
+                    # still grow with the next frame
+                    if self._ens_num == final_ens:
+                        return self._subtraj_can_extend
+                    else:
+                        return True
+                elif self._ens_num == final_ens:
+                    return False  # in final ensemble, not all assigned
+                else:
+                    self._start_subtraj(self._ens_num + 1,
+                                        self._subtraj_final)
+            elif self._subtraj_final == traj_final:
+                return True
+            elif (self._ens_num < final_ens and
+                  self._ensembles[self._ens_num](paths.Trajectory([]))):
+                self._start_subtraj(self._ens_num + 1, self._subtraj_final)
+            elif self._ens_first == final_ens:
+                return False
+            else:
+                self._restart(self._ens_first + 1)
+
+    @property
+    def can_extend(self):
+        if 'can_extend' not in self._values:
+            self._values['can_extend'] = self._evaluate()
+        return self._values['can_extend']
+
+
+class PrefixTrajectoryEnsembleChecker(EnsembleChecker):
+    """Checker for the `can_append` of a PrefixTrajectoryEnsemble."""
+
+    def __init__(self, ensemble, direction=+1):
+        self._checker = ensemble._new_ensemble.checker(+1)
+        super(PrefixTrajectoryEnsembleChecker, self).__init__(ensemble,
+                                                              direction)
+
+    def _reset(self):
+        self._checker.reset(self.ensemble.add_trajectory + self.trajectory)
+
+    def _append(self, snapshot):
+        self._checker.append(snapshot)
+
+    @property
+    def can_extend(self):
+        return self._checker.can_extend
+
+    @property
+    def in_ensemble(self):
+        return self._checker.in_ensemble
+
+
+class SuffixTrajectoryEnsembleChecker(EnsembleChecker):
+    """Checker for the `can_prepend` of a SuffixTrajectoryEnsemble.
+
+    As for the ensemble itself, the trajectory given to this checker is
+    grown forward (appended) and reversed before it is put in front of the
+    `add_trajectory`.
+    """
+
+    def __init__(self, ensemble, direction=-1):
+        self._checker = ensemble._new_ensemble.checker(-1)
+        super(SuffixTrajectoryEnsembleChecker, self).__init__(ensemble,
+                                                              direction)
+
+    def _reset(self):
+        self._checker.reset(self.trajectory.reversed +
+                            self.ensemble.add_trajectory)
+
+    def _append(self, snapshot):
+        self._checker.prepend(snapshot)
+
+    def _prepend(self, snapshot):
+        self._reset()
+
+    @property
+    def can_extend(self):
+        return self._checker.can_extend
+
+    @property
+    def in_ensemble(self):
+        return self._checker.in_ensemble
+
+
 class Ensemble(StorableNamedObject):
     """
     Path ensemble object.
@@ -358,6 +1015,45 @@ class Ensemble(StorableNamedObject):
         # default behavior is to be the same as can_prepend
         return self.can_prepend(trajectory, trusted)
 
+    def checker(self, direction=+1):
+        """
+        Returns a checker that evaluates this ensemble frame by frame.
+
+        Checkers give the same answers as `can_append` (or `can_prepend`)
+        for a trajectory that grows one frame at a time, but only process
+        each new frame instead of the whole trajectory. Calling the checker
+        with a trajectory makes it usable as a running condition in
+        :meth:`.DynamicsEngine.generate`.
+
+        Parameters
+        ----------
+        direction : +1 or -1
+            +1 to check `can_append` while appending frames, -1 to check
+            `can_prepend` while prepending frames
+
+        Returns
+        -------
+        :class:`.EnsembleChecker`
+            a new checker for this ensemble with an empty trajectory
+        """
+        return EnsembleChecker(self, direction)
+
+    def compiled(self):
+        """
+        Returns a version of this ensemble for fast analysis of trajectories
+
+        See :class:`.CompiledEnsemble`: all volumes are evaluated once per
+        frame, and the ensemble functions are computed from the results.
+        This is useful when testing many sub-trajectories of a trajectory,
+        e.g. with :meth:`split`.
+
+        Returns
+        -------
+        :class:`.CompiledEnsemble`
+            the compiled ensemble
+        """
+        return paths.CompiledEnsemble(self)
+
     def iter_valid_slices(
             self,
             trajectory,
@@ -393,97 +1089,21 @@ class Ensemble(StorableNamedObject):
             Returns a list of index-slices for sub-trajectories in
             trajectory that are in the ensemble.
         """
-        length = len(trajectory)
-
-        if max_length is None:
-            max_length = length
-
-        max_length = min(length, max_length)
-        min_length = max(1, min_length)
-
         logger.debug("Looking for subtrajectories in " + str(trajectory))
-        old_tt_len = 0
-
-        if not reverse:
-            start = 0
-            end = start + min_length
-
-            while start <= length - min_length and end <= length:
-                # print start, end
-                tt = trajectory[start:end]
-
-                if len(tt) != old_tt_len + 1:
-                    can_append_tt = self.strict_can_append(tt)
-                else:
-                    can_append_tt = self.strict_can_append(tt, trusted=True)
-                old_tt_len = len(tt)
-
-                if end < length and can_append_tt:
-                    end += 1
-                    if end - start > max_length + 1:
-                        start += 1
-                        end = start + min_length
-                else:
-                    if end - start <= max_length and self(tt, trusted=False):
-                        yield slice(start, end)
-                        pad = min(overlap, end - start - 1)
-                        start = end - pad
-                        if end == length:
-                            # This means we have reached the end and should stop
-                            # All other possible subtraj can only be contained
-                            # in already existing ones
-                            start = length
-                    elif end - start >= min_length + 1 and \
-                            self(tt[0:len(tt) - 1], trusted=False):
-                        yield slice(start, end - 1)
-                        pad = min(overlap + 1, end - start - 2)
-                        start = end - pad
-                    else:
-                        # TODO: for some ensembles, there are better ways to
-                        # change start. For frame-by-frame ensembles
-                        # (AllInX, AllOutX) we know that we can completely
-                        # stop for all subtrajectories.
-                        start += 1
-                    end = start + min_length
-
-        else:
-            end = length
-            start = end - min_length
-
-            while start >= 0 and end >= min_length:
-                tt = trajectory[start:end]
-
-                if len(tt) != old_tt_len + 1:
-                    can_prepend_tt = self.can_prepend(tt)
-                else:
-                    can_prepend_tt = self.can_prepend(tt, trusted=True)
-                old_tt_len = len(tt)
-
-                if start > 0 and can_prepend_tt:
-                    start -= 1
-                    if end - start > max_length + 1:
-                        end -= 1
-                        start = end - min_length
-                else:
-                    if end - start <= max_length and self(tt, trusted=False):
-                        yield slice(start, end)
-                        pad = min(overlap, end - start - 1)
-                        end = start + pad
-                        if start == 0:
-                            # This means we have reached the end and should stop
-                            # All other possible subtraj can only be contained
-                            # in already existing ones
-                            end = 0
-
-                    elif end - start >= min_length + 1 and \
-                            self(tt[1:len(tt)], trusted=False):
-                        yield slice(start + 1, end)
-                        pad = min(overlap + 1, end - start - 2)
-                        end = start + pad
-                    else:
-                        end -= 1
 
-                    start = end - min_length
+        return iter_valid_windows(
+            length=len(trajectory),
+            strict_can_append=lambda start, end, trusted:
+                self.strict_can_append(trajectory[start:end], trusted),
+            can_prepend=lambda start, end, trusted:
+                self.can_prepend(trajectory[start:end], trusted),
+            call=lambda start, end: self(trajectory[start:end],
+                                         trusted=False),
+            max_length=max_length,
+            min_length=min_length,
+            overlap=overlap,
+            reverse=reverse
+        )
 
     def iter_extendable_slices(
             self,
@@ -1357,6 +1977,9 @@ class EnsembleCombination(Ensemble):
             fname="strict_can_prepend"
         )
 
+    def checker(self, direction=+1):
+        return EnsembleCombinationChecker(self, direction)
+
     def _str(self):
         # print self.sfnc, self.ensemble1, self.ensemble2,
         # print self.sfnc.format(
@@ -1981,6 +2604,9 @@ class SequentialEnsemble(Ensemble):
     def strict_can_prepend(self, trajectory, trusted=False):
         return self._generic_can_prepend(trajectory, trusted, strict=True)
 
+    def checker(self, direction=+1):
+        return SequentialEnsembleChecker(self, direction)
+
     def _str(self):
         head = "[\n"
         tail = "\n]"
@@ -2178,6 +2804,9 @@ class AllInXEnsemble(VolumeEnsemble):
             # print "Rev UnTrusted"
             return self(trajectory)  # in this case, order wouldn't matter
 
+    def checker(self, direction=+1):
+        return AllInXEnsembleChecker(self, direction)
+
     def __invert__(self):
         return PartOutXEnsemble(self.volume, self.trusted)
 
@@ -2223,6 +2852,9 @@ class PartInXEnsemble(VolumeEnsemble):
                 return True
         return False
 
+    def checker(self, direction=+1):
+        return PartInXEnsembleChecker(self, direction)
+
     def __invert__(self):
         return AllOutXEnsemble(self.volume, self.trusted)
 
@@ -2276,6 +2908,9 @@ class ExitsXEnsemble(VolumeEnsemble):
                     return True
         return False
 
+    def checker(self, direction=+1):
+        return ExitsXEnsembleChecker(self, direction)
+
 
 class EntersXEnsemble(ExitsXEnsemble):
     """
@@ -2299,6 +2934,9 @@ class EntersXEnsemble(ExitsXEnsemble):
                     return True
         return False
 
+    def checker(self, direction=+1):
+        return EntersXEnsembleChecker(self, direction)
+
 
 class WrappedEnsemble(Ensemble):
     """
@@ -2345,6 +2983,10 @@ class WrappedEnsemble(Ensemble):
         return self._new_ensemble.strict_can_prepend(self._alter(trajectory),
                                                      trusted)
 
+    def checker(self, direction=+1):
+        # without _alter this ensemble behaves exactly like _new_ensemble
+        return self._new_ensemble.checker(direction)
+
 
 class SlicedTrajectoryEnsemble(WrappedEnsemble):
     """
@@ -2364,6 +3006,9 @@ class SlicedTrajectoryEnsemble(WrappedEnsemble):
     def _alter(self, trajectory):
         return trajectory[self.region]
 
+    def checker(self, direction=+1):
+        return SlicedTrajectoryEnsembleChecker(self, direction)
+
     def _str(self):
         # TODO: someday may add different string support for slices with
         # only one frame
@@ -2420,6 +3065,11 @@ class SuffixTrajectoryEnsemble(WrappedEnsemble):
         # can_append does
         return self.can_append(trajectory, trusted)
 
+    def checker(self, direction=-1):
+        if direction > 0:
+            return EnsembleChecker(self, direction)
+        return SuffixTrajectoryEnsembleChecker(self, direction)
+
 
 class PrefixTrajectoryEnsemble(WrappedEnsemble):
     """
@@ -2465,6 +3115,11 @@ class PrefixTrajectoryEnsemble(WrappedEnsemble):
         # can_append does
         return self.can_prepend(trajectory, trusted)
 
+    def checker(self, direction=+1):
+        if direction < 0:
+            return EnsembleChecker(self, direction)
+        return PrefixTrajectoryEnsembleChecker(self, direction)
+
 
 class ReversedTrajectoryEnsemble(WrappedEnsemble):
     """
@@ -2472,7 +3127,10 @@ class ReversedTrajectoryEnsemble(WrappedEnsemble):
     """
 
     def _alter(self, trajectory):
-        return trajectory.reverse()
+        return trajectory.reversed
+
+    def checker(self, direction=+1):
+        return ReversedTrajectoryEnsembleChecker(self, direction)
 
 
 class AppendedNameEnsemble(WrappedEnsemble):
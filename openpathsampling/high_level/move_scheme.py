@@ -684,6 +684,11 @@ class MoveScheme(StorableNamedObject):
         return line
 
     def move_acceptance(self, steps):
+        table = paths.storage.StepStatistics.from_steps(steps)
+        if table is not None:
+            self._move_acceptance_from_table(table)
+            return
+
         for step in steps:
             delta = step.change
             for m in delta:
@@ -699,6 +704,33 @@ class MoveScheme(StorableNamedObject):
                 except KeyError:
                     self._mover_acceptance[key] = [acc, is_trial]
 
+    def _move_acceptance_from_table(self, table):
+        """
+        Count the accepted moves using the statistics table of the steps
+
+        Gives the same result as `move_acceptance` but reads only the
+        :class:`openpathsampling.storage.StepStatistics` and does not load
+        the move changes.
+        """
+        # the table returns the same keylist for steps with the same tree
+        keys = {}
+        for pos in range(len(table)):
+            keylist = table.keylist(pos)
+            if id(keylist) not in keys:
+                movers = table.movers[pos]
+                keys[id(keylist)] = [
+                    ((table.mover(movers[node]), str(key)), node)
+                    for key, node in keylist]
+
+            accepted = table.accepted[pos]
+            for key, node in keys[id(keylist)]:
+                acc = 1 if accepted[node] else 0
+                try:
+                    self._mover_acceptance[key][0] += acc
+                    self._mover_acceptance[key][1] += 1
+                except KeyError:
+                    self._mover_acceptance[key] = [acc, 1]
+
     def move_summary(
             self, steps, movers=None, output=sys.stdout, depth=0):
         """
@@ -1,7 +1,9 @@
 from base import StorableNamedObject, StorableObject, create_to_dict
+from buffer import WriteBuffer, BackgroundWriter
 from cache import WeakKeyCache, WeakLRUCache, WeakValueCache, MaxCache, \
-    NoCache, Cache, LRUCache, LRUChunkLoadingCache
+    NoCache, Cache, LRUCache, LRUChunkLoadingCache, SizeAwareCache
 from dictify import ObjectJSON, StorableObjectJSON, UUIDObjectJSON
+from binary import ObjectBinary, UUIDObjectBinary
 from netcdfplus import NetCDFPlus
 
 from stores import ObjectStore
@@ -12,3 +14,4 @@ from stores import NamedObjectStore, UniqueNamedObjectStore
 
 from proxy import DelayedLoader, lazy_loading_attributes, LoaderProxy
 from util import with_timing_logging
+from uuidindex import UUIDArray
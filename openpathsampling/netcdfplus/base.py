@@ -1,5 +1,7 @@
 import inspect
 import logging
+import random
+import threading
 import weakref
 import uuid
 from types import MethodType
@@ -29,10 +31,35 @@ class StorableObject(object):
             )
         ))
 
+    # objects might be created in several threads at once, e.g. by
+    # simulations that run moves concurrently
+    _uuid_lock = threading.Lock()
+
     @staticmethod
     def get_uuid():
-        StorableObject.ACTIVE_LONG += 2
-        return StorableObject.ACTIVE_LONG
+        with StorableObject._uuid_lock:
+            StorableObject.ACTIVE_LONG += 2
+            return StorableObject.ACTIVE_LONG
+
+    @staticmethod
+    def new_uuid_range():
+        """
+        Continue with a new range of uuids in this process
+
+        A forked process inherits the uuid counter of its parent, so both
+        would create objects with the same uuids. Calling this in the new
+        process avoids that.
+        """
+        clock_seq = random.SystemRandom().getrandbits(14)
+        with StorableObject._uuid_lock:
+            StorableObject.INSTANCE_UUID = list(
+                uuid.uuid1(clock_seq=clock_seq).fields[:-1])
+            StorableObject.ACTIVE_LONG = int(uuid.UUID(
+                fields=tuple(
+                    StorableObject.INSTANCE_UUID +
+                    [StorableObject.CREATION_COUNT]
+                )
+            ))
 
     def reverse_uuid(self):
         return self.__uuid__ ^ 1
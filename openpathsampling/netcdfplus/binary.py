@@ -0,0 +1,430 @@
+import abc
+import struct
+
+import numpy as np
+from simtk import unit as units
+import ujson
+
+__author__ = 'Jan-Hendrik Prinz'
+
+
+class ObjectBinary(object):
+    """
+    A binary alternative to the JSON serialization of an `ObjectJSON`
+
+    The result contains the same information as the JSON string but numbers
+    and numpy arrays are written in their binary representation and
+    strings like class names or dictionary keys are written only once per
+    serialized object. The encoding function for each class is looked up
+    only once and then reused. Everything that has no binary encoding
+    (functions, modules, types, ...) is embedded as JSON created by the
+    `simplifier`.
+
+    Attributes
+    ----------
+    simplifier : :class:`openpathsampling.netcdfplus.ObjectJSON`
+        the JSON serializer used for the class list, units and all objects
+        without binary representation
+    """
+
+    version = '\x01'
+
+    _int64 = struct.Struct('<q')
+    _float64 = struct.Struct('<d')
+    _uint32 = struct.Struct('<I')
+    _uuid = struct.Struct('<QQ')
+
+    _mask64 = (1 << 64) - 1
+
+    def __init__(self, simplifier):
+        self.simplifier = simplifier
+        self._encoders = {}
+        self._decoders = {
+            'N': self._dec_none,
+            'T': self._dec_true,
+            'F': self._dec_false,
+            'i': self._dec_int,
+            'L': self._dec_long,
+            'f': self._dec_float,
+            's': self._dec_str,
+            'r': self._dec_str_ref,
+            'u': self._dec_unicode,
+            'l': self._dec_list,
+            't': self._dec_tuple,
+            'd': self._dec_dict,
+            'a': self._dec_array,
+            'n': self._dec_scalar,
+            'q': self._dec_quantity,
+            'o': self._dec_object,
+            'x': self._dec_json
+        }
+
+    # ==========================================================================
+    # ENCODING
+    # ==========================================================================
+
+    def to_binary(self, obj, base_type=''):
+        """
+        Serialize an object
+
+        Parameters
+        ----------
+        obj : object
+        base_type : str
+            the base class name of the object that contains `obj`
+
+        Returns
+        -------
+        str
+            the binary serialization
+        """
+        out = [self.version]
+        self._encode(obj, base_type, out, {})
+        return ''.join(out)
+
+    def to_binary_object(self, obj):
+        """
+        Serialize a storable object, but not as a reference to a store
+
+        Same as `ObjectJSON.to_json_object`
+
+        Parameters
+        ----------
+        obj : object
+
+        Returns
+        -------
+        str
+            the binary serialization
+        """
+        if hasattr(obj, 'base_cls') \
+                and type(obj) is not type and type(obj) is not abc.ABCMeta:
+            out = [self.version]
+            self._enc_dict_object(obj, obj.base_cls_name, out, {})
+            return ''.join(out)
+        else:
+            return self.to_binary(obj)
+
+    def _encode(self, obj, base_type, out, strings):
+        cls = obj.__class__
+        try:
+            encoder = self._encoders[cls]
+        except KeyError:
+            encoder = self._encoder_for_class(cls)
+            self._encoders[cls] = encoder
+
+        encoder(obj, base_type, out, strings)
+
+    def _encoder_for_class(self, cls):
+        if cls is type(None):
+            return self._enc_none
+        elif cls is bool:
+            return self._enc_bool
+        elif cls is int or cls is long:
+            return self._enc_int
+        elif cls is float:
+            return self._enc_float
+        elif cls is str:
+            return self._enc_str
+        elif cls is unicode:
+            return self._enc_unicode
+        elif cls is list:
+            return self._enc_list
+        elif cls is tuple:
+            return self._enc_tuple
+        elif cls is dict:
+            return self._enc_dict
+        elif cls is np.ndarray:
+            return self._enc_array
+        elif issubclass(cls, np.generic) and cls is not np.object_:
+            return self._enc_scalar
+        elif cls is units.Quantity:
+            return self._enc_quantity
+        elif issubclass(cls, type) or cls.__name__ == 'module':
+            return self._enc_json
+        elif hasattr(cls, 'to_dict'):
+            return self._enc_object
+        else:
+            return self._enc_json
+
+    def _write_bytes(self, data, out):
+        out.append(self._uint32.pack(len(data)))
+        out.append(data)
+
+    def _enc_none(self, obj, base_type, out, strings):
+        out.append('N')
+
+    def _enc_bool(self, obj, base_type, out, strings):
+        out.append('T' if obj else 'F')
+
+    def _enc_int(self, obj, base_type, out, strings):
+        if -(1 << 63) <= obj < (1 << 63):
+            out.append('i')
+            out.append(self._int64.pack(obj))
+        else:
+            out.append('L')
+            self._write_bytes(str(obj), out)
+
+    def _enc_float(self, obj, base_type, out, strings):
+        out.append('f')
+        out.append(self._float64.pack(obj))
+
+    def _enc_str(self, obj, base_type, out, strings):
+        # strings are numbered in the order of appearance and repeated
+        # strings are written as a reference to the first appearance
+        pos = strings.get(obj)
+        if pos is None:
+            strings[obj] = len(strings)
+            out.append('s')
+            self._write_bytes(obj, out)
+        else:
+            out.append('r')
+            out.append(self._uint32.pack(pos))
+
+    def _enc_unicode(self, obj, base_type, out, strings):
+        out.append('u')
+        self._write_bytes(obj.encode('utf-8'), out)
+
+    def _enc_list(self, obj, base_type, out, strings):
+        out.append('l')
+        out.append(self._uint32.pack(len(obj)))
+        for item in obj:
+            self._encode(item, base_type, out, strings)
+
+    def _enc_tuple(self, obj, base_type, out, strings):
+        out.append('t')
+        out.append(self._uint32.pack(len(obj)))
+        for item in obj:
+            self._encode(item, base_type, out, strings)
+
+    def _enc_dict(self, obj, base_type, out, strings):
+        # like `ObjectJSON` the values in a dict do not keep the base_type
+        excluded = self.simplifier.excluded_keys
+        items = [
+            (key, value) for key, value in obj.iteritems()
+            if key not in excluded]
+
+        out.append('d')
+        out.append(self._uint32.pack(len(items)))
+        for key, value in items:
+            self._encode(key, '', out, strings)
+            self._encode(value, '', out, strings)
+
+    def _enc_array(self, obj, base_type, out, strings):
+        if obj.dtype.hasobject:
+            self._enc_json(obj, base_type, out, strings)
+            return
+
+        out.append('a')
+        self._enc_str(obj.dtype.str, '', out, strings)
+        out.append(self._uint32.pack(obj.ndim))
+        out.append(struct.pack('<%dq' % obj.ndim, *obj.shape))
+        self._write_bytes(np.ascontiguousarray(obj).tostring(), out)
+
+    def _enc_scalar(self, obj, base_type, out, strings):
+        out.append('n')
+        self._enc_str(obj.dtype.str, '', out, strings)
+        self._write_bytes(obj.tostring(), out)
+
+    def _enc_quantity(self, obj, base_type, out, strings):
+        if self.simplifier.unit_system is not None:
+            # the conversion is only done by the simplifier
+            self._enc_json(obj, base_type, out, strings)
+            return
+
+        out.append('q')
+        self._encode(obj._value, base_type, out, strings)
+        self._encode(
+            self.simplifier.unit_to_dict(obj.unit), '', out, strings)
+
+    def _enc_object(self, obj, base_type, out, strings):
+        self._enc_dict_object(obj, base_type, out, strings)
+
+    def _enc_dict_object(self, obj, base_type, out, strings):
+        out.append('o')
+        self._enc_str(obj.__class__.__name__, '', out, strings)
+        self._encode(obj.to_dict(), base_type, out, strings)
+
+    def _enc_json(self, obj, base_type, out, strings):
+        out.append('x')
+        self._write_bytes(
+            ujson.dumps(self.simplifier.simplify(obj, base_type)), out)
+
+    # ==========================================================================
+    # DECODING
+    # ==========================================================================
+
+    def from_binary(self, data):
+        """
+        Create an object from its binary serialization
+
+        Parameters
+        ----------
+        data : str
+            the result of :meth:`to_binary` or :meth:`to_binary_object`
+
+        Returns
+        -------
+        object
+        """
+        if data[:1] != self.version:
+            raise ValueError(
+                'Unknown binary serialization version %r' % data[:1])
+
+        obj, _ = self._decode(data, 1, [])
+        return obj
+
+    def _decode(self, data, pos, strings):
+        return self._decoders[data[pos]](data, pos + 1, strings)
+
+    def _read_bytes(self, data, pos):
+        length, = self._uint32.unpack_from(data, pos)
+        pos += 4
+        return data[pos:pos + length], pos + length
+
+    def _dec_none(self, data, pos, strings):
+        return None, pos
+
+    def _dec_true(self, data, pos, strings):
+        return True, pos
+
+    def _dec_false(self, data, pos, strings):
+        return False, pos
+
+    def _dec_int(self, data, pos, strings):
+        value, = self._int64.unpack_from(data, pos)
+        return value, pos + 8
+
+    def _dec_long(self, data, pos, strings):
+        value, pos = self._read_bytes(data, pos)
+        return long(value), pos
+
+    def _dec_float(self, data, pos, strings):
+        value, = self._float64.unpack_from(data, pos)
+        return value, pos + 8
+
+    def _dec_str(self, data, pos, strings):
+        value, pos = self._read_bytes(data, pos)
+        strings.append(value)
+        return value, pos
+
+    def _dec_str_ref(self, data, pos, strings):
+        ref, = self._uint32.unpack_from(data, pos)
+        return strings[ref], pos + 4
+
+    def _dec_unicode(self, data, pos, strings):
+        value, pos = self._read_bytes(data, pos)
+        return value.decode('utf-8'), pos
+
+    def _dec_items(self, data, pos, strings):
+        length, = self._uint32.unpack_from(data, pos)
+        pos += 4
+        items = []
+        for _ in xrange(length):
+            item, pos = self._decode(data, pos, strings)
+            items.append(item)
+
+        return items, pos
+
+    def _dec_list(self, data, pos, strings):
+        return self._dec_items(data, pos, strings)
+
+    def _dec_tuple(self, data, pos, strings):
+        items, pos = self._dec_items(data, pos, strings)
+        return tuple(items), pos
+
+    def _dec_dict(self, data, pos, strings):
+        length, = self._uint32.unpack_from(data, pos)
+        pos += 4
+        result = {}
+        for _ in xrange(length):
+            key, pos = self._decode(data, pos, strings)
+            value, pos = self._decode(data, pos, strings)
+            result[key] = value
+
+        return result, pos
+
+    def _dec_array(self, data, pos, strings):
+        dtype, pos = self._decode(data, pos, strings)
+        ndim, = self._uint32.unpack_from(data, pos)
+        pos += 4
+        shape = struct.unpack_from('<%dq' % ndim, data, pos)
+        pos += 8 * ndim
+        raw, pos = self._read_bytes(data, pos)
+        return np.frombuffer(raw, dtype=np.dtype(dtype)).reshape(shape), pos
+
+    def _dec_scalar(self, data, pos, strings):
+        dtype, pos = self._decode(data, pos, strings)
+        raw, pos = self._read_bytes(data, pos)
+        return np.frombuffer(raw, dtype=np.dtype(dtype))[0], pos
+
+    def _dec_quantity(self, data, pos, strings):
+        value, pos = self._decode(data, pos, strings)
+        unit_dict, pos = self._decode(data, pos, strings)
+        return value * self.simplifier.unit_from_dict(unit_dict), pos
+
+    def _dec_object(self, data, pos, strings):
+        cls_name, pos = self._decode(data, pos, strings)
+        attributes, pos = self._decode(data, pos, strings)
+
+        class_list = self.simplifier.class_list
+        if cls_name not in class_list:
+            self.simplifier.update_class_list()
+            class_list = self.simplifier.class_list
+            if cls_name not in class_list:
+                # same as `ObjectJSON.build`
+                return None, pos
+
+        return class_list[cls_name].from_dict(attributes), pos
+
+    def _dec_json(self, data, pos, strings):
+        value, pos = self._read_bytes(data, pos)
+        return self.simplifier.build(ujson.loads(value)), pos
+
+
+class UUIDObjectBinary(ObjectBinary):
+    """
+    Binary serialization that saves and references objects in a storage
+
+    Same as :class:`openpathsampling.netcdfplus.UUIDObjectJSON`, objects
+    with their own store are saved there and only their UUID is written.
+    """
+
+    def __init__(self, storage):
+        super(UUIDObjectBinary, self).__init__(storage.simplifier)
+        self.storage = storage
+        self._decoders['S'] = self._dec_storage
+        self._decoders['R'] = self._dec_reference
+
+    def _encoder_for_class(self, cls):
+        if cls is self.storage.__class__:
+            return self._enc_storage
+        else:
+            return super(UUIDObjectBinary, self)._encoder_for_class(cls)
+
+    def _enc_storage(self, obj, base_type, out, strings):
+        if obj is self.storage:
+            out.append('S')
+        else:
+            self._enc_json(obj, base_type, out, strings)
+
+    def _enc_object(self, obj, base_type, out, strings):
+        store = self.storage._obj_store.get(obj.__class__)
+        if store is not None and \
+                (not store.nestable or obj.base_cls_name != base_type):
+            store.save(obj)
+            uuid = obj.__uuid__
+            out.append('R')
+            self._enc_str(store.prefix, '', out, strings)
+            out.append(self._uuid.pack(uuid >> 64, uuid & self._mask64))
+        else:
+            self._enc_dict_object(obj, base_type, out, strings)
+
+    def _dec_storage(self, data, pos, strings):
+        return self.storage, pos
+
+    def _dec_reference(self, data, pos, strings):
+        prefix, pos = self._decode(data, pos, strings)
+        hi, lo = self._uuid.unpack_from(data, pos)
+        store = self.storage._stores[prefix]
+        return store.load((long(hi) << 64) | lo), pos + 16
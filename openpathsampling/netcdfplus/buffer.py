@@ -0,0 +1,384 @@
+import Queue
+import atexit
+import sys
+import threading
+
+import numpy as np
+
+__author__ = 'Jan-Hendrik Prinz'
+
+
+class WriteBuffer(object):
+    """
+    Write-behind buffer for single-row writes to netCDF variables
+
+    Values written to a single row of a variable are kept in memory and
+    written later. Consecutive rows of the same variable are written
+    together with a single slice assignment. This replaces many small
+    HDF5 writes with a few large ones.
+
+    The buffer is flushed when the estimated size of the pending values
+    exceeds `max_bytes`, and when :meth:`flush` is called. Storages flush all
+    buffers on `sync` and `close`. Rows that could not be written because a
+    write raised an error are pending again afterwards.
+
+    Attributes
+    ----------
+    max_bytes : int
+        flush all pending rows if their estimated size exceeds this value
+    writer : :obj:`BackgroundWriter` or None
+        if not `None` full buffers are written by this writer in the
+        background
+    """
+
+    default_max_bytes = 64 * 1024 * 1024
+
+    def __init__(self, max_bytes=None):
+        """
+        Parameters
+        ----------
+        max_bytes : int or None
+            the size limit in bytes. If `None` `default_max_bytes` is used
+        """
+        if max_bytes is None:
+            max_bytes = self.default_max_bytes
+
+        self.max_bytes = max_bytes
+        self.writer = None
+        self._pending = {}
+        self._submitted = []
+        self._bytes = 0
+
+    def __len__(self):
+        return sum(len(rows) for rows in self._pending.values())
+
+    @property
+    def nbytes(self):
+        """
+        int : the estimated size of all pending values in bytes
+        """
+        return self._bytes
+
+    def __str__(self):
+        return '%s(%d rows, %d/%d bytes)' % (
+            self.__class__.__name__,
+            len(self), self._bytes, self.max_bytes
+        )
+
+    @staticmethod
+    def row_index(key):
+        """
+        Return the row addressed by a variable key
+
+        Parameters
+        ----------
+        key : int or slice or tuple
+            the key used in `variable[key]`
+
+        Returns
+        -------
+        int or None
+            the row if `key` addresses exactly one complete row, otherwise
+            `None`
+        """
+        if type(key) is tuple:
+            if len(key) == 0 or any(
+                    type(k) is not slice or k != slice(None)
+                    for k in key[1:]):
+                return None
+
+            key = key[0]
+
+        if isinstance(key, (int, long, np.integer)) and key >= 0:
+            return int(key)
+
+        return None
+
+    @staticmethod
+    def _size(value):
+        if hasattr(value, 'nbytes'):
+            return value.nbytes
+        elif isinstance(value, basestring):
+            return len(value)
+        else:
+            return 8
+
+    @staticmethod
+    def _is_numeric(variable):
+        # vlen variables report the numpy type of their elements
+        return isinstance(variable.dtype, np.dtype) and \
+            not getattr(variable, '_isvlen', False)
+
+    def add(self, variable, idx, value):
+        """
+        Add a row to be written
+
+        Parameters
+        ----------
+        variable : `netCDF4.Variable`
+            the variable to write to
+        idx : int
+            the row in the variable
+        value
+            the netCDF compatible value for the row
+
+        Returns
+        -------
+        bool
+            `True` if the row was buffered. `False` if the value does not
+            match the shape of a row and needs to be written directly
+        """
+        # pending values are kept as they would be read from the file
+        if self._is_numeric(variable):
+            value = np.asarray(value, dtype=variable.dtype)
+            if value.shape != variable.shape[1:]:
+                return False
+
+            if value.ndim == 0:
+                value = value[()]
+
+        elif type(value) is str:
+            value = value.decode('utf-8')
+
+        elif isinstance(variable.dtype, np.dtype):
+            value = np.asarray(value, dtype=variable.dtype)
+
+        rows = self._pending.setdefault(variable, {})
+
+        if idx in rows:
+            self._bytes -= self._size(rows[idx])
+
+        rows[idx] = value
+        self._bytes += self._size(value)
+
+        if self._bytes > self.max_bytes:
+            self.flush_async()
+
+        return True
+
+    def get(self, variable, idx):
+        """
+        Return a pending row
+
+        Raises
+        ------
+        KeyError
+            if the row is not pending
+        """
+        return self._pending[variable][idx]
+
+    def is_pending(self, variable):
+        """
+        bool : `True` if rows of `variable` are waiting to be written
+        """
+        return variable in self._pending
+
+    def wait(self):
+        """
+        Wait until the background writer has written all rows handed to it
+        """
+        if self.writer is not None:
+            try:
+                self.writer.wait()
+            finally:
+                # all jobs are done, so rows left after an error are safe
+                # to take back. Newer rows are restored first and win
+                submitted = self._submitted
+                self._submitted = []
+                for pending in reversed(submitted):
+                    self._restore(pending)
+
+    def flush(self):
+        """
+        Write all pending rows to their variables
+        """
+        self.wait()
+
+        pending = self._pending
+        self._pending = {}
+        self._bytes = 0
+
+        try:
+            self._write_pending(pending)
+        finally:
+            self._restore(pending)
+
+    def flush_async(self):
+        """
+        Hand all pending rows to the background writer
+
+        Without a background writer this is the same as :meth:`flush`.
+        """
+        if self.writer is None:
+            self.flush()
+            return
+
+        pending = self._pending
+        self._pending = {}
+        self._bytes = 0
+
+        if pending:
+            try:
+                self.writer.submit(lambda: self._write_pending(pending))
+            except Exception:
+                self._restore(pending)
+                raise
+
+            self._submitted = [
+                submitted for submitted in self._submitted if submitted]
+            self._submitted.append(pending)
+
+    def _write_pending(self, pending):
+        # rows are only removed from `pending` once they are written
+        for variable in list(pending):
+            rows = pending[variable]
+            indices = sorted(rows)
+
+            start = 0
+            for pos in range(1, len(indices) + 1):
+                if pos == len(indices) or \
+                        indices[pos] != indices[pos - 1] + 1:
+                    written = indices[start:pos]
+                    self._write(
+                        variable,
+                        indices[start],
+                        [rows[idx] for idx in written])
+                    for idx in written:
+                        del rows[idx]
+
+                    start = pos
+
+            del pending[variable]
+
+    def _restore(self, pending):
+        # put back rows that were not written, unless they were replaced
+        for variable, rows in pending.items():
+            current = self._pending.setdefault(variable, {})
+            for idx, value in rows.items():
+                if idx not in current:
+                    current[idx] = value
+                    self._bytes += self._size(value)
+
+        pending.clear()
+
+    def _write(self, variable, first, values):
+        if len(values) == 1:
+            variable[first] = values[0]
+            return
+
+        if self._is_numeric(variable):
+            data = np.array(values, dtype=variable.dtype)
+        else:
+            data = np.empty(len(values), dtype=object)
+            for pos, value in enumerate(values):
+                data[pos] = value
+
+        variable[first:first + len(values)] = data
+
+
+class BackgroundWriter(object):
+    """
+    A thread that runs write jobs for a storage in the order submitted
+
+    Jobs wait in a bounded queue. If the queue is full :meth:`submit` blocks
+    until the thread has caught up. All other access to the file needs to
+    call :meth:`wait` first, since netCDF files cannot be used from two
+    threads at once. Errors raised in a job are raised again in the next
+    call to :meth:`submit` or :meth:`wait`.
+
+    Attributes
+    ----------
+    max_jobs : int
+        the maximal number of jobs waiting in the queue
+    """
+
+    default_max_jobs = 4
+
+    def __init__(self, max_jobs=None):
+        """
+        Parameters
+        ----------
+        max_jobs : int or None
+            the size of the queue. If `None` `default_max_jobs` is used
+        """
+        if max_jobs is None:
+            max_jobs = self.default_max_jobs
+
+        self.max_jobs = max_jobs
+        self._queue = Queue.Queue(max_jobs)
+        self._error = None
+
+        self._thread = threading.Thread(
+            target=self._run, name='netcdfplus-writer')
+        self._thread.daemon = True
+        self._thread.start()
+
+        # make sure all submitted jobs are run before python exits
+        atexit.register(self.wait)
+
+    def __str__(self):
+        return '%s(%d/%d jobs)' % (
+            self.__class__.__name__,
+            self._queue.unfinished_tasks, self.max_jobs
+        )
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+
+                if self._error is None:
+                    job()
+            except Exception:
+                self._error = sys.exc_info()
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise error[0], error[1], error[2]
+
+    @property
+    def busy(self):
+        """
+        bool : `True` if submitted jobs have not finished yet
+        """
+        return self._queue.unfinished_tasks > 0
+
+    def submit(self, job):
+        """
+        Queue a job to be run in the background
+
+        Parameters
+        ----------
+        job : callable
+            a function without arguments
+        """
+        if not self._thread.is_alive():
+            raise RuntimeError('The background writer has been stopped.')
+
+        self._raise_error()
+        self._queue.put(job)
+
+    def wait(self):
+        """
+        Wait until all submitted jobs have finished
+        """
+        if self.busy:
+            self._queue.join()
+
+        self._raise_error()
+
+    def stop(self):
+        """
+        Run all submitted jobs and stop the thread
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+        self._raise_error()
@@ -1,6 +1,9 @@
 from collections import OrderedDict
+import sys
 import weakref
 
+import numpy as np
+
 __author__ = 'Jan-Hendrik Prinz'
 
 
@@ -456,6 +459,41 @@ class LRUChunkLoadingCache(Cache):
                 if right > left:
                     chunk.extend(self.variable[left:right])
 
+    def load_chunks(self, chunk_idxs):
+        """
+        Load several chunks reading neighboring chunks at once
+
+        Parameters
+        ----------
+        chunk_idxs : iterable of int
+            the integer indices of the chunks to be loaded. Chunks that are
+            fully cached are not read again
+
+        """
+        chunksize = self.chunksize
+        missing = sorted(
+            chunk_idx for chunk_idx in set(chunk_idxs)
+            if 0 <= chunk_idx <= self._lastchunk_idx and (
+                chunk_idx not in self._chunkdict or
+                len(self._chunkdict[chunk_idx]) < chunksize))
+
+        start = 0
+        for pos in range(1, len(missing) + 1):
+            if pos == len(missing) or missing[pos] != missing[pos - 1] + 1:
+                left = missing[start] * chunksize
+                right = min(self._size, (missing[pos - 1] + 1) * chunksize)
+                values = self.variable[left:right]
+
+                for chunk_idx in missing[start:pos]:
+                    offset = chunk_idx * chunksize - left
+                    self._chunkdict.pop(chunk_idx, None)
+                    self._chunkdict[chunk_idx] = list(
+                        values[offset:offset + chunksize])
+
+                start = pos
+
+        self._check_size_limit()
+
     def _update_chunk_order(self, chunk_idx):
         if chunk_idx != self._firstchunk:
             chunk = self._chunkdict[chunk_idx]
@@ -516,7 +554,7 @@ class LRUChunkLoadingCache(Cache):
             self.update_size(key + 1)
 
     def _check_size_limit(self):
-        if len(self._chunkdict) > self.max_chunks:
+        while len(self._chunkdict) > self.max_chunks:
             self._chunkdict.popitem(last=False)
 
     def __contains__(self, item):
@@ -540,3 +578,283 @@ class LRUChunkLoadingCache(Cache):
         for chunk in reversed(self._chunkdict.values()):
             for key in reversed(chunk.keys()):
                 yield key
+
+
+def nbytes_of(value):
+    """
+    Estimate the memory footprint of a cached value in bytes
+
+    Numpy arrays and scalars report their buffer size, lists and tuples are
+    summed up recursively and everything else falls back to
+    `sys.getsizeof`.
+
+    Parameters
+    ----------
+    value : object
+        the value to be measured
+
+    Returns
+    -------
+    int
+        the estimated number of bytes
+
+    """
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.nbytes
+    elif isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(map(nbytes_of, value))
+    else:
+        return sys.getsizeof(value)
+
+
+class SizeAwareCache(Cache):
+    """
+    Implements a cache that is bounded by the memory used by its values
+
+    Each value is measured when it is added (see :func:`nbytes_of`) and
+    elements are evicted as soon as the total exceeds `max_bytes`. Eviction
+    follows either a Least Recently Used or a Least Frequently Used policy.
+    Evicted elements can be handed to a `spill` function instead of just
+    being dropped, e.g. to write them to a disk cache. Keys are held by
+    strong references and only the values count towards the budget.
+
+    Attributes
+    ----------
+    hits : int
+        number of successful lookups
+    misses : int
+        number of failed lookups
+    evictions : int
+        number of elements removed to stay within the budget
+    spilled : int
+        number of evicted elements passed on to `spill`
+
+    """
+
+    policies = ['lru', 'lfu']
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, policy='lru', spill=None):
+        """
+        Parameters
+        ----------
+        max_bytes : int
+            the maximal number of bytes held by the cached values. Default
+            is 256MB.
+        policy : str
+            the eviction policy, either `lru` (default) to evict the least
+            recently used or `lfu` to evict the least frequently used
+            element. Ties in `lfu` are resolved by recency.
+        spill : callable or None
+            if not `None` it is called as `spill(key, value)` for every
+            evicted element
+        """
+        super(SizeAwareCache, self).__init__()
+        if policy not in self.policies:
+            raise ValueError(
+                "policy must be one of %s" % ', '.join(self.policies))
+
+        self._max_bytes = max_bytes
+        self.policy = policy
+        self.spill = spill
+
+        # frequency -> keys in order of last access. With `lru` all keys
+        # stay in bucket 0
+        self._buckets = {}
+        self._entries = {}
+        self._nbytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spilled = 0
+
+    @property
+    def count(self):
+        return len(self._entries), 0
+
+    @property
+    def size(self):
+        return -1, 0
+
+    @property
+    def nbytes(self):
+        """
+        int : the number of bytes currently used by the cached values
+        """
+        return self._nbytes
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, new_size):
+        self._max_bytes = new_size
+        self._check_size_limit()
+
+    @property
+    def stats(self):
+        """
+        dict : the lookup and eviction statistics of the cache
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': float(self.hits) / lookups if lookups > 0 else 0.0,
+            'evictions': self.evictions,
+            'spilled': self.spilled,
+            'count': len(self._entries),
+            'nbytes': self._nbytes,
+            'max_bytes': self._max_bytes
+        }
+
+    def reset_stats(self):
+        """
+        Reset the lookup and eviction counters
+
+        """
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spilled = 0
+
+    def __str__(self):
+        return '%s(%d items, %d/%d bytes, %s)' % (
+            self.__class__.__name__,
+            len(self._entries),
+            self._nbytes,
+            self._max_bytes,
+            self.policy
+        )
+
+    def _link(self, key, freq):
+        bucket = self._buckets.get(freq)
+        if bucket is None:
+            bucket = OrderedDict()
+            self._buckets[freq] = bucket
+
+        bucket[key] = None
+
+    def _unlink(self, key, freq):
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if len(bucket) == 0:
+            del self._buckets[freq]
+
+    def _touch(self, key, entry):
+        freq = entry[2]
+        if self.policy == 'lfu':
+            entry[2] = freq + 1
+            self._link(key, freq + 1)
+            self._unlink(key, freq)
+        else:
+            bucket = self._buckets[freq]
+            del bucket[key]
+            bucket[key] = None
+
+    def __getitem__(self, item):
+        try:
+            entry = self._entries[item]
+        except KeyError:
+            self.misses += 1
+            raise
+
+        self.hits += 1
+        self._touch(item, entry)
+        return entry[0]
+
+    def get_silent(self, item, default=None):
+        """
+        Return item from the cache without updating order or statistics
+
+        Parameters
+        ----------
+        item : object
+            the key of the element to be retrieved from the cache
+        default : object
+            returned if item is not present in cache
+
+        Returns
+        -------
+        `object` or `None`
+            the requested object if it exists else `default`
+        """
+        try:
+            return self._entries[item][0]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value, **kwargs):
+        nbytes = nbytes_of(value)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._nbytes += nbytes - entry[1]
+            entry[0] = value
+            entry[1] = nbytes
+            self._touch(key, entry)
+        else:
+            self._entries[key] = [value, nbytes, 0]
+            self._nbytes += nbytes
+            self._link(key, 0)
+
+        self._check_size_limit(key)
+
+    def __delitem__(self, key):
+        entry = self._entries.pop(key)
+        self._nbytes -= entry[1]
+        self._unlink(key, entry[2])
+
+    def _check_size_limit(self, keep=None):
+        # the element just added is only evicted if it exceeds the budget on
+        # its own. Otherwise `lfu` would never admit new elements
+        while self._nbytes > self._max_bytes and len(self._entries) > 0:
+            key = self._victim(keep)
+            value = self._entries[key][0]
+            del self[key]
+            self.evictions += 1
+            if self.spill is not None:
+                self.spill(key, value)
+                self.spilled += 1
+
+    def _victim(self, keep):
+        for freq in sorted(self._buckets):
+            for key in self._buckets[freq]:
+                if key != keep:
+                    return key
+
+        return keep
+
+    def __contains__(self, item):
+        return item in self._entries
+
+    def keys(self):
+        return self._entries.keys()
+
+    def values(self):
+        return [entry[0] for entry in self._entries.itervalues()]
+
+    def items(self):
+        return [(key, entry[0]) for key, entry in self._entries.iteritems()]
+
+    def iteritems(self):
+        for key, entry in self._entries.iteritems():
+            yield key, entry[0]
+
+    def clear(self):
+        self._entries.clear()
+        self._buckets.clear()
+        self._nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        for freq in sorted(self._buckets, reverse=True):
+            for key in reversed(self._buckets[freq]):
+                yield key
+
+    def __reversed__(self):
+        for freq in sorted(self._buckets):
+            for key in self._buckets[freq]:
+                yield key
@@ -10,8 +10,11 @@ from uuid import UUID
 
 import netCDF4
 import numpy as np
+from buffer import BackgroundWriter
 from dictify import UUIDObjectJSON
+from binary import UUIDObjectBinary
 from stores import NamedObjectStore, ObjectStore
+from stores.object import HashedList
 from proxy import LoaderProxy
 
 logger = logging.getLogger(__name__)
@@ -44,6 +47,7 @@ class NetCDFPlus(netCDF4.Dataset):
         'str': str,
         'json': str,
         'jsonobj': str,
+        'binobj': np.uint8,
         'numpy.float32': np.float32,
         'numpy.float64': np.float64,
         'numpy.int8': np.int8,
@@ -60,6 +64,31 @@ class NetCDFPlus(netCDF4.Dataset):
         'uuid': str
     }
 
+    # Storage layout profiles for per object numeric variables of type
+    # `numpy.*` with more than one dimension, like coordinates or velocities.
+    # `chunk_bytes` is the size of a chunk spanning several objects. All
+    # other keys are passed to `createVariable`. `least_significant_digit`
+    # is only used for float variables with a unit.
+    layout_profiles = {
+        'default': {},
+        'write-optimized': {
+            'chunk_bytes': 256 * 1024
+        },
+        'scan-optimized': {
+            'chunk_bytes': 4 * 1024 * 1024,
+            'zlib': True,
+            'complevel': 1,
+            'shuffle': True
+        },
+        'compact': {
+            'chunk_bytes': 4 * 1024 * 1024,
+            'zlib': True,
+            'complevel': 6,
+            'shuffle': True,
+            'least_significant_digit': 4
+        }
+    }
+
     class ValueDelegate(object):
         """
         Value delegate for objects that implement __getitem__ and __setitem__
@@ -81,12 +110,21 @@ class NetCDFPlus(netCDF4.Dataset):
             on the variable
         store : openpathsampling.netcdfplus.ObjectStore
             a reference to an object store used for convenience in some cases
+        buffer : :obj:`openpathsampling.netcdfplus.WriteBuffer` or None
+            if not `None` single rows are not written immediately but
+            collected in the buffer. Reads of pending rows are answered
+            from the buffer
+        writer : :obj:`openpathsampling.netcdfplus.BackgroundWriter` or None
+            if not `None` all direct access to the variable waits until the
+            writer is idle
 
         """
 
         def __init__(self, variable, getter=None, setter=None, store=None):
             self.variable = variable
             self.store = store
+            self.buffer = None
+            self.writer = None
 
             if setter is None:
                 # None should not be used
@@ -101,9 +139,35 @@ class NetCDFPlus(netCDF4.Dataset):
             self.setter = setter
 
         def __setitem__(self, key, value):
-            self.variable[key] = self.setter(value)
+            value = self.setter(value)
+            buffer = self.buffer
+            if buffer is not None:
+                idx = buffer.row_index(key)
+                if idx is not None and buffer.add(self.variable, idx, value):
+                    return
+
+                buffer.flush()
+
+            if self.writer is not None:
+                self.writer.wait()
+
+            self.variable[key] = value
 
         def __getitem__(self, key):
+            buffer = self.buffer
+            if buffer is not None and buffer.is_pending(self.variable):
+                idx = buffer.row_index(key)
+                if idx is None:
+                    buffer.flush()
+                else:
+                    try:
+                        return self.getter(buffer.get(self.variable, idx))
+                    except KeyError:
+                        pass
+
+            if self.writer is not None:
+                self.writer.wait()
+
             return self.getter(self.variable[key])
 
         def __getattr__(self, item):
@@ -118,6 +182,29 @@ class NetCDFPlus(netCDF4.Dataset):
         def __len__(self):
             return len(self.variable)
 
+    class DelegateDict(dict):
+        """
+        Dict of variable delegates that creates missing delegates on access
+        """
+        def __init__(self, storage):
+            super(NetCDFPlus.DelegateDict, self).__init__()
+            self.storage = storage
+
+        def __missing__(self, key):
+            storage = self.storage
+            if key not in storage.variables:
+                raise KeyError(key)
+
+            storage.create_variable_delegate(key)
+            delegate = dict.__getitem__(self, key)
+
+            for store in storage.objects.values():
+                if store.write_buffer is not None and \
+                        key.startswith(store.prefix + '_'):
+                    delegate.buffer = store.write_buffer
+
+            return delegate
+
     @property
     def objects(self):
         """
@@ -170,7 +257,8 @@ class NetCDFPlus(netCDF4.Dataset):
         """
         pass
 
-    def __init__(self, filename, mode=None, fallback=None):
+    def __init__(self, filename, mode=None, fallback=None, layout=None,
+                 lazy=False, stores=None):
         """
         Create a storage for complex objects in a netCDF file
 
@@ -187,6 +275,18 @@ class NetCDFPlus(netCDF4.Dataset):
             in this storage. By default you will not try to resave objects
             that could be found in the fallback. Note that the fall back does
             only work if `use_uuid` is enabled
+        layout : str or None
+            the name of the storage layout profile in `layout_profiles` used
+            for new variables. It is stored in the file and existing files
+            always use their stored profile. If `None` the `default` profile
+            is used
+        lazy : bool
+            if `True` an existing file is opened without restoring the
+            stores. Each store and its index is restored when the store is
+            first used and variable delegates are created when first accessed
+        stores : list of str or None
+            if not `None` an existing file is opened lazily and only the
+            stores with the given names are restored right away
 
         Notes
         -----
@@ -198,6 +298,11 @@ class NetCDFPlus(netCDF4.Dataset):
         if mode is None:
             mode = 'a'
 
+        if layout is not None and layout not in self.layout_profiles:
+            raise ValueError(
+                "layout '%s' is not supported. Try one of %s" %
+                (layout, self.layout_profiles.keys()))
+
         exists = os.path.isfile(filename)
         if exists and mode == 'a':
             logger.info(
@@ -234,6 +339,9 @@ class NetCDFPlus(netCDF4.Dataset):
         # this can be set to false to re-store proxies from other stores
         self.exclude_proxy_from_other = False
 
+        # this can be set to false to never read from exported memory maps
+        self.use_mmap = True
+
         # call netCDF4-python to create or open .nc file
         super(NetCDFPlus, self).__init__(filename, mode)
 
@@ -245,6 +353,12 @@ class NetCDFPlus(netCDF4.Dataset):
             self.setncattr('format', 'netcdf+')
             self.setncattr('ncplus_version', self._netcdfplus_version_)
 
+            if layout is None:
+                layout = 'default'
+
+            self.layout = layout
+            self.setncattr('layout', layout)
+
             self.write_meta()
 
             # add shared scalar dimension for everyone
@@ -281,6 +395,16 @@ class NetCDFPlus(netCDF4.Dataset):
 
             self.check_version()
 
+            try:
+                self.layout = str(self.getncattr('layout'))
+            except AttributeError:
+                self.layout = 'default'
+
+            if layout is not None and layout != self.layout:
+                logger.info(
+                    "Ignoring layout '%s'. The file uses layout '%s'" %
+                    (layout, self.layout))
+
             # self.reference_by_uuid = hasattr(self, 'use_uuid')
             # self.reference_by_uuid = True
 
@@ -319,8 +443,14 @@ class NetCDFPlus(netCDF4.Dataset):
                     self.register_store(store.name, store)
                     store.register(self, store.name)
 
-            self.update_delegates()
-            self._restore_storages()
+            if lazy or stores is not None:
+                self._lazy = True
+                self._restore_storages(
+                    ['stores'] + list(stores) if stores is not None else
+                    ['stores'])
+            else:
+                self.update_delegates()
+                self._restore_storages()
 
             # call the subclass specific restore in case there is more stuff
             # to prepare
@@ -330,6 +460,7 @@ class NetCDFPlus(netCDF4.Dataset):
 
     def _create_simplifier(self):
         self.simplifier = UUIDObjectJSON(self)
+        self.binary_simplifier = UUIDObjectBinary(self)
 
     @property
     def file_size(self):
@@ -345,6 +476,143 @@ class NetCDFPlus(netCDF4.Dataset):
                 current /= 1024.0
         return "{0:.2f}{1}B".format(current, output_prefix)
 
+    def mmap_filename(self, var_name):
+        """
+        Return the filename of the memory map exported for a variable
+
+        Parameters
+        ----------
+        var_name : str
+            the full name of the netCDF variable
+
+        Returns
+        -------
+        str
+            the filename `{storage filename}.{var_name}.npy`
+        """
+        return '%s.%s.npy' % (self.filename, var_name)
+
+    def export_mmap(self, var_names=None, chunk_bytes=64 * 1024 * 1024):
+        """
+        Export numeric variables to uncompressed `.npy` files
+
+        The files are written next to the storage file and are used as
+        read-only memory maps by `mmap`. Export a closed file opened with
+        mode `r`. Any later change of the storage file makes the memory
+        maps invalid and they will not be used until exported again.
+
+        Parameters
+        ----------
+        var_names : list of str or None
+            the full names of the variables to be exported. If `None` all
+            per object numpy variables like coordinates, box vectors and
+            velocities are exported
+        chunk_bytes : int
+            the approximate size of the blocks copied at once
+
+        Returns
+        -------
+        list of str
+            the names of the written files
+        """
+        self.flush()
+
+        if var_names is None:
+            var_names = [
+                name for name, variable in self.variables.items()
+                if getattr(variable, 'var_type', '').startswith('numpy.') and
+                len(variable.dimensions) > 1 and
+                self.dimensions[variable.dimensions[0]].isunlimited()
+            ]
+
+        filenames = []
+        for var_name in var_names:
+            variable = self.variables[var_name]
+            filename = self.mmap_filename(var_name)
+            temp_filename = filename + '.part'
+
+            output = np.lib.format.open_memmap(
+                temp_filename, mode='w+',
+                dtype=variable.dtype, shape=variable.shape)
+
+            row_bytes = max(
+                1, variable.dtype.itemsize *
+                int(np.prod(variable.shape[1:])))
+            chunk_rows = max(1, chunk_bytes // row_bytes)
+
+            for left in range(0, variable.shape[0], chunk_rows):
+                right = min(variable.shape[0], left + chunk_rows)
+                output[left:right] = variable[left:right]
+
+            output.flush()
+            del output
+
+            os.rename(temp_filename, filename)
+            self._mmaps.pop(var_name, None)
+            filenames.append(filename)
+
+        return filenames
+
+    def export_uuid_index(self):
+        """
+        Export the uuids of all stores to compact `.npy` index files
+
+        The files are written next to the storage file. Opening the storage
+        again memory maps them instead of reading and hashing all stored
+        uuids. Objects stored after the export are read as usual, so the
+        index does not need to be exported again after every change.
+
+        Returns
+        -------
+        list of str
+            the names of the written files
+        """
+        return [
+            store.export_uuid_index()
+            for store in self.objects.values()
+            if isinstance(store.index, HashedList) and
+            store.prefix + '_uuid' in self.variables
+        ]
+
+    def mmap(self, var_name):
+        """
+        Return the exported memory map of a variable if it is valid
+
+        A memory map is valid if it was written after the last change of the
+        storage file and has the shape of the variable.
+
+        Parameters
+        ----------
+        var_name : str
+            the full name of the netCDF variable
+
+        Returns
+        -------
+        :obj:`numpy.memmap` or None
+            a read-only memory map or `None` if there is no valid one
+        """
+        if not self.use_mmap:
+            return None
+
+        self.wait_for_writer()
+
+        if var_name in self._mmaps:
+            mmap = self._mmaps[var_name]
+        else:
+            filename = self.mmap_filename(var_name)
+            mmap = None
+            if os.path.isfile(filename) and \
+                    os.path.getmtime(filename) >= \
+                    os.path.getmtime(self.filename):
+                mmap = np.load(filename, mmap_mode='r')
+
+            self._mmaps[var_name] = mmap
+
+        if mmap is None or mmap.shape != self.variables[var_name].shape:
+            return None
+
+        return mmap
+
     @staticmethod
     def _cmp_version(v1, v2):
         q1 = v1.split('-')[0].split('.')
@@ -394,8 +662,130 @@ class NetCDFPlus(netCDF4.Dataset):
         self._objects = {}
         self._obj_store = {}
         self._storages_base_cls = {}
-        self.vars = dict()
+        self.vars = NetCDFPlus.DelegateDict(self)
         self.units = dict()
+        self._lazy = False
+        self._lazy_stores = dict()
+        self._write_buffer_size = False
+        self.writer = None
+        self._mmaps = dict()
+
+    def set_write_buffer(self, max_bytes=None):
+        """
+        Buffer writes in all stores that support it
+
+        Stores registered later will use the same setting. Pending rows are
+        written on `sync` and `close` or when a buffer exceeds its size.
+
+        Parameters
+        ----------
+        max_bytes : int or None or bool
+            the size limit in bytes of the buffer of each store. If `None`
+            or `True` the default size is used. If `False` buffering is
+            turned off and all pending rows are written.
+
+        See Also
+        --------
+        :meth:`openpathsampling.netcdfplus.ObjectStore.set_write_buffer`
+        """
+        self._write_buffer_size = max_bytes
+
+        for store in self._stores.values():
+            if store.supports_write_buffer:
+                store.set_write_buffer(max_bytes)
+
+    def set_background_writer(self, enabled=True, max_jobs=None):
+        """
+        Write buffered rows and sync the file in a background thread
+
+        This turns on write buffers if they are not used yet. Full buffers
+        and `sync` are then handled by a :obj:`BackgroundWriter` and the
+        calling thread continues right away. Use `flush` to wait until all
+        data is written.
+
+        Parameters
+        ----------
+        enabled : bool
+            if `False` all pending data is written and the writer is stopped
+        max_jobs : int or None
+            the number of jobs that can wait for the writer before the
+            calling thread is blocked. If `None` the default is used
+
+        See Also
+        --------
+        :class:`openpathsampling.netcdfplus.BackgroundWriter`
+        """
+        if enabled:
+            if self.writer is not None:
+                return
+
+            if self._write_buffer_size is False:
+                self.set_write_buffer(None)
+
+            self.writer = BackgroundWriter(max_jobs)
+        else:
+            if self.writer is None:
+                return
+
+            self.flush()
+            self.writer.stop()
+            self.writer = None
+
+        for store in self._stores.values():
+            if store.write_buffer is not None:
+                store.write_buffer.writer = self.writer
+
+        for delegate in self.vars.values():
+            delegate.writer = self.writer
+
+    def flush(self, wait=True):
+        """
+        Write all rows pending in the write buffers of all stores
+
+        Parameters
+        ----------
+        wait : bool
+            if `False` and a background writer is used the rows are only
+            handed to the writer. Otherwise this waits until everything
+            is written
+        """
+        for store in self._stores.values():
+            store.flush(wait)
+
+        if wait and self.writer is not None:
+            self.writer.wait()
+
+    def wait_for_writer(self):
+        """
+        Wait until the background writer has finished all submitted jobs
+
+        netCDF files cannot be used from two threads at once. Direct access
+        to the file, like reading a variable or creating a new variable or
+        dimension, must call this first.
+        """
+        if self.writer is not None:
+            self.writer.wait()
+
+    def sync(self):
+        """
+        Write all pending rows and sync the file to disk
+
+        With a background writer this returns immediately.
+        """
+        if self.writer is not None:
+            self.flush(wait=False)
+            self.writer.submit(super(NetCDFPlus, self).sync)
+        else:
+            self.flush()
+            super(NetCDFPlus, self).sync()
+
+    def close(self):
+        """
+        Write all pending rows and close the file
+        """
+        self.set_background_writer(False)
+        self.flush()
+        super(NetCDFPlus, self).close()
 
     def create_store(self, name, store, register_attr=True):
         """
@@ -467,6 +857,10 @@ class NetCDFPlus(netCDF4.Dataset):
 
         self._stores[name] = store
 
+        if store.supports_write_buffer and \
+                self._write_buffer_size is not False:
+            store.set_write_buffer(self._write_buffer_size)
+
         if store.content_class is not None:
             self._objects[store.content_class] = store
 
@@ -497,6 +891,9 @@ class NetCDFPlus(netCDF4.Dataset):
         try:
             return self.__dict__[item]
         except KeyError:
+            if item in self.__dict__.get('_lazy_stores', ()):
+                return self.restore_store(item)
+
             return self.__class__.__dict__[item]
 
     def __setattr__(self, key, value):
@@ -516,19 +913,55 @@ class NetCDFPlus(netCDF4.Dataset):
 
         self.update_delegates()
 
-    def _restore_storages(self):
+    def _restore_storages(self, names=None):
         """
         Run the restore method on all added classes
 
+        Parameters
+        ----------
+        names : list of str or None
+            if not `None` only the stores with these names are restored.
+            All other stores are restored on first use
+
         Notes
         -----
         Only runs when an existing storage is opened.
         """
 
-        for storage in self._stores.values():
-            storage.restore()
+        for name, storage in self._stores.items():
+            if names is None or name in names:
+                storage.restore()
+            else:
+                # the store is put back as an attribute when it is restored
+                storage._restore_pending = True
+                if self.__dict__.get(name) is storage:
+                    del self.__dict__[name]
+                    self._lazy_stores[name] = storage
+
             storage._created = True
 
+    def restore_store(self, name):
+        """
+        Restore a store that has not been used yet in a lazily opened storage
+
+        Parameters
+        ----------
+        name : str
+            the name of the store
+
+        Returns
+        -------
+        :class:`openpathsampling.netcdfplus.ObjectStore`
+            the restored store
+        """
+        store = self._stores[name]
+        if self._lazy_stores.get(name) is store:
+            del self._lazy_stores[name]
+            self.__dict__[name] = store
+
+        store.restore_if_pending()
+        return store
+
     def list_stores(self):
         """
         Return a list of registered stores
@@ -663,7 +1096,9 @@ class NetCDFPlus(netCDF4.Dataset):
         if hasattr(obj, 'base_cls'):
             store = self._objects[obj.base_cls]
 
-            if store.json:
+            if store.json and store.json != 'binobj':
+                # the row might still be in the write buffer
+                store.flush()
                 return store.variables['json'][store.idx(obj)]
 
         return None
@@ -682,6 +1117,7 @@ class NetCDFPlus(netCDF4.Dataset):
             an infinite dimension that extends when more objects are stored
 
         """
+        self.wait_for_writer()
         if dim_name not in self.dimensions:
             self.createDimension(dim_name, size)
 
@@ -848,6 +1284,12 @@ class NetCDFPlus(netCDF4.Dataset):
             setter = lambda v: self.simplifier.to_json(v)
             getter = lambda v: self.simplifier.from_json(v)
 
+        elif var_type == 'binobj':
+            setter = lambda v: np.frombuffer(
+                self.binary_simplifier.to_binary_object(v), dtype=np.uint8)
+            getter = lambda v: self.binary_simplifier.from_binary(
+                v.tostring())
+
         elif var_type.startswith('obj.'):
             getter = lambda v: [
                 None if w[0] == '-' else store.load(int(UUID(w)))
@@ -1031,6 +1473,7 @@ class NetCDFPlus(netCDF4.Dataset):
             # the s/getter of the original var which is still bound to the
             # right object
 
+            delegate.writer = self.writer
             self.vars[var_name] = delegate
 
         else:
@@ -1088,6 +1531,9 @@ class NetCDFPlus(netCDF4.Dataset):
             variable will interpret this values as `None` when returned
         """
 
+        # the writer thread must not use the file while it is changed
+        self.wait_for_writer()
+
         ncfile = self
 
         if type(dimensions) is str:
@@ -1134,6 +1580,11 @@ class NetCDFPlus(netCDF4.Dataset):
 
             chunksizes = tuple(chunksizes)
 
+        layout_options = {}
+        if not variable_length:
+            chunksizes, layout_options = self._layout_options(
+                var_type, dimensions, chunksizes, simtk_unit)
+
         if variable_length:
             vlen_t = ncfile.createVLType(nc_type, var_name + '_vlen')
             ncvar = ncfile.createVariable(
@@ -1144,8 +1595,12 @@ class NetCDFPlus(netCDF4.Dataset):
         else:
             ncvar = ncfile.createVariable(
                 var_name, nc_type, dimensions, chunksizes=chunksizes,
+                **layout_options
             )
 
+            if layout_options:
+                setattr(ncvar, 'layout', self.layout)
+
         setattr(ncvar, 'var_type', var_type)
 
         if self.support_simtk_unit and simtk_unit is not None:
@@ -1197,12 +1652,67 @@ class NetCDFPlus(netCDF4.Dataset):
 
         return ncvar
 
+    def _layout_options(self, var_type, dimensions, chunksizes, simtk_unit):
+        """
+        Return chunk sizes and variable options of the storage layout
+
+        Parameters
+        ----------
+        var_type : str
+            the variable type
+        dimensions : tuple of str
+            the names of the dimensions of the variable
+        chunksizes : tuple of int or None
+            the chunk sizes requested by the store
+        simtk_unit : str or `simtk.unit.Unit` or None
+            the unit of the variable
+
+        Returns
+        -------
+        tuple of int or None
+            the chunk sizes to be used
+        dict
+            additional keyword arguments for `createVariable`
+        """
+        profile = self.layout_profiles[self.layout]
+
+        if not profile or not var_type.startswith('numpy.') or \
+                len(dimensions) < 2 or \
+                not self.dimensions[dimensions[0]].isunlimited():
+            return chunksizes, {}
+
+        options = {
+            key: value for key, value in profile.items()
+            if key in ['zlib', 'complevel', 'shuffle']
+        }
+
+        if 'least_significant_digit' in profile and \
+                simtk_unit is not None and \
+                var_type.startswith('numpy.float'):
+            options['least_significant_digit'] = \
+                profile['least_significant_digit']
+
+        if 'chunk_bytes' in profile:
+            row_shape = [len(self.dimensions[dim]) for dim in dimensions[1:]]
+            row_bytes = np.dtype(self.var_type_to_nc_type(var_type)).itemsize
+            for size in row_shape:
+                row_bytes *= max(1, size)
+
+            n_rows = max(1, profile['chunk_bytes'] // row_bytes)
+            chunksizes = tuple([n_rows] + [max(1, size) for size in row_shape])
+
+        return chunksizes, options
+
     def update_delegates(self):
         """
         Updates the set of delegates in `self.vars`
 
         Should be called after new variables have been created or loaded.
+        In lazily opened storages delegates are only created on access.
         """
+        if self._lazy:
+            return
+
         for name in self.variables:
             if name not in self.vars:
                 self.create_variable_delegate(name)
@@ -140,7 +140,7 @@ class DictStore(NamedObjectStore):
             (str(obj.__class__), idx, n_idx))
         self._save(obj, n_idx)
 
-        self.storage.variables[self.prefix + '_name'][n_idx] = idx
+        self.variables['name'][n_idx] = idx
         self._update_name_in_cache(idx, n_idx)
 
         return n_idx
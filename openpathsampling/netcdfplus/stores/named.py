@@ -9,6 +9,9 @@ init_log = logging.getLogger('openpathsampling.initialization')
 
 
 class NamedObjectStore(ObjectStore):
+    # names are written directly to the variable
+    supports_write_buffer = False
+
     def __init__(self, content_class, json=True, nestable=False):
         super(NamedObjectStore, self).__init__(
             content_class=content_class,
@@ -71,7 +74,7 @@ class NamedObjectStore(ObjectStore):
         """
         if not self._names_loaded:
             for idx, name in enumerate(
-                    self.storage.variables[self.prefix + "_name"][:]):
+                    self.variables['name'][:]):
                 self._update_name_in_cache(name, idx)
 
             self._names_loaded = True
@@ -122,7 +125,7 @@ class NamedObjectStore(ObjectStore):
         """
 
         if idx not in self.cache:
-            obj = self.simplifier.from_json(json)
+            obj = self.vars['json'].getter(json)
 
             self._get_id(idx, obj)
 
@@ -277,8 +280,7 @@ class NamedObjectStore(ObjectStore):
         if obj is not None:
             self._get_id(n_idx, obj)
 
-            setattr(obj, '_name',
-                    self.storage.variables[self.prefix + '_name'][n_idx])
+            setattr(obj, '_name', self.variables['name'][n_idx])
             # make sure that you cannot change the name of loaded objects
             obj.fix_name()
 
@@ -354,7 +356,7 @@ class NamedObjectStore(ObjectStore):
             raise
 
         n_idx = self.index[obj.__uuid__]
-        self.storage.variables[self.prefix + '_name'][n_idx] = name
+        self.variables['name'][n_idx] = name
         self._update_name_in_cache(name, n_idx)
 
         return reference
@@ -3,19 +3,73 @@ from uuid import UUID
 from weakref import WeakValueDictionary
 
 from openpathsampling.netcdfplus.base import StorableNamedObject, StorableObject
+from openpathsampling.netcdfplus.buffer import WriteBuffer
 from openpathsampling.netcdfplus.cache import MaxCache, Cache, NoCache, \
     WeakLRUCache
 from openpathsampling.netcdfplus.proxy import LoaderProxy
+from openpathsampling.netcdfplus.uuidindex import UUIDArray
 
 logger = logging.getLogger(__name__)
 init_log = logging.getLogger('openpathsampling.initialization')
 
 
 class HashedList(dict):
+    """
+    A dict of uuids to their positions that also keeps the uuids in order
+
+    The uuids restored from a file are kept in a compact
+    :class:`openpathsampling.netcdfplus.uuidindex.UUIDArray` that is searched
+    directly. They are only turned into a python dict if all items are
+    requested. New uuids are kept in the dict.
+    """
     def __init__(self):
         super(HashedList, self).__init__()
         dict.__init__(self)
         self._list = []
+        self._base = None
+
+    def set_base(self, base):
+        """
+        Replace all content by the uuids in a compact array
+
+        Parameters
+        ----------
+        base : :class:`openpathsampling.netcdfplus.uuidindex.UUIDArray`
+            the uuids in order
+        """
+        self.clear()
+        if base is not None and len(base) > 0:
+            self._base = base
+
+    @property
+    def _n_base(self):
+        if self._base is None:
+            return 0
+
+        return len(self._base)
+
+    def _base_get(self, key):
+        if self._base is None:
+            return None
+
+        return self._base.find(key)
+
+    def _base_uuid(self, pos):
+        return self._base.uuid(pos)
+
+    def _base_items(self, uuids):
+        return zip(uuids, range(len(uuids)))
+
+    def materialize(self):
+        """
+        Move all uuids from the compact array into the dict
+        """
+        if self._base is not None:
+            base = self._base
+            self._base = None
+            uuids = base.uuids()
+            dict.update(self, self._base_items(uuids))
+            self._list = uuids + self._list
 
     def append(self, key):
         dict.__setitem__(self, key, len(self))
@@ -27,32 +81,106 @@ class HashedList(dict):
         map(lambda x, y: dict.__setitem__(self, x, y), t, range(l, l + len(t)))
         self._list.extend(t)
 
+    def __len__(self):
+        return dict.__len__(self) + self._n_base
+
     def __setitem__(self, key, value):
+        if self._base is not None:
+            if self._base_get(key) == value:
+                return
+
+            self.materialize()
+
         dict.__setitem__(self, key, value)
         self._list[value] = key
 
     def __getitem__(self, key):
-        return dict.__getitem__(self, key)
+        if dict.__contains__(self, key):
+            return dict.__getitem__(self, key)
+
+        value = self._base_get(key)
+        if value is None:
+            raise KeyError(key)
+
+        return value
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or \
+            self._base_get(key) is not None
+
+    def get(self, key, d=None):
+        if dict.__contains__(self, key):
+            return dict.__getitem__(self, key)
+
+        value = self._base_get(key)
+        if value is None:
+            return d
+
+        return value
 
     def index(self, key):
-        return self._list[key]
+        n_base = self._n_base
+        if 0 <= key < n_base:
+            return self._base_uuid(key)
+
+        return self._list[key - n_base]
 
     def mark(self, key):
         if key not in self:
             dict.__setitem__(self, key, -2)
 
     def unmark(self, key):
-        if key in self:
+        if dict.__contains__(self, key):
             dict.__delitem__(self, key)
 
     def clear(self):
         dict.clear(self)
         self._list = []
+        self._base = None
 
     @property
     def list(self):
+        if self._base is not None:
+            return self._base.uuids() + self._list
+
         return self._list
 
+    # access to all items needs the full dict
+
+    def __iter__(self):
+        self.materialize()
+        return dict.__iter__(self)
+
+    def keys(self):
+        self.materialize()
+        return dict.keys(self)
+
+    def values(self):
+        self.materialize()
+        return dict.values(self)
+
+    def items(self):
+        self.materialize()
+        return dict.items(self)
+
+    def iterkeys(self):
+        self.materialize()
+        return dict.iterkeys(self)
+
+    def itervalues(self):
+        self.materialize()
+        return dict.itervalues(self)
+
+    def iteritems(self):
+        self.materialize()
+        return dict.iteritems(self)
+
+    def __delitem__(self, key):
+        if not dict.__contains__(self, key):
+            self.materialize()
+
+        dict.__delitem__(self, key)
+
 
 class ObjectStore(StorableNamedObject):
     """
@@ -95,25 +223,42 @@ class ObjectStore(StorableNamedObject):
         def __getitem__(self, item):
             return self.dct[self.prefix + item]
 
+    class VariableDelegator(DictDelegator):
+        def __init__(self, store, dct):
+            super(ObjectStore.VariableDelegator, self).__init__(store, dct)
+            self.storage = store.storage
+
+        def __getitem__(self, item):
+            # netCDF variables are used directly, so the background writer
+            # must not use the file at the same time
+            self.storage.wait_for_writer()
+            return self.dct[self.prefix + item]
+
     def prefix_delegate(self, dct):
         return ObjectStore.DictDelegator(self, dct)
 
     default_cache = 10000
 
+    # stores that read their variables directly or rewrite rows set this
+    # to False. See `set_write_buffer`
+    supports_write_buffer = True
+
     def __init__(self, content_class, json=True, nestable=False):
         """
 
         Parameters
         ----------
         content_class
-        json : bool or str `json` or `jsonobj`
+        json : bool or str `json`, `jsonobj` or `binobj`
             if `False` the store will not create a json variable for
             serialization if `True` the store will use the json pickling to
             store objects and a single storable object will be serialized and
             not referenced. If a string is given the string is taken as the
-            variable type of the json variable. Here only two values are
-            allowed: `jsonobj` (equivalent to `True`) or `json` which will
-            also reference directly given storable objects.
+            variable type of the json variable. Here only three values are
+            allowed: `jsonobj` (equivalent to `True`), `json` which will
+            also reference directly given storable objects or `binobj`
+            which is the same as `jsonobj` but uses the faster binary
+            serialization of :class:`openpathsampling.netcdfplus.ObjectBinary`
 
         nestable : bool
             if `True` this marks the content_class to be saved as nested dict
@@ -157,10 +302,12 @@ class ObjectStore(StorableNamedObject):
         self.content_class = content_class
         self.prefix = None
         self.cache = NoCache()
+        self.write_buffer = None
         self._free = set()
         self._cached_all = False
         self.nestable = nestable
         self._created = False
+        self._restore_pending = False
 
         # This will not be stored since its information is contained in the
         # dimension names
@@ -170,16 +317,16 @@ class ObjectStore(StorableNamedObject):
         self.vars = dict()
         self.units = dict()
 
-        self.index = None
+        self._index = None
 
         self.proxy_index = WeakValueDictionary()
 
-        if json in [True, False, 'json', 'jsonobj']:
+        if json in [True, False, 'json', 'jsonobj', 'binobj']:
             self.json = json
         else:
             raise ValueError(
-                'Valid settings for json are only True, False, `json` or '
-                '`jsonobj`.')
+                'Valid settings for json are only True, False, `json`, '
+                '`jsonobj` or `binobj`.')
 
         if self.content_class is not None \
                 and not issubclass(self.content_class, StorableObject):
@@ -217,7 +364,8 @@ class ObjectStore(StorableNamedObject):
         self._storage = storage
         self.prefix = prefix
 
-        self.variables = self.prefix_delegate(self.storage.variables)
+        self.variables = ObjectStore.VariableDelegator(
+            self, self.storage.variables)
         self.units = self.prefix_delegate(self.storage.units)
         self.vars = self.prefix_delegate(self.storage.vars)
 
@@ -226,12 +374,106 @@ class ObjectStore(StorableNamedObject):
     def create_uuid_index(self):
         return HashedList()
 
+    @property
+    def index(self):
+        if self._restore_pending:
+            self.restore_if_pending()
+
+        return self._index
+
+    @index.setter
+    def index(self, value):
+        self._index = value
+
     def restore(self):
         self.load_indices()
 
+    def restore_if_pending(self):
+        """
+        Restore the store if the storage was opened lazily and it is unused
+        """
+        if self._restore_pending:
+            self._restore_pending = False
+            logger.debug('Restore store %s on first use' % self.prefix)
+            self.restore()
+
     def load_indices(self):
         self.index.clear()
-        self.index.extend(self.vars['uuid'][:])
+        base, uuids = self._load_uuid_array()
+        self.index.set_base(base)
+        self.index.extend(uuids)
+
+    @property
+    def uuid_index_filename(self):
+        """
+        str : the name of the file holding the exported index of uuids
+        """
+        return self.storage.mmap_filename(self.prefix + '_uuid_index')
+
+    def _load_uuid_array(self):
+        """
+        Return the stored uuids as a compact array
+
+        An index written by :meth:`export_uuid_index` is memory mapped if it
+        matches the stored uuids. Only the uuids stored after the export are
+        read from the file.
+
+        Returns
+        -------
+        :class:`openpathsampling.netcdfplus.uuidindex.UUIDArray`
+            the compact index of the first uuids
+        list of long
+            all remaining uuids
+        """
+        self.flush()
+        variable = self.variables['uuid']
+        n_rows = len(variable)
+
+        base = None
+        if self.storage.use_mmap:
+            base = UUIDArray.load(self.uuid_index_filename)
+
+        if base is not None:
+            n_base = len(base)
+            # the first and last uuid detect an index of another file
+            if n_base > n_rows or n_base > 0 and (
+                    base.uuid(0) != int(UUID(variable[0])) or
+                    base.uuid(n_base - 1) != int(UUID(variable[n_base - 1]))):
+                logger.info(
+                    'Ignoring uuid index %s which does not match the '
+                    'storage' % self.uuid_index_filename)
+                base = None
+
+        if base is None:
+            if n_rows == 0:
+                return None, []
+
+            return UUIDArray.from_strings(variable[:]), []
+
+        if n_base == n_rows:
+            return base, []
+
+        return base, self.vars['uuid'][n_base:]
+
+    def export_uuid_index(self):
+        """
+        Write the stored uuids to a file that is memory mapped on restore
+
+        Opening a storage reads the uuids of all stored objects. With an
+        exported index only the uuids stored after the export are read.
+
+        Returns
+        -------
+        str
+            the name of the written file
+        """
+        self.flush()
+        filename = self.uuid_index_filename
+        variable = self.variables['uuid']
+        UUIDArray.from_strings(
+            variable[:] if len(variable) > 0 else []).save(filename)
+
+        return filename
 
     @property
     def storage(self):
@@ -298,6 +540,60 @@ class ObjectStore(StorableNamedObject):
         if isinstance(caching, Cache):
             self.cache = caching.transfer(self.cache)
 
+    def set_write_buffer(self, max_bytes=None):
+        """
+        Set the write-behind buffer for this store
+
+        With a buffer single rows written to the variables of this store are
+        collected in memory and written in contiguous slices when the buffer
+        is full or the storage is synced. Reading a pending row returns the
+        buffered value.
+
+        Parameters
+        ----------
+        max_bytes : int or None or bool
+            the size limit of the buffer in bytes. If `None` or `True` the
+            default size is used. If `False` buffering is turned off and all
+            pending rows are written.
+
+        """
+        self.flush()
+
+        if max_bytes is False:
+            buffer = None
+        elif max_bytes is None or max_bytes is True:
+            buffer = WriteBuffer()
+        else:
+            buffer = WriteBuffer(max_bytes)
+
+        if buffer is not None:
+            buffer.writer = self.storage.writer
+
+        self.write_buffer = buffer
+
+        var_prefix = self.prefix + '_'
+        for name, delegate in self.storage.vars.items():
+            if name.startswith(var_prefix):
+                delegate.buffer = buffer
+
+    def flush(self, wait=True):
+        """
+        Write all rows pending in the write buffer of this store
+
+        Parameters
+        ----------
+        wait : bool
+            if `False` the rows are handed to the background writer of the
+            storage if there is one
+        """
+        if self.write_buffer is not None:
+            if wait:
+                self.write_buffer.flush()
+            else:
+                self.write_buffer.flush_async()
+        elif wait and self.storage.writer is not None:
+            self.storage.writer.wait()
+
     def idx(self, obj):
         """
         Return the index in this store for a given object
@@ -321,7 +617,7 @@ class ObjectStore(StorableNamedObject):
         Add iteration over all elements in the storage
         """
         # we want to iterator in the order object were saved!
-        for uuid in self.index._list:
+        for uuid in self.index.list:
             yield self.load(uuid)
 
     def __len__(self):
@@ -334,6 +630,7 @@ class ObjectStore(StorableNamedObject):
             number of stored objects
 
         """
+        self.flush()
         return len(self.storage.dimensions[self.prefix])
 
     def write(self, variable, idx, obj, attribute=None):
@@ -440,6 +737,7 @@ class ObjectStore(StorableNamedObject):
 
         """
         if not self._cached_all:
+            self.flush()
             idxs = range(len(self))
             jsons = self.variables['json'][:]
 
@@ -532,12 +830,22 @@ class ObjectStore(StorableNamedObject):
             if type(self.json) is str:
                 jsontype = self.json
 
-            self.create_variable(
-                "json",
-                jsontype,
-                description='A json serialized version of the object',
-                chunksizes=tuple([65536])
-            )
+            if jsontype == 'binobj':
+                # binary data is stored as a variable length byte array
+                self.create_variable(
+                    "json",
+                    jsontype,
+                    dimensions='...',
+                    description='A binary serialized version of the object',
+                    chunksizes=tuple([65536])
+                )
+            else:
+                self.create_variable(
+                    "json",
+                    jsontype,
+                    description='A json serialized version of the object',
+                    chunksizes=tuple([65536])
+                )
 
         # TODO: Change to 16byte string
         self.create_variable(
@@ -658,6 +966,10 @@ class ObjectStore(StorableNamedObject):
             maskable=maskable
         )
 
+        if self.write_buffer is not None:
+            self.storage.vars[self.prefix + '_' + var_name].buffer = \
+                self.write_buffer
+
     @property
     def dimension_prefix(self):
         if self._dimension_prefix_store is not None:
@@ -779,6 +1091,112 @@ class ObjectStore(StorableNamedObject):
 
         return obj
 
+    def load_bulk(self, idxs):
+        """
+        Load several objects from the storage at once
+
+        Objects not found in the cache are read with a single read per
+        variable and added to the cache.
+
+        Parameters
+        ----------
+        idxs : list of int or long
+            the integer indices or uuids of the objects to be loaded
+
+        Returns
+        -------
+        list of :py:class:`openpathsampling.netcdfplus.base.StorableObject`
+            the loaded objects in the order of `idxs`
+        """
+        objs = [None] * len(idxs)
+        missing = {}
+
+        for pos, idx in enumerate(idxs):
+            if type(idx) is long:
+                if idx not in self.index:
+                    # let load handle the fallbacks
+                    objs[pos] = self.load(idx)
+                    continue
+
+                n_idx = self.index[idx]
+            else:
+                n_idx = int(idx)
+
+            if n_idx < 0:
+                continue
+
+            try:
+                objs[pos] = self.cache[n_idx]
+            except KeyError:
+                missing.setdefault(n_idx, []).append(pos)
+
+        if missing:
+            n_idxs = sorted(missing)
+            for n_idx, obj in zip(n_idxs, self._load_bulk(n_idxs)):
+                if obj is not None:
+                    self._get_id(n_idx, obj)
+                    self.cache[n_idx] = obj
+
+                for pos in missing[n_idx]:
+                    objs[pos] = obj
+
+        return objs
+
+    def _load_bulk(self, idxs):
+        """
+        Load objects for a sorted list of integer indices
+
+        Override to read variables in bulk using `_read_rows`
+        """
+        return [self._load(idx) for idx in idxs]
+
+    def _read_rows(self, var_name, rows):
+        """
+        Read several rows of a variable with a single read
+
+        If the rows are dense a single range is read, otherwise the unique
+        rows are read using a sorted index list. If the storage has a valid
+        exported memory map for the variable the rows are read-only views
+        into it and nothing is copied.
+
+        Parameters
+        ----------
+        var_name : str
+            the name of the variable without the store prefix
+        rows : list of int
+            the rows to be read
+
+        Returns
+        -------
+        list
+            the converted values in the order of `rows`, as if read by
+            `self.vars[var_name][row]`
+        """
+        if len(rows) == 0:
+            return []
+
+        self.flush()
+
+        getter = self.vars[var_name].getter
+
+        mmap = self.storage.mmap(self.prefix + '_' + var_name)
+        if mmap is not None:
+            return [getter(mmap[row]) for row in rows]
+
+        unique = sorted(set(rows))
+        first = unique[0]
+        last = unique[-1]
+        variable = self.variables[var_name]
+
+        if last - first + 1 <= 2 * len(unique):
+            block = variable[first:last + 1]
+            offset = {row: row - first for row in unique}
+        else:
+            block = variable[unique]
+            offset = {row: pos for pos, row in enumerate(unique)}
+
+        return [getter(block[offset[row]]) for row in rows]
+
     @staticmethod
     def reference(obj):
         return obj.__uuid__
@@ -929,7 +1347,7 @@ class ObjectStore(StorableNamedObject):
         """
 
         if idx not in self.cache:
-            obj = self.simplifier.from_json(json)
+            obj = self.vars['json'].getter(json)
 
             self._get_id(idx, obj)
 
@@ -0,0 +1,217 @@
+import os
+
+import numpy as np
+
+__author__ = 'Jan-Hendrik Prinz'
+
+
+class UUIDArray(object):
+    """
+    Compact read-only index of 128-bit UUIDs in sorted numpy arrays
+
+    The UUIDs are kept as two `uint64` arrays, one in storage order and one
+    lexicographically sorted together with the position of each UUID. A
+    lookup is a binary search and needs no python objects per UUID. The
+    arrays can be saved to and memory mapped from a single `.npy` file.
+
+    Attributes
+    ----------
+    data : :obj:`numpy.ndarray`, shape=(5, n), dtype=uint64
+        the rows are the high and low 64 bits in storage order, the high and
+        low 64 bits in sorted order and the storage position of each sorted
+        UUID
+    """
+
+    _mask64 = (1 << 64) - 1
+
+    # the number of UUIDs parsed at once by `from_strings`
+    parse_block_size = 65536
+
+    # the position of the hex digits in the string representation of a UUID
+    _hex_columns = [
+        pos for pos in range(36) if pos not in [8, 13, 18, 23]]
+
+    def __init__(self, data):
+        """
+        Parameters
+        ----------
+        data : :obj:`numpy.ndarray`, shape=(5, n), dtype=uint64
+            the data as returned by :attr:`data`
+        """
+        self.data = data
+        self._hi, self._lo, self._sorted_hi, self._sorted_lo, \
+            self._order = data
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    @classmethod
+    def from_arrays(cls, hi, lo):
+        """
+        Create the index from the high and low 64 bits in storage order
+
+        Parameters
+        ----------
+        hi : :obj:`numpy.ndarray` of uint64
+        lo : :obj:`numpy.ndarray` of uint64
+
+        Returns
+        -------
+        :obj:`UUIDArray`
+        """
+        order = np.lexsort((lo, hi))
+        data = np.empty((5, len(hi)), dtype=np.uint64)
+        data[0] = hi
+        data[1] = lo
+        data[2] = hi[order]
+        data[3] = lo[order]
+        data[4] = order
+
+        return cls(data)
+
+    @classmethod
+    def from_strings(cls, strings, block_size=None):
+        """
+        Create the index from UUIDs in string representation
+
+        The strings are parsed in blocks, so the temporary memory does not
+        grow with the number of UUIDs.
+
+        Parameters
+        ----------
+        strings : sequence of str
+            the UUIDs in the format `xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx`
+        block_size : int or None
+            the number of UUIDs parsed at once. If `None` the default
+            `parse_block_size` is used
+
+        Returns
+        -------
+        :obj:`UUIDArray`
+        """
+        if block_size is None:
+            block_size = cls.parse_block_size
+
+        n_uuids = len(strings)
+        hi = np.zeros(n_uuids, dtype=np.uint64)
+        lo = np.zeros(n_uuids, dtype=np.uint64)
+
+        shift = np.uint64(4)
+        for first in range(0, n_uuids, block_size):
+            last = min(n_uuids, first + block_size)
+            chars = np.array(
+                strings[first:last], dtype='S36'
+            ).view(np.uint8).reshape(-1, 36)
+
+            # '0'-'9' become 0-9 and 'a'-'f' become 10-15
+            digits = chars[:, cls._hex_columns] - np.uint8(48)
+            digits[digits > 9] -= np.uint8(39)
+
+            block_hi = hi[first:last]
+            block_lo = lo[first:last]
+            for pos in range(16):
+                block_hi <<= shift
+                block_hi |= digits[:, pos]
+                block_lo <<= shift
+                block_lo |= digits[:, 16 + pos]
+
+        return cls.from_arrays(hi, lo)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Memory map an index saved with :meth:`save`
+
+        Parameters
+        ----------
+        filename : str
+
+        Returns
+        -------
+        :obj:`UUIDArray` or None
+            the index or `None` if there is no valid file
+        """
+        if not os.path.isfile(filename):
+            return None
+
+        data = np.load(filename, mmap_mode='r')
+        if data.ndim != 2 or data.shape[0] != 5 or data.dtype != np.uint64:
+            return None
+
+        return cls(data)
+
+    def save(self, filename):
+        """
+        Save the index to a `.npy` file
+
+        Parameters
+        ----------
+        filename : str
+        """
+        temp_filename = filename + '.part'
+        with open(temp_filename, 'wb') as f:
+            np.save(f, np.ascontiguousarray(self.data))
+
+        os.rename(temp_filename, filename)
+
+    def find(self, uuid):
+        """
+        Return the storage position of a UUID
+
+        Parameters
+        ----------
+        uuid : int or long
+
+        Returns
+        -------
+        int or None
+            the position or `None` if the UUID is not in the index
+        """
+        if not isinstance(uuid, (int, long)) or uuid < 0 or uuid >> 128:
+            return None
+
+        hi = np.uint64(uuid >> 64)
+        lo = np.uint64(uuid & self._mask64)
+
+        sorted_hi = self._sorted_hi
+        left = sorted_hi.searchsorted(hi, side='left')
+        right = sorted_hi.searchsorted(hi, side='right')
+
+        if left == right:
+            return None
+
+        if right - left > 1:
+            left += self._sorted_lo[left:right].searchsorted(lo)
+            if left == right:
+                return None
+
+        if self._sorted_lo[left] != lo:
+            return None
+
+        return int(self._order[left])
+
+    def uuid(self, pos):
+        """
+        Return the UUID at a storage position
+
+        Parameters
+        ----------
+        pos : int
+
+        Returns
+        -------
+        long
+        """
+        return (long(self._hi[pos]) << 64) | long(self._lo[pos])
+
+    def uuids(self):
+        """
+        Return all UUIDs in storage order
+
+        Returns
+        -------
+        list of long
+        """
+        return [
+            (long(hi) << 64) | long(lo)
+            for hi, lo in zip(self._hi.tolist(), self._lo.tolist())]
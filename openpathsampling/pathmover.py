@@ -8,6 +8,7 @@ Created on 19.07.2014
 import abc
 import logging
 import random
+import threading
 
 import numpy as np
 import openpathsampling as paths
@@ -695,6 +696,9 @@ class EngineMover(SampleMover):
     # this will store the engine attribute for all subclasses as well
     _included_attr = ['_engine']
 
+    # engines replaced in the current thread, see `bind_engine`
+    _bound_engines = threading.local()
+
     def __init__(self, ensemble, target_ensemble, selector, engine=None):
         super(EngineMover, self).__init__()
         self.selector = selector
@@ -710,14 +714,57 @@ class EngineMover(SampleMover):
     @property
     def engine(self):
         if self._engine is not None:
-            return self._engine
+            engine = self._engine
+        else:
+            engine = self.default_engine
+
+        bound = getattr(EngineMover._bound_engines, 'engines', None)
+        if bound:
+            return bound.get(engine, engine)
         else:
-            return self.default_engine
+            return engine
 
     @engine.setter
     def engine(self, engine):
         self._engine = engine
 
+    @staticmethod
+    def bind_engine(engine, replacement):
+        """
+        Use another engine instead of `engine` in the current thread
+
+        Until :meth:`unbind_engine` is called all engine movers that would
+        use `engine` run `replacement` instead, if called from the current
+        thread. Other threads are not affected, so several workers can run
+        the same movers with their own engines at the same time.
+
+        Parameters
+        ----------
+        engine : :class:`openpathsampling.engines.DynamicsEngine`
+            the engine to be replaced
+        replacement : :class:`openpathsampling.engines.DynamicsEngine`
+            the engine to be used instead
+        """
+        bound = getattr(EngineMover._bound_engines, 'engines', None)
+        if bound is None:
+            bound = EngineMover._bound_engines.engines = {}
+
+        bound[engine] = replacement
+
+    @staticmethod
+    def unbind_engine(engine):
+        """
+        Stop replacing `engine` in the current thread
+
+        Parameters
+        ----------
+        engine : :class:`openpathsampling.engines.DynamicsEngine`
+            the engine passed to :meth:`bind_engine`
+        """
+        bound = getattr(EngineMover._bound_engines, 'engines', None)
+        if bound is not None:
+            bound.pop(engine, None)
+
     def _called_ensembles(self):
         return [self.ensemble]
 
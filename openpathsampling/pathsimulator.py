@@ -1,10 +1,18 @@
 import time
 import sys
 import logging
+import random
+import types
+import Queue
+import cPickle
+from cStringIO import StringIO
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 import numpy as np
 import pandas as pd
 
-from openpathsampling.netcdfplus import StorableNamedObject, StorableObject
+from openpathsampling.netcdfplus import StorableNamedObject, StorableObject, \
+    LoaderProxy, ObjectJSON
 
 import openpathsampling as paths
 import openpathsampling.tools
@@ -17,6 +25,76 @@ logger = logging.getLogger(__name__)
 init_log = logging.getLogger('openpathsampling.initialization')
 
 
+def _preselect_mover(mover, sample_set):
+    """
+    Draw the random choices of a move decision tree in advance
+
+    Only plain :class:`openpathsampling.RandomChoiceMover` nodes are
+    resolved, since their weights do not depend on the sample set. The first
+    other mover is returned as the mover that will actually be run.
+
+    Parameters
+    ----------
+    mover : :class:`openpathsampling.PathMover`
+        the root of the decision tree
+    sample_set : :class:`openpathsampling.SampleSet`
+        the sample set the move will be applied to
+
+    Returns
+    -------
+    choices : list of tuple
+        (selection mover, chosen index, weights) for each resolved level
+    mover : :class:`openpathsampling.PathMover`
+        the mover to be run
+    """
+    choices = []
+    while type(mover) is paths.RandomChoiceMover:
+        weights = mover._selector(sample_set)
+        rand = np.random.random() * sum(weights)
+        idx = 0
+        prob = weights[0]
+        while prob <= rand and idx < len(weights) - 1:
+            idx += 1
+            prob += weights[idx]
+
+        choices.append((mover, idx, weights))
+        mover = mover.movers[idx]
+
+    return choices, mover
+
+
+def _wrap_choices(change, choices):
+    """
+    Wrap the change of a preselected mover like the selection movers would
+
+    Parameters
+    ----------
+    change : :class:`openpathsampling.MoveChange`
+        the change returned by the mover from `_preselect_mover`
+    choices : list of tuple
+        the choices returned by `_preselect_mover`
+
+    Returns
+    -------
+    :class:`openpathsampling.MoveChange`
+        the change as if the move was run from the root of the tree
+    """
+    for selector, idx, weights in reversed(choices):
+        details = paths.MoveDetails(
+            choice=idx,
+            chosen_mover=selector.movers[idx],
+            probability=weights[idx] / sum(weights),
+            weights=weights
+        )
+        change = paths.RandomChoiceMoveChange(
+            change,
+            mover=selector,
+            details=details
+        )
+
+    return change
+
+
 class MCStep(StorableObject):
     """
     A monte-carlo step in the main PathSimulation loop
@@ -715,39 +793,192 @@ class PathSampling(PathSimulator):
 
             time_start = time.time()
             movepath = self._mover.move(self.sample_set, step=self.step)
-            samples = movepath.results
-            new_sampleset = self.sample_set.apply_samples(samples)
             time_elapsed = time.time() - time_start
 
-            # TODO: we can save this with the MC steps for timing? The bit
-            # below works, but is only a temporary hack
-            setattr(movepath.details, "timing", time_elapsed)
+            mcstep = self._append_step(movepath, time_elapsed)
 
-            mcstep = MCStep(
-                simulation=self,
-                mccycle=self.step,
-                previous=self.sample_set,
-                active=new_sampleset,
-                change=movepath
-            )
+        self.sync_storage()
 
-            self._current_step = mcstep
-            self.save_current_step()
+        if self.storage is not None:
+            # wait for a background writer to finish
+            self.storage.flush()
 
-            # if self.storage is not None:
-            #     # I think this is done automatically when saving snapshots
-            #     # for cv in cvs:
-            #     #     n_len = len(self.storage.snapshots)
-            #     #     cv(self.storage.snapshots[n_samples:n_len])
-            #     #     n_samples = n_len
-            #
-            #     self.storage.steps.save(mcstep)
+        if self.live_visualizer is not None and mcstep is not None:
+            self.live_visualizer.draw_ipynb(mcstep)
+        paths.tools.refresh_output(
+            "DONE! Completed " + str(self.step) + " Monte Carlo cycles.\n",
+            refresh=False,
+            output_stream=self.output_stream
+        )
 
-            if self.step % self.save_frequency == 0:
-                self.sample_set.sanity_check()
-                self.sync_storage()
+    def _append_step(self, movepath, time_elapsed):
+        """
+        Turn a finished move into the next MCStep and store it
 
-            self.sample_set = new_sampleset
+        Parameters
+        ----------
+        movepath : :class:`openpathsampling.MoveChange`
+            the change generated by the move for the current `self.step`
+        time_elapsed : float
+            the wall time in seconds spent to generate the move
+
+        Returns
+        -------
+        :class:`MCStep`
+            the new step which is also the new `current_step`
+        """
+        new_sampleset = self.sample_set.apply_samples(movepath.results)
+
+        # TODO: we can save this with the MC steps for timing? The bit
+        # below works, but is only a temporary hack
+        setattr(movepath.details, "timing", time_elapsed)
+
+        mcstep = MCStep(
+            simulation=self,
+            mccycle=self.step,
+            previous=self.sample_set,
+            active=new_sampleset,
+            change=movepath
+        )
+
+        self._current_step = mcstep
+        self.save_current_step()
+
+        if self.step % self.save_frequency == 0:
+            self.sample_set.sanity_check()
+            self.sync_storage()
+
+        self.sample_set = new_sampleset
+
+        return mcstep
+
+    @staticmethod
+    def _mover_resources(mover):
+        """
+        Return the set of ensembles and engines a mover can touch
+
+        Two movers with disjoint resources act on different replicas with
+        different engines and can be run concurrently.
+        """
+        resources = set(mover.input_ensembles) | set(mover.output_ensembles)
+        for sub in mover:
+            if isinstance(sub, paths.EngineMover):
+                resources.add(sub.engine)
+
+        return resources
+
+    def _wrap_move_change(self, change, choices):
+        """
+        Rebuild the move change tree for moves selected by `_preselect_mover`
+        """
+        return paths.PathSimulatorMoveChange(
+            _wrap_choices(change, choices),
+            mover=self._mover,
+            details=paths.MoveDetails(step=self.step)
+        )
+
+    def run_parallel(self, n_steps, n_workers=None, pool=None,
+                     max_concurrent=None):
+        """
+        Run the simulator and execute independent moves concurrently
+
+        The random choices in the move decision tree are drawn in advance
+        in step order. Consecutive steps are collected into a batch as long
+        as the selected movers touch disjoint ensembles and engines. All
+        moves of a batch are run at the same time and the resulting MCSteps
+        are saved in step order, so the result is a valid sequence of
+        steps, just like the one generated by `run`.
+
+        Parameters
+        ----------
+        n_steps : int
+            number of steps to be run
+        n_workers : int or None
+            number of workers for the default pool. If `None` the number
+            of cpus is used.
+        pool : object or None
+            a pool implementing `apply_async` like
+            :class:`multiprocessing.pool.ThreadPool`. Workers need to share
+            the objects of the simulation, so a process pool cannot be
+            used. If `None` a thread pool is created and closed afterwards.
+        max_concurrent : int or None
+            the maximal number of moves in a batch. Default is the number
+            of workers.
+
+        Notes
+        -----
+        Concurrent moves need their own engines, otherwise they share the
+        engine as a resource and are run one after another. Create a
+        separate engine for each ensemble (e.g. using
+        `engine.from_new_options()`) to profit from this. The random
+        numbers used inside the movers are drawn concurrently, hence a
+        parallel run is not reproducible from the random seed alone.
+        """
+        own_pool = pool is None
+        if own_pool:
+            if n_workers is None:
+                n_workers = multiprocessing.cpu_count()
+            pool = ThreadPool(n_workers)
+
+        if max_concurrent is None:
+            max_concurrent = n_workers if n_workers is not None else \
+                multiprocessing.cpu_count()
+
+        mcstep = None
+        initial_time = time.time()
+        n_done = 0
+        selection = None
+
+        try:
+            while n_done < n_steps:
+                elapsed = time.time() - initial_time
+                paths.tools.refresh_output(
+                    "Working on Monte Carlo cycle number " +
+                    str(self.step + 1) + "\n" +
+                    paths.tools.progress_string(n_done, n_steps, elapsed),
+                    refresh=self.allow_refresh,
+                    output_stream=self.output_stream
+                )
+
+                batch = []
+                used = set()
+                while n_done + len(batch) < n_steps and \
+                        len(batch) < max_concurrent:
+                    if selection is None:
+                        selection = _preselect_mover(
+                            self.root_mover, self.sample_set)
+
+                    resources = self._mover_resources(selection[1])
+                    if len(batch) > 0 and not used.isdisjoint(resources):
+                        # keep the selection as first move of the next batch
+                        break
+
+                    batch.append(selection)
+                    used |= resources
+                    selection = None
+
+                logger.info(
+                    "Running %d moves concurrently from MC cycle %d" %
+                    (len(batch), self.step + 1))
+
+                time_start = time.time()
+                results = [
+                    pool.apply_async(mover.move, (self.sample_set,))
+                    for choices, mover in batch
+                ]
+
+                for (choices, mover), result in zip(batch, results):
+                    change = result.get()
+                    time_elapsed = time.time() - time_start
+                    self.step += 1
+                    n_done += 1
+                    movepath = self._wrap_move_change(change, choices)
+                    mcstep = self._append_step(movepath, time_elapsed)
+
+        finally:
+            if own_pool:
+                pool.close()
+                pool.join()
 
         self.sync_storage()
 
@@ -760,6 +991,383 @@ class PathSampling(PathSimulator):
         )
 
 
+def _check_engine_binding(mover, engine):
+    """
+    Check that workers can replace the engine of all movers in a tree
+
+    Parameters
+    ----------
+    mover : :class:`openpathsampling.PathMover`
+        the root of the decision tree
+    engine : :class:`openpathsampling.engines.DynamicsEngine`
+        the engine that is replaced by the engines of the workers
+
+    Raises
+    ------
+    TypeError
+        if a mover uses the engine in a way that cannot be rebound
+    ValueError
+        if an engine mover uses another engine
+    """
+    for sub in mover:
+        if isinstance(sub, paths.EngineMover):
+            if type(sub).engine is not paths.EngineMover.engine:
+                raise TypeError(
+                    'Mover %s overrides `engine`, so it cannot use the '
+                    'engines of the workers.' % sub.name)
+            if sub.engine is not engine:
+                raise ValueError(
+                    'Mover %s uses engine %s and not the engine %s of the '
+                    'simulation.' % (sub.name, sub.engine, engine))
+        elif len(sub.submovers) == 0 and \
+                any(value is engine for value in vars(sub).values()):
+            # movers with submovers leave running the engine to these
+            raise TypeError(
+                'Mover %s uses the engine, but is not an EngineMover, so it '
+                'cannot use the engines of the workers.' % sub.name)
+
+
+def _initial_sample_set(snapshot, ensemble):
+    sample_set = paths.SampleSet([
+        paths.Sample(replica=0,
+                     trajectory=paths.Trajectory([snapshot]),
+                     ensemble=ensemble)
+    ])
+    sample_set.sanity_check()
+    return sample_set
+
+
+def _shoot(engine, shots, snapshot, selections, as_chain):
+    """
+    Run a list of shots from a snapshot; this is executed by a worker
+
+    Parameters
+    ----------
+    engine : :class:`.DynamicsEngine`
+        the engine of the worker
+    shots : tuple
+        the engine of the simulation, the randomizer and the starting
+        ensemble. The engine of the simulation is replaced by `engine`
+        for all movers.
+    snapshot : :class:`.Snapshot`
+        the initial snapshot
+    selections : list of tuple
+        the preselected movers (see `_preselect_mover`), one per shot
+    as_chain : bool
+        if `True` each shot starts from the previous modified snapshot
+
+    Returns
+    -------
+    list of tuple
+        the pairs (initial sample set, move change) for all shots
+    """
+    simulation_engine, randomizer, starting_ensemble = shots
+    paths.EngineMover.bind_engine(simulation_engine, engine)
+    try:
+        results = []
+        start_snap = snapshot
+        for choices, mover in selections:
+            if as_chain:
+                start_snap = randomizer(start_snap)
+            else:
+                start_snap = randomizer(snapshot)
+
+            sample_set = _initial_sample_set(start_snap, starting_ensemble)
+            change = _wrap_choices(mover.move(sample_set), choices)
+            results.append((sample_set, change))
+    finally:
+        paths.EngineMover.unbind_engine(simulation_engine)
+
+    return results
+
+
+class _ObjectPickler(object):
+    """
+    Pickle the objects of a simulation for another process
+
+    Named objects like movers, ensembles and engines are sent as their
+    `to_dict` representation, the same way a storage saves them, and keep
+    their uuid. Objects the other process already knows are only sent by
+    uuid and are replaced by the local objects when loaded. Functions that
+    cannot be pickled by reference, e.g. the lambdas of a `FunctionCV`,
+    are sent as bytecode.
+
+    Parameters
+    ----------
+    pickler : :class:`_ObjectPickler` or None
+        if given, all objects known to this pickler are known as well
+    """
+
+    def __init__(self, pickler=None):
+        if pickler is None:
+            self.objects = {}
+            self._known = {}
+        else:
+            self.objects = dict(pickler.objects)
+            self._known = dict(pickler._known)
+
+    def add(self, obj):
+        """
+        Mark an object as known to the other process
+        """
+        self.objects[obj.__uuid__] = obj
+        self._known[id(obj)] = obj
+
+    def _persistent_id(self, obj):
+        if type(obj) is LoaderProxy:
+            return 'value', obj.__subject__
+        elif id(obj) in self._known:
+            return 'ref', obj.__uuid__
+        elif isinstance(obj, StorableNamedObject):
+            self.add(obj)
+            return 'new', type(obj), obj.__uuid__, obj._name, obj.to_dict()
+        elif isinstance(obj, types.FunctionType):
+            module = sys.modules.get(obj.__module__)
+            if getattr(module, obj.__name__, None) is not obj:
+                return 'function', ObjectJSON.callable_to_dict(obj)
+
+        return None
+
+    def _persistent_load(self, pid):
+        kind = pid[0]
+        if kind == 'ref':
+            return self.objects[pid[1]]
+        elif kind == 'new':
+            cls, uuid, name, dct = pid[1:]
+            if uuid not in self.objects:
+                obj = cls.from_dict(dct)
+                obj.__uuid__ = uuid
+                obj._name = name
+                self.add(obj)
+
+            return self.objects[uuid]
+        elif kind == 'value':
+            return pid[1]
+        elif kind == 'function':
+            return ObjectJSON.callable_from_dict(pid[1])
+        else:
+            raise cPickle.UnpicklingError('Unknown object `%s`' % kind)
+
+    def dumps(self, obj):
+        stream = StringIO()
+        pickler = cPickle.Pickler(stream, cPickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = self._persistent_id
+        pickler.dump(obj)
+        return stream.getvalue()
+
+    def loads(self, data):
+        unpickler = cPickle.Unpickler(StringIO(data))
+        unpickler.persistent_load = self._persistent_load
+        return unpickler.load()
+
+
+class ShotExecutor(object):
+    """
+    Base class for the backends of `ShootFromSnapshotsSimulation.run_parallel`
+
+    An executor runs the shots of a simulation with its own set of
+    engines. An engine is used by only one worker at a time.
+
+    Parameters
+    ----------
+    engines : list of :class:`.DynamicsEngine`
+        the engines used by the workers. Usually these are engines
+        created with the same options and topology as the engine of the
+        simulation.
+    """
+
+    def __init__(self, engines):
+        self.engines = list(engines)
+        self.simulation = None
+
+    def start(self, simulation):
+        """
+        Prepare the workers for the shots of a simulation
+        """
+        self.simulation = simulation
+
+    def submit(self, snapshot, selections, as_chain):
+        """
+        Start running a list of shots from a snapshot
+
+        Parameters
+        ----------
+        snapshot : :class:`.Snapshot`
+            the initial snapshot
+        selections : list of tuple
+            the preselected movers (see `_preselect_mover`), one per shot
+        as_chain : bool
+            if `True` each shot starts from the previous modified snapshot
+
+        Returns
+        -------
+        object
+            the result with a method `get` that waits for the shots and
+            returns the pairs (initial sample set, move change) for all
+            shots
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Stop the workers
+        """
+        self.simulation = None
+
+    def _shots(self):
+        return (
+            self.simulation.engine,
+            self.simulation.randomizer,
+            self.simulation.starting_ensemble
+        )
+
+
+class ThreadShotExecutor(ShotExecutor):
+    """
+    Run the shots in threads of the current process
+
+    The workers use the objects of the simulation directly. Shots only run
+    at the same time while the engines release the GIL, e.g. inside the
+    integrator of OpenMM.
+
+    Parameters
+    ----------
+    engines : list of :class:`.DynamicsEngine`
+        the engines used by the workers
+    pool : object or None
+        a pool implementing `apply_async` like
+        :class:`multiprocessing.pool.ThreadPool`. If `None` a thread pool
+        with one worker per engine is created and closed afterwards.
+    """
+
+    def __init__(self, engines, pool=None):
+        super(ThreadShotExecutor, self).__init__(engines)
+        self.pool = pool
+        self._own_pool = pool is None
+        self._engine_queue = None
+
+    def start(self, simulation):
+        super(ThreadShotExecutor, self).start(simulation)
+        self._engine_queue = Queue.Queue()
+        for engine in self.engines:
+            self._engine_queue.put(engine)
+
+        if self._own_pool:
+            self.pool = ThreadPool(len(self.engines))
+
+    def submit(self, snapshot, selections, as_chain):
+        return self.pool.apply_async(
+            self._run, (self._shots(), snapshot, selections, as_chain))
+
+    def _run(self, shots, snapshot, selections, as_chain):
+        engine = self._engine_queue.get()
+        try:
+            return _shoot(engine, shots, snapshot, selections, as_chain)
+        finally:
+            self._engine_queue.put(engine)
+
+    def close(self):
+        if self._own_pool and self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+        super(ThreadShotExecutor, self).close()
+
+
+# the engine and the objects of the simulation in a worker process
+_shot_process = {}
+
+
+def _init_shot_process(data, engine_indices):
+    # forked workers inherit the uuids and random states of the parent
+    StorableObject.new_uuid_range()
+    np.random.seed()
+    random.seed()
+
+    pickler = _ObjectPickler()
+    engines, shots = pickler.loads(data)
+    _shot_process['engine'] = engines[engine_indices.get()]
+    _shot_process['shots'] = shots
+    _shot_process['pickler'] = pickler
+
+
+def _shoot_in_process(data):
+    pickler = _ObjectPickler(_shot_process['pickler'])
+    snapshot, selections, as_chain = pickler.loads(data)
+    pickler.add(snapshot)
+    pickler.add(snapshot.reversed)
+    results = _shoot(
+        _shot_process['engine'], _shot_process['shots'],
+        snapshot, selections, as_chain)
+
+    return pickler.dumps(results)
+
+
+class _ProcessShotResult(object):
+    def __init__(self, result, pickler):
+        self.result = result
+        self.pickler = pickler
+
+    def get(self):
+        return self.pickler.loads(self.result.get())
+
+
+class ProcessShotExecutor(ShotExecutor):
+    """
+    Run the shots in separate processes
+
+    Every worker process gets one of the engines. The initial snapshot and
+    the movers of each task are pickled and sent to a worker, which sends
+    back the pickled sample sets and move changes. Movers, ensembles,
+    engines and the initial snapshot are sent back by uuid and replaced by
+    the original objects, so the steps reference the same objects as in
+    `run`. Movers, ensembles and engines are sent the same way a storage
+    saves them, so all that can be stored can be sent.
+
+    Parameters
+    ----------
+    engines : list of :class:`.DynamicsEngine`
+        the engines used by the workers, one worker process per engine
+    """
+
+    def __init__(self, engines):
+        super(ProcessShotExecutor, self).__init__(engines)
+        self.pool = None
+        self._pickler = None
+
+    def start(self, simulation):
+        super(ProcessShotExecutor, self).start(simulation)
+        self._pickler = _ObjectPickler()
+        data = self._pickler.dumps((self.engines, self._shots()))
+        engine_indices = multiprocessing.Queue()
+        for idx in range(len(self.engines)):
+            engine_indices.put(idx)
+
+        self.pool = multiprocessing.Pool(
+            len(self.engines), _init_shot_process, (data, engine_indices))
+
+    def submit(self, snapshot, selections, as_chain):
+        pickler = _ObjectPickler(self._pickler)
+        # the reversed snapshot needs to exist before it is sent
+        reversed_snapshot = snapshot.reversed
+        data = pickler.dumps((snapshot, selections, as_chain))
+        pickler.add(snapshot)
+        pickler.add(reversed_snapshot)
+
+        return _ProcessShotResult(
+            self.pool.apply_async(_shoot_in_process, (data,)), pickler)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+        self._pickler = None
+        super(ProcessShotExecutor, self).close()
+
+
 class ShootFromSnapshotsSimulation(PathSimulator):
     """
     Generic class for shooting from a set of snapshots.
@@ -884,32 +1492,121 @@ class ShootFromSnapshotsSimulation(PathSimulator):
                 else:
                     start_snap = self.randomizer(snapshot)
 
-                sample_set = paths.SampleSet([
-                    paths.Sample(replica=0,
-                                 trajectory=paths.Trajectory([start_snap]),
-                                 ensemble=self.starting_ensemble)
-                ])
-                sample_set.sanity_check()
+                sample_set = _initial_sample_set(
+                    start_snap, self.starting_ensemble)
                 new_pmc = self.mover.move(sample_set)
-                samples = new_pmc.results
-                new_sample_set = sample_set.apply_samples(samples)
-
-                mcstep = MCStep(
-                    simulation=self,
-                    mccycle=self.step,
-                    previous=sample_set,
-                    active=new_sample_set,
-                    change=new_pmc
-                )
-
-                if self.storage is not None:
-                    self.storage.steps.save(mcstep)
-                    if self.step % self.save_frequency == 0:
-                        self.sync_storage()
+                self._save_shot(sample_set, new_pmc)
 
-                self.step += 1
             snap_num += 1
 
+    def _save_shot(self, sample_set, change):
+        """
+        Create the MCStep for a finished shot and save it to the storage
+        """
+        new_sample_set = sample_set.apply_samples(change.results)
+
+        mcstep = MCStep(
+            simulation=self,
+            mccycle=self.step,
+            previous=sample_set,
+            active=new_sample_set,
+            change=change
+        )
+
+        if self.storage is not None:
+            self.storage.steps.save(mcstep)
+            if self.step % self.save_frequency == 0:
+                self.sync_storage()
+
+        self.step += 1
+
+    def run_parallel(self, n_per_snapshot, engines=None, as_chain=False,
+                     pool=None, executor='thread'):
+        """Run the simulation with several shots at the same time.
+
+        Every shot is an independent task. The tasks are farmed out to the
+        workers of an executor and the finished steps are saved by the
+        calling thread in the same order as `run` would save them.
+
+        Each worker replaces the engine of the simulation by its own engine
+        for all movers of the tree. Only movers that are
+        :class:`.EngineMover` and use the engine of the simulation can be
+        rebound, otherwise an error is raised before any shot is run.
+
+        Parameters
+        ----------
+        n_per_snapshot : int
+            number of shots per snapshot
+        engines : list of :class:`.DynamicsEngine` or None
+            the engines to be used by the workers. An engine is used by only
+            one worker at a time, so the number of engines is the number
+            of shots run at the same time. Usually these are engines
+            created with the same options and topology as `self.engine`.
+            Required for the `'thread'` and `'process'` executors. `None`
+            (default) is only allowed if `executor` is a
+            :class:`ShotExecutor`, which has its own engines.
+        as_chain : bool
+            if as_chain is True all shots from one snapshot depend on each
+            other and are run by a single worker. See `run`.
+        pool : object or None
+            a pool implementing `apply_async` like
+            :class:`multiprocessing.pool.ThreadPool` for the thread
+            executor. If `None` a thread pool with one worker per engine is
+            created and closed afterwards.
+        executor : str or :class:`ShotExecutor`
+            `'thread'` (default) runs the shots in threads (see
+            :class:`ThreadShotExecutor`), `'process'` in separate processes
+            (see :class:`ProcessShotExecutor`). Any other backend can be
+            used by passing an instance of :class:`ShotExecutor`.
+        """
+        if isinstance(executor, ShotExecutor):
+            if engines is not None:
+                raise ValueError(
+                    'The executor has its own engines, so `engines` must be '
+                    'None.')
+        elif executor not in ['thread', 'process']:
+            raise ValueError('Unknown executor `%s`' % executor)
+        elif not engines:
+            raise ValueError(
+                'The `%s` executor needs a list of engines.' % executor)
+        elif executor == 'thread':
+            executor = ThreadShotExecutor(engines, pool)
+        else:
+            executor = ProcessShotExecutor(engines)
+
+        _check_engine_binding(self.mover, self.engine)
+
+        self.step = 0
+        n_total = len(self.initial_snapshots) * n_per_snapshot
+        executor.start(self)
+        try:
+            results = []
+            for snapshot in self.initial_snapshots:
+                selections = [
+                    _preselect_mover(self.mover, None)
+                    for _ in range(n_per_snapshot)
+                ]
+                if as_chain:
+                    tasks = [selections]
+                else:
+                    tasks = [[selection] for selection in selections]
+
+                for task in tasks:
+                    results.append(
+                        executor.submit(snapshot, task, as_chain))
+
+            for result in results:
+                for sample_set, change in result.get():
+                    paths.tools.refresh_output(
+                        "Finished shot %d / %d" % (self.step + 1, n_total),
+                        output_stream=self.output_stream,
+                        refresh=self.allow_refresh
+                    )
+                    self._save_shot(sample_set, change)
+        finally:
+            executor.close()
+
+        self.sync_storage()
 
 
 class CommittorSimulation(ShootFromSnapshotsSimulation):
@@ -31,7 +31,39 @@ class ShootingPointSelector(StorableNamedObject):
         '''
         return 1.0
 
+    @staticmethod
+    def is_shootable(snapshot):
+        """
+        Return if a trajectory can be started from a snapshot
+
+        Engines can keep only a subset of atoms for intermediate frames, like
+        the OpenMM engine with the option `subset_atom_indices`. These
+        partial frames cannot be used as shooting points and are given a
+        proposal probability of zero.
+
+        Parameters
+        ----------
+        snapshot : :class:`openpathsampling.engines.BaseSnapshot`
+
+        Returns
+        -------
+        bool
+        """
+        # only load the containers for engines that create partial frames
+        engine = getattr(snapshot, 'engine', None)
+        if getattr(engine, 'subset_atom_indices', None) is None:
+            return True
+
+        for container in [snapshot.statics, snapshot.kinetics]:
+            if getattr(container, 'is_partial', False):
+                return False
+
+        return True
+
     def probability(self, snapshot, trajectory):
+        if not self.is_shootable(snapshot):
+            return 0.0
+
         sum_bias = self.sum_bias(trajectory)
         if sum_bias > 0.0:
             return self.f(snapshot, trajectory) / sum_bias
@@ -48,7 +80,10 @@ class ShootingPointSelector(StorableNamedObject):
         Returns a list of unnormalized proposal probabilities for all
         snapshots in trajectory
         '''
-        return [self.f(s, trajectory) for s in trajectory]
+        return [
+            self.f(s, trajectory) if self.is_shootable(s) else 0.0
+            for s in trajectory
+        ]
 
     def sum_bias(self, trajectory):
         '''
@@ -128,10 +163,26 @@ class UniformSelector(ShootingPointSelector):
     def f(self, frame, trajectory=None):
         return 1.0
 
+    def _n_partial(self, trajectory):
+        # the number of frames in the selection range that cannot be picked
+        return sum(
+            1 for frame in trajectory[self.pad_start:
+                                      len(trajectory) - self.pad_end]
+            if not self.is_shootable(frame))
+
     def sum_bias(self, trajectory):
-        return float(len(trajectory) - self.pad_start - self.pad_end)
+        return float(len(trajectory) - self.pad_start - self.pad_end -
+                     self._n_partial(trajectory))
 
     def pick(self, trajectory):
+        if self._n_partial(trajectory) > 0:
+            candidates = [
+                idx for idx in range(self.pad_start,
+                                     len(trajectory) - self.pad_end)
+                if self.is_shootable(trajectory[idx])
+            ]
+            return candidates[np.random.randint(len(candidates))]
+
         idx = np.random.random_integers(self.pad_start, 
                                         len(trajectory) - self.pad_end - 1)
         return idx
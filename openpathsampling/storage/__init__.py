@@ -1,7 +1,7 @@
 from distributed import DistributedUUIDStorage, TrajectoryStorage
 
 from stores import (
-    MCStepStore, MoveChangeStore, SampleSetStore,
+    MCStepStore, StepStatistics, MoveChangeStore, SampleSetStore,
     SampleStore, TrajectoryStore, CVStore, PathSimulatorStore,
     SnapshotWrapperStore)
 
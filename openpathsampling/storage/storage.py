@@ -41,7 +41,10 @@ class Storage(NetCDFPlus):
             filename,
             mode=None,
             template=None,
-            fallback=None):
+            fallback=None,
+            layout=None,
+            lazy=False,
+            stores=None):
         """
         Create a netCDF+ storage for OPS Objects
 
@@ -55,13 +58,29 @@ class Storage(NetCDFPlus):
         template : :class:`openpathsampling.Snapshot`
             a Snapshot instance that contains a reference to a Topology, the
             number of atoms and used units
+        layout : str or None
+            the storage layout profile used for new numeric variables like
+            coordinates and velocities. One of `'default'`,
+            `'write-optimized'`, `'scan-optimized'` or `'compact'`. See
+            :attr:`NetCDFPlus.layout_profiles`. Existing files keep their
+            profile
+        lazy : bool
+            if `True` stores of an existing file are restored on first use.
+            This makes opening a file for inspection fast
+        stores : list of str or None
+            the names of the stores to restore when opening an existing file
+            like `['steps', 'cvs']`. All other stores are restored on first
+            use
         """
 
         self._template = template
         super(Storage, self).__init__(
             filename,
             mode,
-            fallback=fallback)
+            fallback=fallback,
+            layout=layout,
+            lazy=lazy,
+            stores=stores)
 
     def _create_storages(self):
         """
@@ -87,7 +106,7 @@ class Storage(NetCDFPlus):
         self.create_store('steps', paths.storage.MCStepStore())
 
         # normal objects
-        self.create_store('details', ObjectStore(paths.Details))
+        self.create_store('details', ObjectStore(paths.Details, json='binobj'))
         self.create_store('pathmovers', NamedObjectStore(paths.PathMover))
         self.create_store('shootingpointselectors',
                           NamedObjectStore(paths.ShootingPointSelector))
@@ -175,7 +194,10 @@ class Storage(NetCDFPlus):
             )
 
         for store_name, caching in cache_sizes.items():
-            if hasattr(self, store_name):
+            if store_name in self._lazy_stores:
+                # do not restore stores in lazy storages just for caching
+                self._lazy_stores[store_name].set_caching(caching)
+            elif hasattr(self, store_name):
                 store = getattr(self, store_name)
                 store.set_caching(caching)
 
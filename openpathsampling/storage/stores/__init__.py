@@ -1,5 +1,5 @@
 from collectivevariable import CVStore
-from mcstep import MCStepStore
+from mcstep import MCStepStore, StepStatistics
 from movechange import MoveChangeStore
 from sample import SampleSetStore, SampleStore
 # from snapshot_value import SnapshotValueStore
@@ -1,6 +1,62 @@
-from openpathsampling.netcdfplus import UniqueNamedObjectStore
+import multiprocessing
+import os
+import uuid
+
+import openpathsampling as paths
+import openpathsampling.engines as peng
+from openpathsampling.netcdfplus import UniqueNamedObjectStore, LoaderProxy
 from openpathsampling import CollectiveVariable
 
+# the storage opened by a worker process of `CVStore.compute_parallel`
+_worker_storage = {}
+
+
+def _compute_cv_values(task):
+    """
+    Compute CV values for stored snapshots in a worker process
+
+    The storage is opened read-only once per worker and round of
+    `CVStore.compute_parallel` and the CV is evaluated for all snapshots of
+    the task without a stored value at once.
+
+    Parameters
+    ----------
+    task : tuple
+        `(filename, token, cv_uuid, left, right)` where `token` identifies
+        the round of `compute_parallel` and `left:right` is the range of
+        stored snapshots to be computed
+
+    Returns
+    -------
+    list of int
+        the positions in the CV store
+    list
+        the values for these positions
+
+    """
+    filename, token, cv_uuid, left, right = task
+
+    if _worker_storage.get('token') != token:
+        if _worker_storage.get('storage') is not None:
+            _worker_storage['storage'].close()
+
+        _worker_storage['storage'] = paths.Storage(filename, 'r')
+        _worker_storage['token'] = token
+
+    storage = _worker_storage['storage']
+    cv = storage.cvs[cv_uuid]
+    cv_store = storage.snapshots.cv_list[cv][0]
+    positions, uuids = storage.snapshots._missing_cv_positions(
+        cv_store, left, right)
+
+    if len(positions) == 0:
+        return positions, []
+
+    values = cv(peng.Trajectory(
+        [LoaderProxy(storage.snapshots, idx) for idx in uuids]))
+
+    return positions, list(values)
+
 
 class CVStore(UniqueNamedObjectStore):
     """
@@ -48,6 +104,107 @@ class CVStore(UniqueNamedObjectStore):
     def complete(self, cv):
         self.storage.snapshots.complete_cv(cv)
 
+    def compute_parallel(
+            self, cv, n_workers=None, chunksize=None, progress=None):
+        """
+        Compute all missing values of a CV using several processes
+
+        The stored snapshots are split into blocks. Each worker opens the
+        file read-only, evaluates the CV for all snapshots of a block
+        without a stored value at once and returns the values. Blocks are
+        processed in rounds of `4 * n_workers`. The values of a round are
+        written by this process after all its blocks are done, since HDF5
+        does not support reading a file while it is written to.
+
+        Parameters
+        ----------
+        cv : :class:`openpathsampling.CollectiveVariable`
+            the CV to be computed. It needs to be saved with an incomplete
+            diskcache in this storage
+        n_workers : int or None
+            number of worker processes. If `None` the number of cpus is
+            used.
+        chunksize : int or None
+            the number of stored snapshots per block. If `None` (default)
+            `cv_block_size` of the snapshot store is used
+        progress : callable or None
+            if not `None` it is called as `progress(done, total)` with the
+            number of finished and all stored snapshots after each round
+
+        Notes
+        -----
+        The file is synced before the workers start, so all snapshots saved
+        so far are visible to them. Complete diskcaches are filled when the
+        CV is saved and are not touched.
+
+        """
+        snapshots = self.storage.snapshots
+
+        if cv not in snapshots.cv_list:
+            return
+
+        cv_store = snapshots.cv_list[cv][0]
+
+        if not cv_store.allow_incomplete:
+            return
+
+        if chunksize is None:
+            chunksize = snapshots.cv_block_size
+
+        if n_workers is None:
+            n_workers = multiprocessing.cpu_count()
+
+        n_rows = len(snapshots) / 2
+        blocks = range(0, n_rows, chunksize)
+
+        if len(blocks) == 0:
+            return
+
+        self.storage.sync()
+
+        # this process keeps the file open for writing. The workers
+        # inherit the environment when the pool is created and must not try
+        # to lock the file
+        locking = os.environ.get('HDF5_USE_FILE_LOCKING')
+        os.environ['HDF5_USE_FILE_LOCKING'] = 'FALSE'
+        try:
+            pool = multiprocessing.Pool(min(n_workers, len(blocks)))
+        finally:
+            if locking is None:
+                del os.environ['HDF5_USE_FILE_LOCKING']
+            else:
+                os.environ['HDF5_USE_FILE_LOCKING'] = locking
+
+        round_size = 4 * n_workers
+
+        try:
+            for first in range(0, len(blocks), round_size):
+                # a new token makes the workers reopen the file
+                token = uuid.uuid4().hex
+                tasks = [
+                    (self.storage.filename, token, cv.__uuid__,
+                     left, min(n_rows, left + chunksize))
+                    for left in blocks[first:first + round_size]
+                ]
+
+                # wait for all workers of the round before writing, since
+                # they still read the file
+                results = pool.map(_compute_cv_values, tasks)
+                for positions, values in results:
+                    snapshots._append_cv_values(
+                        cv_store,
+                        [pos for pos, value in zip(positions, values)
+                         if value is not None],
+                        [value for value in values if value is not None])
+
+                self.storage.sync()
+
+                if progress is not None:
+                    progress(tasks[-1][4], n_rows)
+        finally:
+            pool.close()
+            pool.join()
+
     def sync_all(self):
         map(self.sync, self)
 
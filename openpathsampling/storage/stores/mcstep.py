@@ -1,8 +1,205 @@
+import numpy as np
+
 from openpathsampling.netcdfplus import VariableStore
 from openpathsampling.pathsimulator import MCStep
 
 
+class StepStatistics(object):
+    """
+    Columnar table of the statistics of stored steps
+
+    The table is written by :class:`MCStepStore` for every saved step and
+    contains everything the usual analysis needs without loading the
+    `MoveChange` trees and `SampleSet` objects of the steps. Movers and
+    ensembles are referenced by their index in the storage.
+
+    Attributes
+    ----------
+    store : :class:`MCStepStore`
+        the store the table was read from
+    rows : list of int
+        the index of each step in the store
+    mccycle : numpy.ndarray
+        the step number of each step
+    movers : list of numpy.ndarray
+        for each step the pathmover index of each node of the move change
+        tree in pre-order. `-1` means no mover
+    parents : list of numpy.ndarray
+        for each step the position of the parent of each node of the move
+        change tree. The root has parent `-1`
+    accepted : list of numpy.ndarray
+        for each step the accepted flag of each node of the move change tree
+    replicas : list of numpy.ndarray
+        for each step the replica of each sample in the active sample set
+    ensembles : list of numpy.ndarray
+        for each step the ensemble index of each active sample
+    trajectories : list of numpy.ndarray
+        for each step the trajectory index of each active sample
+    lengths : list of numpy.ndarray
+        for each step the number of frames of each active sample
+    timing : numpy.ndarray
+        the wall time in seconds used for each move. `nan` if unknown
+    """
+
+    def __init__(self, store, rows, mccycle, movers, parents, accepted,
+                 replicas, ensembles, trajectories, lengths, timing):
+        self.store = store
+        self.rows = rows
+        self.mccycle = np.asarray(mccycle)
+        self.movers = movers
+        self.parents = parents
+        self.accepted = accepted
+        self.replicas = replicas
+        self.ensembles = ensembles
+        self.trajectories = trajectories
+        self.lengths = lengths
+        self.timing = np.asarray(timing)
+        self._keylists = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def from_steps(cls, steps):
+        """
+        Return the statistics table for steps if there is one
+
+        Parameters
+        ----------
+        steps : :class:`StepStatistics` or :class:`MCStepStore` or iterable
+            the steps to be analyzed
+
+        Returns
+        -------
+        :class:`StepStatistics` or None
+            the table or `None` if `steps` is not a store with statistics
+        """
+        if isinstance(steps, StepStatistics):
+            return steps
+        elif isinstance(steps, MCStepStore) and steps.has_statistics:
+            return steps.statistics()
+        else:
+            return None
+
+    def mover(self, idx):
+        """
+        Return the pathmover for a pathmover index in the table
+        """
+        return self.store.storage.pathmovers.load(int(idx))
+
+    def ensemble(self, idx):
+        """
+        Return the ensemble for an ensemble index in the table
+        """
+        return self.store.storage.ensembles.load(int(idx))
+
+    def replica_ensembles(self, pos):
+        """
+        Return the ensemble index for each replica of a step
+
+        Parameters
+        ----------
+        pos : int
+            the position of the step in the table
+
+        Returns
+        -------
+        dict of int : int
+        """
+        return dict(zip(
+            self.replicas[pos].tolist(), self.ensembles[pos].tolist()))
+
+    def _children(self, pos):
+        children = [[] for _ in self.parents[pos]]
+        for node, parent in enumerate(self.parents[pos].tolist()):
+            if parent >= 0:
+                children[parent].append(node)
+
+        return children
+
+    def canonical(self, pos):
+        """
+        Return the node of the canonical change of a step
+
+        Follows the same rules as
+        :attr:`openpathsampling.MoveChange.canonical`.
+
+        Parameters
+        ----------
+        pos : int
+            the position of the step in the table
+
+        Returns
+        -------
+        int or None
+            the position of the canonical node in the move change tree or
+            `None` if the step has no move change
+        """
+        if len(self.parents[pos]) == 0:
+            return None
+
+        children = self._children(pos)
+        movers = self.movers[pos]
+        node = 0
+        while len(children[node]) == 1:
+            mover = self.mover(movers[node])
+            if mover is not None and mover.is_canonical is True:
+                return node
+            node = children[node][0]
+
+        return node
+
+    def keylist(self, pos):
+        """
+        Return the keys of all nodes of the move change tree of a step
+
+        The keys are the same as the ones from
+        :meth:`openpathsampling.MoveChange.keylist`.
+
+        Parameters
+        ----------
+        pos : int
+            the position of the step in the table
+
+        Returns
+        -------
+        list of tuple(list, int)
+            the key and the position of each node in the move change tree
+        """
+        # most steps share the tree of a few others, so keep the results
+        shape = (
+            tuple(self.movers[pos].tolist()),
+            tuple(self.parents[pos].tolist()))
+        if shape in self._keylists:
+            return self._keylists[shape]
+
+        children = self._children(pos)
+        movers = [self.mover(idx) for idx in self.movers[pos]]
+
+        def subtree(node):
+            path = [movers[node]]
+            result = [(path, node)]
+            mp = []
+            for child in children[node]:
+                sub = subtree(child)
+                result.extend([(path + mp + [key], n) for key, n in sub])
+                mp.extend([sub[-1][0]])
+
+            return result
+
+        keylist = subtree(0) if len(movers) > 0 else []
+        self._keylists[shape] = keylist
+
+        return keylist
+
+
 class MCStepStore(VariableStore):
+    # columns of the statistics table besides `mccycle`
+    statistics_variables = [
+        'movers', 'parents', 'accepted', 'replicas', 'ensembles',
+        'trajectories', 'lengths', 'timing'
+    ]
+
     def __init__(self):
         super(MCStepStore, self).__init__(
             MCStep,
@@ -18,3 +215,128 @@ class MCStepStore(VariableStore):
         self.create_variable('previous', 'obj.samplesets')
         self.create_variable('simulation', 'obj.pathsimulators')
         self.create_variable('mccycle', 'int')
+
+        # statistics table
+        for name, description in [
+            ('movers', 'pathmover index of each node of the movechange'),
+            ('parents', 'parent node of each node of the movechange'),
+            ('accepted', 'accepted flag of each node of the movechange')
+        ]:
+            self.create_variable(
+                'stats_' + name,
+                'numpy.int8' if name == 'accepted' else 'numpy.int32',
+                dimensions='...',
+                description=description + ' in pre-order',
+                chunksizes=(10240,))
+
+        for name, description in [
+            ('replicas', 'replica'),
+            ('ensembles', 'ensemble index'),
+            ('trajectories', 'trajectory index'),
+            ('lengths', 'trajectory length')
+        ]:
+            self.create_variable(
+                'stats_' + name,
+                'numpy.int32',
+                dimensions='...',
+                description=description + ' of each active sample',
+                chunksizes=(10240,))
+
+        self.create_variable(
+            'stats_timing',
+            'numpy.float64',
+            description='wall time of the move in seconds')
+
+    @property
+    def has_statistics(self):
+        """
+        bool : if the store writes the statistics table
+
+        Files created before the table was added do not contain it.
+        """
+        return self.prefix + '_stats_movers' in self.storage.variables
+
+    def _save(self, step, idx):
+        super(MCStepStore, self)._save(step, idx)
+
+        if self.has_statistics:
+            self._save_statistics(step, idx)
+
+    @staticmethod
+    def _store_idx(store, obj):
+        # objects only stored in a fallback storage are not in the index
+        if obj is None:
+            return -1
+        else:
+            return store.index.get(obj.__uuid__, -1)
+
+    def _save_statistics(self, step, idx):
+        storage = self.storage
+        change = step.change
+
+        movers = []
+        parents = []
+        accepted = []
+
+        # same pre-order as iterating over the change
+        def add_node(node, parent):
+            pos = len(movers)
+            movers.append(self._store_idx(storage.pathmovers, node.mover))
+            parents.append(parent)
+            accepted.append(node.accepted)
+            for sub in node.subchanges:
+                add_node(sub, pos)
+
+        if change is not None:
+            add_node(change, -1)
+
+        samples = list(step.active) if step.active is not None else []
+
+        timing = getattr(
+            change.details if change is not None else None, 'timing', None)
+
+        self.vars['stats_movers'][idx] = np.array(movers, dtype=np.int32)
+        self.vars['stats_parents'][idx] = np.array(parents, dtype=np.int32)
+        self.vars['stats_accepted'][idx] = np.array(accepted, dtype=np.int8)
+        self.vars['stats_replicas'][idx] = np.array(
+            [sample.replica for sample in samples], dtype=np.int32)
+        self.vars['stats_ensembles'][idx] = np.array(
+            [self._store_idx(storage.ensembles, sample.ensemble)
+             for sample in samples], dtype=np.int32)
+        self.vars['stats_trajectories'][idx] = np.array(
+            [self._store_idx(storage.trajectories, sample.trajectory)
+             for sample in samples], dtype=np.int32)
+        self.vars['stats_lengths'][idx] = np.array(
+            [len(sample.trajectory) for sample in samples], dtype=np.int32)
+        self.vars['stats_timing'][idx] = \
+            np.nan if timing is None else float(timing)
+
+    def statistics(self, part=None):
+        """
+        Read the statistics table of stored steps
+
+        Parameters
+        ----------
+        part : list of int or `None`
+            the indices of the steps to be read. If `None` (default) all
+            steps are read
+
+        Returns
+        -------
+        :class:`StepStatistics`
+            the table with one row per step in the order of `part`
+        """
+        if not self.has_statistics:
+            raise RuntimeError(
+                'The storage contains no statistics table for steps.')
+
+        if part is None:
+            part = range(len(self))
+
+        columns = [
+            self._read_rows(name, part)
+            for name in ['mccycle'] +
+            ['stats_' + name for name in self.statistics_variables]
+        ]
+
+        return StepStatistics(self, list(part), *columns)
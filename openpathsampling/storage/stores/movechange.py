@@ -70,6 +70,7 @@ class MoveChangeStore(ObjectStore):
             poss = range(len(self))
             uuids = self.vars['uuid']
 
+            self.flush()
             cls_names = self.variables['cls'][:]
             samples_idxss = self.variables['samples'][:]
             subchanges_idxss = self.variables['subchanges'][:]
@@ -49,6 +49,7 @@ class SampleSetStore(VariableStore):
             list of sample indices
         """
 
+        self.flush()
         return self.variables['samples'][idx].tolist()
 
     def initialize(self):
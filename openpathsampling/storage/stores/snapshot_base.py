@@ -111,6 +111,52 @@ class BaseSnapshotStore(IndexedObjectStore):
 
         return obj
 
+    def load_bulk(self, idxs):
+        """
+        Load several snapshots at once
+
+        Parameters
+        ----------
+        idxs : list of int
+            the indices of the snapshots in the snapshot wrapper store
+
+        Returns
+        -------
+        list of :obj:`openpathsampling.engines.BaseSnapshot`
+            the loaded snapshot instances in the order of `idxs`
+        """
+        n_idxs = []
+        for idx in idxs:
+            pos = idx / 2
+            if pos in self.index:
+                n_idxs.append(self.index[pos])
+            else:
+                raise KeyError(idx)
+
+        rows = sorted(set(n_idx for n_idx in n_idxs if n_idx >= 0))
+        loaded = dict(zip(rows, self._load_bulk(rows)))
+
+        objs = []
+        for idx, n_idx in zip(idxs, n_idxs):
+            if n_idx < 0:
+                objs.append(None)
+            elif idx & 1:
+                objs.append(loaded[n_idx].reversed)
+            else:
+                objs.append(loaded[n_idx])
+
+        return objs
+
+    def _load_bulk(self, idxs):
+        objs = []
+        for idx in idxs:
+            obj = self._cls.__new__(self._cls)
+            self._cls.init_empty(obj)
+            objs.append(obj)
+
+        self._get_bulk(idxs, objs)
+        return objs
+
     def _load(self, idx):
         """
         Load a snapshot from the storage.
@@ -200,6 +246,10 @@ class BaseSnapshotStore(IndexedObjectStore):
     def _set(self, idx, snapshot):
         pass
 
+    def _get_bulk(self, idxs, snapshots):
+        for idx, snapshot in zip(idxs, snapshots):
+            self._get(idx, snapshot)
+
     def load_indices(self):
         self.index.extend(self.vars['index'])
 
@@ -228,4 +278,5 @@ class BaseSnapshotStore(IndexedObjectStore):
             return None
 
     def __len__(self):
+        self.flush()
         return len(self.storage.dimensions[self.prefix]) * 2
@@ -29,6 +29,18 @@ class FeatureSnapshotStore(BaseSnapshotStore):
         [setattr(snapshot, attr, self.vars[attr][idx])
          for attr in self.storables]
 
+    def _get_bulk(self, idxs, snapshots):
+        for attr in self.storables:
+            values = self._read_rows(attr, idxs)
+            for snapshot, value in zip(snapshots, values):
+                setattr(snapshot, attr, value)
+
+            var = self.vars[attr]
+            if var.var_type.startswith('lazy'):
+                # load the referenced objects in bulk into their cache
+                var.store.load_bulk([
+                    proxy.__uuid__ for proxy in values if proxy is not None])
+
     def initialize(self):
         super(FeatureSnapshotStore, self).initialize()
 
@@ -1,5 +1,7 @@
 import logging
 
+import numpy as np
+
 import openpathsampling.engines as peng
 from openpathsampling.netcdfplus import ObjectStore, \
     LRUChunkLoadingCache
@@ -9,6 +11,9 @@ init_log = logging.getLogger('openpathsampling.initialization')
 
 
 class SnapshotValueStore(ObjectStore):
+    # values are filled in blocks with direct slice writes
+    supports_write_buffer = False
+
     def __init__(
             self,
             time_reversible=True,
@@ -93,6 +98,84 @@ class SnapshotValueStore(ObjectStore):
 
         return obj
 
+    def _value_indices(self, items):
+        """
+        Return the rows of the values of a list of snapshots
+
+        Parameters
+        ----------
+        items : list of :class:`openpathsampling.engines.BaseSnapshot`
+
+        Returns
+        -------
+        :obj:`numpy.ndarray` of int
+            the row for each snapshot or -1 if no value is stored
+        """
+        get_pos = self.snapshot_pos
+        pos = np.fromiter(
+            (-1 if p is None else p for p in map(get_pos, items)),
+            dtype=np.int64, count=len(items))
+
+        valid = pos >= 0
+        if self.time_reversible:
+            pos[valid] //= 2
+
+        if self.allow_incomplete:
+            index = self.index
+            return np.array([
+                index.get(p, -1) if p >= 0 else -1 for p in pos.tolist()],
+                dtype=np.int64)
+        else:
+            pos[pos >= self._len] = -1
+            return pos
+
+    def get_list(self, items):
+        """
+        Return the stored values for a list of snapshots
+
+        All needed chunks of the cache are loaded at once reading
+        neighboring chunks with a single read. If more chunks are needed than
+        the cache can hold the values are read directly using a single
+        sorted index.
+
+        Parameters
+        ----------
+        items : list of :class:`openpathsampling.engines.BaseSnapshot`
+
+        Returns
+        -------
+        list
+            the values in the order of `items`. `None` for snapshots without
+            a stored value
+        """
+        n_idxs = self._value_indices(items)
+        results = [None] * len(items)
+
+        valid = np.nonzero(n_idxs >= 0)[0]
+        if len(valid) == 0:
+            return results
+
+        rows = n_idxs[valid]
+
+        cache = self.cache
+        if isinstance(cache, LRUChunkLoadingCache):
+            chunks = np.unique(rows // cache.chunksize)
+            if len(chunks) <= cache.max_chunks:
+                cache.load_chunks(chunks.tolist())
+                for pos, n_idx in zip(valid.tolist(), rows.tolist()):
+                    try:
+                        results[pos] = cache[n_idx]
+                    except KeyError:
+                        results[pos] = self.vars['value'][n_idx]
+
+                return results
+
+        values = self._read_rows('value', rows.tolist())
+        for pos, value in zip(valid.tolist(), values):
+            results[pos] = value
+
+        return results
+
     def __setitem__(self, idx, value):
         pos = self.snapshot_pos(idx)
 
@@ -1,9 +1,12 @@
 import logging
 from uuid import UUID
 
+import numpy as np
+
 import openpathsampling.engines as peng
 from openpathsampling.netcdfplus import ObjectStore, with_timing_logging, \
     NetCDFPlus, LoaderProxy
+from openpathsampling.netcdfplus.stores.object import HashedList
 
 from snapshot_feature import FeatureSnapshotStore
 from snapshot_value import SnapshotValueStore
@@ -12,46 +15,94 @@ logger = logging.getLogger(__name__)
 init_log = logging.getLogger('openpathsampling.initialization')
 
 
-class ReversalHashedList(dict):
+class ReversalHashedList(HashedList):
+    """
+    A :class:`HashedList` for pairs of uuids that differ only in the last bit
+
+    Reversed snapshots share a position and the position of the reversed
+    snapshot is the position of the other one with the last bit flipped.
+    """
     def __init__(self):
-        dict.__init__(self)
-        self._list = []
+        super(ReversalHashedList, self).__init__()
+
+    def _base_get(self, key):
+        if self._base is None:
+            return None
+
+        # the stored uuid might be either of the pair
+        pos = self._base.find(key & ~1)
+        if pos is not None:
+            return pos * 2 ^ (key & 1)
+
+        pos = self._base.find(key | 1)
+        if pos is not None:
+            return pos * 2 ^ (key & 1) ^ 1
+
+        return None
+
+    def _base_uuid(self, pos):
+        return self._base.uuid(pos / 2) ^ (pos & 1)
+
+    def _base_items(self, uuids):
+        return [
+            (key & ~1, idx * 2 ^ (key & 1))
+            for idx, key in enumerate(uuids)]
 
     def append(self, key):
-        dict.__setitem__(self, key & ~1, len(self._list) * 2 ^ (key & 1))
+        dict.__setitem__(
+            self, key & ~1, (self._n_base + len(self._list)) * 2 ^ (key & 1))
         self._list.append(key)
 
     def extend(self, t):
-        l = len(self._list)
+        l = self._n_base + len(self._list)
         # t = filter(t, lambda x : x not in self)
         map(lambda x, y: dict.__setitem__(self, x & ~1, y * 2 ^ (x & 1)), t,
             range(l, l + len(t)))
         self._list.extend(t)
 
     def __len__(self):
-        return len(self._list) * 2
+        return (self._n_base + len(self._list)) * 2
 
     def __setitem__(self, key, value):
+        if self._base is not None:
+            if self._base_get(key) == value:
+                return
+
+            self.materialize()
+
         # we will always store the ones with even keys
         dict.__setitem__(self, key & ~1, value ^ (key & 1))
         # we will always store the ones with even value
         self._list[value / 2] = key ^ (value & 1)
 
     def get(self, key, d=None):
-        uu = dict.get(self, key & ~1, d)
+        uu = dict.get(self, key & ~1, None)
         if uu is not None:
             return uu ^ (key & 1)
-        else:
-            return d
+
+        uu = self._base_get(key)
+        if uu is not None:
+            return uu
+
+        return d
 
     def __getitem__(self, key):
-        return dict.__getitem__(self, key & ~1) ^ (key & 1)
+        uu = self.get(key)
+        if uu is None:
+            raise KeyError(key)
+
+        return uu
 
     def __contains__(self, key):
-        return dict.__contains__(self, key & ~1)
+        return dict.__contains__(self, key & ~1) or \
+            self._base_get(key) is not None
 
     def index(self, key):
-        return self._list[key / 2] ^ (key & 1)
+        n_base = self._n_base * 2
+        if 0 <= key < n_base:
+            return self._base_uuid(key)
+
+        return self._list[(key - n_base) / 2] ^ (key & 1)
 
     def mark(self, key):
         k = key & ~1
@@ -60,7 +111,7 @@ class ReversalHashedList(dict):
 
     def unmark(self, key):
         k = key & ~1
-        if k in self:
+        if dict.__contains__(self, k):
             dict.__delitem__(self, k)
 
 
@@ -68,6 +119,10 @@ class SnapshotWrapperStore(ObjectStore):
     """
     A Store to store arbitrary snapshots
     """
+
+    # number of snapshots processed at once when filling CV stores
+    cv_block_size = 4096
+
     def __init__(self):
         super(SnapshotWrapperStore, self).__init__(
             peng.BaseSnapshot,
@@ -194,10 +249,82 @@ class SnapshotWrapperStore(ObjectStore):
 
         return obj
 
+    def load_bulk(self, idxs):
+        """
+        Load several snapshots at once
+
+        Snapshots not in the cache are grouped by their snapshot store. Each
+        variable of a snapshot store is then read once for all its
+        snapshots, including lazily loaded features like coordinates and
+        velocities. All loaded objects are added to the caches.
+
+        Parameters
+        ----------
+        idxs : list of int or long
+            the integer indices or uuids of the snapshots
+
+        Returns
+        -------
+        list of :obj:`openpathsampling.engines.BaseSnapshot`
+            the loaded snapshots in the order of `idxs`
+        """
+        objs = [None] * len(idxs)
+        missing = {}
+
+        for pos, idx in enumerate(idxs):
+            if type(idx) is long:
+                if idx not in self.index:
+                    # let load handle the fallbacks
+                    objs[pos] = self.load(idx)
+                    continue
+
+                n_idx = self.index[idx]
+            else:
+                n_idx = int(idx)
+
+            try:
+                objs[pos] = self.cache[n_idx]
+            except KeyError:
+                try:
+                    objs[pos] = self.cache[n_idx ^ 1].reversed
+                except KeyError:
+                    missing.setdefault(n_idx, []).append(pos)
+
+        if not missing:
+            return objs
+
+        n_idxs = sorted(missing)
+        store_idxs = self._read_rows('store', [n_idx / 2 for n_idx in n_idxs])
+
+        by_store = {}
+        for n_idx, store_idx in zip(n_idxs, store_idxs):
+            if store_idx is None:
+                # not stored here so use the fallbacks
+                obj = self._load(n_idx)
+                if obj is not None:
+                    self._get_id(n_idx, obj)
+                    self.cache[n_idx] = obj
+
+                for pos in missing[n_idx]:
+                    objs[pos] = obj
+            else:
+                by_store.setdefault(store_idx, []).append(n_idx)
+
+        for store_idx, store_n_idxs in by_store.items():
+            store = self.store_snapshot_list[store_idx]
+            for n_idx, obj in zip(
+                    store_n_idxs, store.load_bulk(store_n_idxs)):
+                self._get_id(n_idx, obj)
+                self.cache[n_idx] = obj
+                for pos in missing[n_idx]:
+                    objs[pos] = obj
+
+        return objs
+
     def _load(self, idx):
-        store_idx = int(self.variables['store'][idx / 2])
+        store_idx = self.vars['store'][idx / 2]
 
-        if store_idx < 0:
+        if store_idx is None:
             # print store_idx, self.storage, self.name, idx
             if self.fallback_store is not None:
                 return self.fallback_store.load(idx)
@@ -213,6 +340,7 @@ class SnapshotWrapperStore(ObjectStore):
             return snap
 
     def __len__(self):
+        self.flush()
         return len(self.storage.dimensions[self.prefix]) * 2
 
     def initialize(self):
@@ -241,6 +369,7 @@ class SnapshotWrapperStore(ObjectStore):
 
         store = FeatureSnapshotStore(descriptor)
 
+        self.storage.wait_for_writer()
         store_idx = int(len(self.storage.dimensions['snapshottype']))
         store_name = 'snapshot' + str(store_idx)
         self.storage.register_store(store_name, store, False)
@@ -292,7 +421,7 @@ class SnapshotWrapperStore(ObjectStore):
 
     @with_timing_logging
     def load_indices(self):
-        self.index.extend(self.vars['uuid'][:])
+        super(SnapshotWrapperStore, self).load_indices()
 
     def get_cv_cache(self, idx):
         store_name = SnapshotWrapperStore._get_cv_name(idx)
@@ -329,8 +458,8 @@ class SnapshotWrapperStore(ObjectStore):
 
         if n_idx is not None:
             # snapshot is mentioned
-            store_idx = int(self.variables['store'][n_idx / 2])
-            if not store_idx == -1:
+            store_idx = self.vars['store'][n_idx / 2]
+            if store_idx is not None:
                 # and stored
                 return self.reference(obj)
 
@@ -379,6 +508,7 @@ class SnapshotWrapperStore(ObjectStore):
 
         except KeyError:
             # there is no store yet to handle the given type of snapshot
+            self.storage.wait_for_writer()
             mode = self.treat_missing_snapshot_type
             if mode == 'create' or \
                     (mode == 'single' and
@@ -428,15 +558,28 @@ class SnapshotWrapperStore(ObjectStore):
                         cv_store.vars['value'][n_idx] = value
                         cv_store.cache[n_idx] = value
 
-    def complete_cv(self, cv):
+    def complete_cv(self, cv, chunksize=None, start=0, progress=None):
         """
         Compute all missing values of a CV and store them
 
+        The stored snapshots are processed in blocks. For each block the
+        missing values are taken from the CV cache or computed using a
+        single call to the CV and then written at once.
 
         Parameters
         ----------
         cv : :obj:`openpathsampling.CollectiveVariable`
-
+        chunksize : int or None
+            the number of stored snapshots processed per block. If `None`
+            (default) `cv_block_size` is used
+        start : int
+            the index of the stored snapshot (counting a snapshot and its
+            reversed partner as one) to start with. Values already stored
+            are skipped anyway, but an interrupted run can be resumed
+            faster using the last `done` reported to `progress`
+        progress : callable or None
+            if not `None` it is called as `progress(done, total)` after each
+            block. All values for the first `done` snapshots are on disk.
 
         """
         if cv not in self.cv_list:
@@ -444,113 +587,193 @@ class SnapshotWrapperStore(ObjectStore):
 
         cv_store = self.cv_list[cv][0]
 
-        if cv_store.allow_incomplete:
+        if not cv_store.allow_incomplete:
             # for complete this does not make sense
+            return
 
-            # TODO: Make better looping over this to not have
-            # to load all the indices at once
-            # can be problematic for 10M+ stored snapshots
-            indices = self.vars['uuid'][:]
+        n_rows = len(self) / 2
 
-            for pos, idx in enumerate(indices):
-                if not cv_store.time_reversible:
-                    pos *= 2
+        if chunksize is None:
+            chunksize = self.cv_block_size
 
-                proxy = None
+        for left in range(start, n_rows, chunksize):
+            right = min(n_rows, left + chunksize)
 
-                if pos not in cv_store.index:
-                    # this value is not stored to go ahead
+            positions, uuids = self._missing_cv_positions(
+                cv_store, left, right)
 
-                    proxy = self.storage.snapshots[idx]
+            if len(positions) > 0:
+                values = self._get_cv_values(
+                    cv, [LoaderProxy(self, idx) for idx in uuids])
+                self._append_cv_values(
+                    cv_store,
+                    [pos for pos, value in zip(positions, values)
+                     if value is not None],
+                    [value for value in values if value is not None])
 
-                    # get from cache first, this is fastest
-                    value = cv._cache_dict._get(proxy)
+                self.storage.sync()
 
-                    if value is None:
-                        # not in cache so compute it if possible
-                        if cv._eval_dict:
-                            value = cv._eval_dict([proxy])[0]
-                        else:
-                            value = None
+            logger.info(
+                'Completed CV %s for %d of %d snapshots' %
+                (cv.name, right, n_rows))
 
-                    if value is not None:
-                        n_idx = cv_store.free()
+            if progress is not None:
+                progress(right, n_rows)
 
-                        cv_store.vars['value'][n_idx] = value
-                        cv_store.vars['index'][n_idx] = pos
-                        cv_store.index[pos] = n_idx
-                        cv_store.cache[n_idx] = value
+    def sync_cv(self, cv, chunksize=None):
+        """
+        Store all cached values of a CV in the diskcache
 
-                if not cv_store.time_reversible:
-                    pos += 1
-                    if pos not in cv_store.index:
-                        if proxy is None:
-                            proxy = self.storage.snapshots[idx]
+        Parameters
+        ----------
+        cv : :obj:`openpathsampling.CollectiveVariable`
+        chunksize : int or None
+            the maximal number of values written at once. If `None` (default)
+            `cv_block_size` is used
 
-                        if proxy._reversed is not None:
-                            proxy = proxy._reversed
-                        else:
-                            proxy = proxy.reversed
+        """
 
-                        # get from cache first, this is fastest
-                        value = cv._cache_dict._get(proxy)
+        if cv not in self.cv_list:
+            return
 
-                        if value is None:
-                            # not in cache so compute it if possible
-                            if cv._eval_dict:
-                                value = cv._eval_dict([proxy])[0]
-                            else:
-                                value = None
+        cv_store = self.cv_list[cv][0]
 
-                        if value is not None:
-                            n_idx = cv_store.free()
+        # for complete this does not make sense
+        if not cv_store.allow_incomplete:
+            return
+
+        if chunksize is None:
+            chunksize = self.cv_block_size
+
+        positions = []
+        values = []
+        pending = set()
+
+        # loop all objects in the fast CV cache
+        for obj, value in cv._cache_dict.cache.iteritems():
+            if value is not None:
+                pos = self.pos(obj)
+
+                # if the snapshot is not saved, nothing we can do
+                if pos is None:
+                    continue
+
+                if cv_store.time_reversible:
+                    pos /= 2
+
+                if pos in cv_store.index or pos in pending:
+                    # this value is stored so skip it
+                    continue
 
-                            cv_store.vars['value'][n_idx] = value
-                            cv_store.vars['index'][n_idx] = pos
-                            cv_store.index[pos] = n_idx
-                            cv_store.cache[n_idx] = value
+                pending.add(pos)
+                positions.append(pos)
+                values.append(value)
 
-    def sync_cv(self, cv):
+                if len(values) == chunksize:
+                    self._append_cv_values(cv_store, positions, values)
+                    positions = []
+                    values = []
+
+        self._append_cv_values(cv_store, positions, values)
+
+    def _missing_cv_positions(self, cv_store, left, right):
         """
-        Store all cached values of a CV in the diskcache
+        Return the positions and uuids of snapshots without a stored value
 
         Parameters
         ----------
-        cv : :obj:`openpathsampling.CollectiveVariable`
+        cv_store : :obj:`openpathsampling.storage.stores.SnapshotValueStore`
+            an incomplete CV store
+        left : int
+            the first stored snapshot to check
+        right : int
+            the stored snapshot after the last one to check
 
+        Returns
+        -------
+        list of int
+            the positions in the CV store that have no value
+        list of long
+            the uuids of the snapshots belonging to the positions
 
         """
+        positions = []
+        uuids = []
+        for row, uuid in enumerate(self.vars['uuid'][left:right], left):
+            if cv_store.time_reversible:
+                candidates = [(row, uuid)]
+            else:
+                candidates = [(2 * row, uuid), (2 * row + 1, uuid ^ 1)]
 
-        if cv not in self.cv_list:
+            for pos, idx in candidates:
+                if pos not in cv_store.index:
+                    positions.append(pos)
+                    uuids.append(idx)
+
+        return positions, uuids
+
+    @staticmethod
+    def _get_cv_values(cv, snapshots):
+        """
+        Return the values of a CV using cached values if possible
+
+        Missing values are computed using a single call to the CV function.
+        Values that cannot be determined are `None`.
+
+        """
+        values = cv._cache_dict._get_list(snapshots)
+
+        missing = [pos for pos, value in enumerate(values) if value is None]
+        if len(missing) > 0 and cv._eval_dict:
+            computed = cv._eval_dict([snapshots[pos] for pos in missing])
+            for pos, value in zip(missing, computed):
+                values[pos] = value
+
+        return values
+
+    @staticmethod
+    def _write_values(variable, left, values):
+        """
+        Write a list of values to consecutive positions in a variable
+
+        Numeric values are written using a single slice assignment
+
+        """
+        if len(values) == 0:
             return
 
-        cv_store = self.cv_list[cv][0]
+        var_type = variable.variable.var_type
 
-        # for complete this does not make sense
-        if cv_store.allow_incomplete:
+        if var_type in ['float', 'int'] or var_type.startswith('numpy.'):
+            if hasattr(values[0], 'unit'):
+                unit = values[0].unit
+                block = np.array(
+                    [value.value_in_unit(unit) for value in values]) * unit
+            else:
+                block = np.array(values)
 
-            # loop all objects in the fast CV cache
-            for obj, value in cv._cache_dict.cache.iteritems():
-                if value is not None:
-                    pos = self.pos(obj)
+            variable[left:left + len(values)] = block
+        else:
+            for pos, value in enumerate(values, left):
+                variable[pos] = value
 
-                    # if the snapshot is not saved, nothing we can do
-                    if pos is None:
-                        continue
+    def _append_cv_values(self, cv_store, positions, values):
+        """
+        Append values for the given snapshot positions to an incomplete store
 
-                    if cv_store.time_reversible:
-                        pos /= 2
+        """
+        if len(values) == 0:
+            return
+
+        n_idx = cv_store.free()
 
-                    if pos in cv_store.index:
-                        # this value is stored so skip it
-                        continue
+        self._write_values(cv_store.vars['value'], n_idx, values)
+        cv_store.vars['index'][n_idx:n_idx + len(positions)] = positions
 
-                    n_idx = cv_store.free()
+        for idx, pos in enumerate(positions, n_idx):
+            cv_store.index[pos] = idx
 
-                    cv_store.vars['value'][n_idx] = value
-                    cv_store.vars['index'][n_idx] = pos
-                    cv_store.index[pos] = n_idx
-                    cv_store.cache[n_idx] = value
+        cv_store.cache.update_size()
 
     def free(self):
         idx = len(self)
@@ -684,30 +907,33 @@ class SnapshotWrapperStore(ObjectStore):
 
         store.initialize()
 
+        self.storage.wait_for_writer()
         store_idx = int(len(self.storage.dimensions['cvcache']))
         self.cv_list[cv] = (store, store_idx)
         self.storage.vars['cvcache'][store_idx] = store
 
         # use the cache and function of the CV to fill the store when it is made
         if not allow_incomplete:
+            n_rows = len(self) / 2
+            block_size = self.cv_block_size
 
-            indices = self.vars['uuid'][:]
+            for left in range(0, n_rows, block_size):
+                right = min(n_rows, left + block_size)
 
-            for pos, idx in enumerate(indices):
+                proxies = [
+                    LoaderProxy(self.storage.snapshots, idx)
+                    for idx in self.vars['uuid'][left:right]]
 
-                proxy = LoaderProxy(self.storage.snapshots, idx)
-                value = cv._cache_dict._get(proxy)
+                values = self._get_cv_values(cv, proxies)
 
-                if value is None:
-                    # not in cache so compute it if possible
-                    if cv._eval_dict:
-                        value = cv._eval_dict([proxy])[0]
-                    else:
-                        value = None
+                if all(value is not None for value in values):
+                    self._write_values(store.vars['value'], left, values)
+                else:
+                    for pos, value in enumerate(values, left):
+                        if value is not None:
+                            store.vars['value'][pos] = value
 
-                if value is not None:
-                    store.vars['value'][pos] = value
-                    store.cache[pos] = value
+            store.cache.update_size()
 
         cv.set_cache_store(store)
         return store, store_idx
@@ -1,10 +1,17 @@
+import numpy as np
+
 from openpathsampling.engines.trajectory import Trajectory
-from openpathsampling.netcdfplus import ObjectStore, LoaderProxy
+from openpathsampling.netcdfplus import ObjectStore, LoaderProxy, \
+    StorableObject, UUIDArray
 
 
 class TrajectoryStore(ObjectStore):
+    # the number of trajectories read at once by `build_snapshot_index`
+    snapshot_index_block_size = 1024
+
     def __init__(self):
         super(TrajectoryStore, self).__init__(Trajectory)
+        self._snapshot_index = None
 
     def to_dict(self):
         return {}
@@ -18,6 +25,11 @@ class TrajectoryStore(ObjectStore):
                 loader = store.proxy(snapshot)
                 trajectory[frame] = loader
 
+        if self._snapshot_index is not None:
+            self._add_to_snapshot_index(
+                idx, [snapshot.__uuid__ for snapshot in
+                      trajectory.iter_proxies()])
+
     def mention(self, trajectory):
         """
         Save a trajectory and store its snapshots only shallow
@@ -94,6 +106,7 @@ class TrajectoryStore(ObjectStore):
         """
 
         # get the values
+        self.flush()
         return self.variables['snapshots'][idx].tolist()
 
     def iter_snapshot_indices(self):
@@ -110,6 +123,142 @@ class TrajectoryStore(ObjectStore):
         for snap_idx in range(len(self)):
             yield self.snapshot_indices(snap_idx)
 
+    def _add_to_snapshot_index(self, idx, uuids):
+        for uuid in uuids:
+            if uuid is not None:
+                trajectories = self._snapshot_index.setdefault(uuid, [])
+                if not trajectories or trajectories[-1] != idx:
+                    trajectories.append(idx)
+
+    def build_snapshot_index(self):
+        """
+        (Re)build the index of trajectories by contained snapshot
+
+        The index maps the uuid of each snapshot to the sorted list of indices
+        of all stored trajectories that contain it. It is built from the file
+        by reading the snapshot references of `snapshot_index_block_size`
+        trajectories at a time and is then kept up to date when trajectories
+        are saved. This is only needed explicitly, if the file has been
+        changed by another storage.
+
+        """
+        self.flush()
+        self._snapshot_index = {}
+
+        variable = self.variables['snapshots']
+        n_trajectories = len(variable)
+        block_size = self.snapshot_index_block_size
+
+        for first in range(0, n_trajectories, block_size):
+            last = min(n_trajectories, first + block_size)
+            rows = variable[first:last]
+            lengths = [len(row) // 36 for row in rows]
+            if sum(lengths) == 0:
+                continue
+
+            # cut all references of the block into uuid strings at once
+            chunks = np.array([''.join(rows)], dtype='S').view('S36')
+            is_uuid = chunks.view(np.uint8).reshape(-1, 36)[:, 0] != ord('-')
+            owners = np.repeat(np.arange(first, last), lengths)[is_uuid]
+            uuids = UUIDArray.from_strings(chunks[is_uuid]).uuids()
+
+            index = self._snapshot_index
+            for idx, uuid in zip(owners.tolist(), uuids):
+                trajectories = index.setdefault(uuid, [])
+                if not trajectories or trajectories[-1] != idx:
+                    trajectories.append(idx)
+
+    @property
+    def snapshot_index(self):
+        """
+        dict of int, list of int : the trajectory indices by snapshot uuid
+
+        See Also
+        --------
+        build_snapshot_index
+        """
+        if self._snapshot_index is None:
+            self.build_snapshot_index()
+
+        return self._snapshot_index
+
+    def trajectory_indices(self, snapshot, time_reversal=False):
+        """
+        Return the indices of all stored trajectories that contain a snapshot
+
+        Parameters
+        ----------
+        snapshot : :class:`openpathsampling.engines.BaseSnapshot` or int
+            the snapshot or its uuid
+        time_reversal : bool
+            if `True` trajectories containing the reversed snapshot are
+            included as well
+
+        Returns
+        -------
+        list of int
+            the sorted indices of the trajectories
+
+        """
+        uuid = getattr(snapshot, '__uuid__', snapshot)
+        index = self.snapshot_index
+
+        indices = index.get(uuid, [])
+        if time_reversal:
+            reversed_indices = index.get(StorableObject.ruuid(uuid), [])
+            if reversed_indices:
+                indices = sorted(set(indices) | set(reversed_indices))
+
+        return list(indices)
+
+    def trajectories_containing(self, snapshot, time_reversal=False):
+        """
+        Return all stored trajectories that contain a snapshot
+
+        Parameters
+        ----------
+        snapshot : :class:`openpathsampling.engines.BaseSnapshot` or int
+            the snapshot or its uuid
+        time_reversal : bool
+            if `True` trajectories containing the reversed snapshot are
+            included as well
+
+        Returns
+        -------
+        list of :class:`openpathsampling.Trajectory`
+            the trajectories in the order they were stored
+
+        """
+        return [
+            self[idx] for idx in self.trajectory_indices(
+                snapshot, time_reversal)]
+
+    def correlated_indices(self, trajectory, time_reversal=False):
+        """
+        Return the indices of all stored trajectories sharing a snapshot
+
+        This is the stored equivalent of `Trajectory.is_correlated` and does
+        not need to load any of the stored trajectories.
+
+        Parameters
+        ----------
+        trajectory : :class:`openpathsampling.Trajectory`
+            the trajectory to compare with. It does not need to be stored
+        time_reversal : bool
+            if `True` reversed snapshots are regarded as shared as well
+
+        Returns
+        -------
+        list of int
+            the sorted indices of the trajectories
+
+        """
+        indices = set()
+        for snapshot in trajectory.iter_proxies():
+            indices.update(self.trajectory_indices(snapshot, time_reversal))
+
+        return sorted(indices)
+
     def initialize(self, units=None):
         super(TrajectoryStore, self).initialize()
 
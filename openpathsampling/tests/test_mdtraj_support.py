@@ -11,7 +11,8 @@ import openpathsampling as paths
 import mdtraj as md
 
 from openpathsampling.engines.openmm.tools import (
-    trajectory_from_mdtraj, trajectory_to_mdtraj, ops_load_trajectory
+    trajectory_from_mdtraj, trajectory_to_mdtraj, ops_load_trajectory,
+    MDTrajConversionCache
 )
 
 logging.getLogger('opentis.trajectory').setLevel(logging.DEBUG)
@@ -48,6 +49,44 @@ class testMDTrajSupport(object):
         md2 = trajectory_to_mdtraj([snap])
         assert_equal(md1, md2)
 
+    def test_conversion_cache(self):
+        cache = MDTrajConversionCache(size_limit=2)
+
+        # outside of a block nothing is shared
+        md0 = cache(self.ops_trajectory, self.md_topology)
+        assert md0 is not cache(self.ops_trajectory, self.md_topology)
+        assert_equal(len(cache), 0)
+        md0.xyz[0, 0, 0] = 1.0
+
+        with cache:
+            md1 = cache(self.ops_trajectory, self.md_topology)
+            nptest.assert_allclose(self.md_trajectory.xyz, md1.xyz)
+            nptest.assert_allclose(self.md_trajectory.unitcell_vectors,
+                                   md1.unitcell_vectors)
+
+            # the same snapshots share the conversion
+            md2 = cache(list(self.ops_trajectory), self.md_topology)
+            assert md1 is not md2
+            assert md1.xyz is md2.xyz
+
+            md3 = cache(self.ops_trajectory.reversed, self.md_topology)
+            assert md1.xyz is not md3.xyz
+            nptest.assert_allclose(self.md_trajectory.xyz[::-1], md3.xyz)
+
+            cache(self.ops_trajectory[0:1], self.md_topology)
+            assert_equal(len(cache), 2)
+            md4 = cache(self.ops_trajectory, self.md_topology)
+            assert md4.xyz is not md1.xyz
+
+        assert_equal(len(cache), 0)
+
+    @raises(ValueError)
+    def test_conversion_cache_read_only(self):
+        cache = MDTrajConversionCache()
+        with cache:
+            md1 = cache(self.ops_trajectory, self.md_topology)
+            md1.xyz[0, 0, 0] = 1.0
+
     def test_ops_load_trajectory_pdb(self):
         pdb_file = data_filename("ala_small_traj.pdb")
         ops_trajectory = ops_load_trajectory(pdb_file)
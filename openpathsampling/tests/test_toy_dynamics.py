@@ -125,6 +125,32 @@ class testCombinations(object):
         assert_almost_equal(self.simpletest.kinetic_energy(self), 0.4575)
 
 
+class testBatchPES(object):
+    def setUp(self):
+        self.positions = np.array([init_pos, init_pos[::-1], init_vel])
+        self.velocities = np.array([init_vel, init_vel, init_pos])
+        self.mass = sys_mass
+
+    def test_V_dVdx(self):
+        for pes in [harmonic, gaussian, outer, linear,
+                    gaussian + outer - linear]:
+            batch_V = pes.V(self)
+            batch_dVdx = pes.dVdx(self)
+            assert_equal(batch_V.shape, (3,))
+            for idx in range(3):
+                single = testLinearSlope()
+                single.positions = self.positions[idx]
+                single.mass = self.mass
+                assert_almost_equal(batch_V[idx], pes.V(single))
+                np.testing.assert_allclose(
+                    (batch_dVdx * np.ones((3, 2)))[idx], pes.dVdx(single))
+
+    def test_kinetic_energy(self):
+        ke = harmonic.kinetic_energy(self)
+        assert_equal(ke.shape, (3,))
+        assert_almost_equal(ke[0], 0.4575)
+
+
 # === TESTS FOR TOY ENGINE OBJECT =========================================
 
 class test_convert_fcn(object):
@@ -235,6 +261,58 @@ class testToyEngine(object):
         self.sim.stop([snap])
 
 
+class testBatchToyEngine(object):
+    def setUp(self):
+        topology = toy.Topology(n_spatial=2, masses=sys_mass, pes=harmonic)
+        self.engine = toy.Engine(
+            options={'integ': toy.LeapfrogVerletIntegrator(dt=0.002),
+                     'n_frames_max': 50,
+                     'n_steps_per_frame': 10},
+            topology=topology
+        )
+        self.batch = toy.BatchEngine(
+            options={'integ': toy.LeapfrogVerletIntegrator(dt=0.002),
+                     'n_frames_max': 50,
+                     'n_steps_per_frame': 10},
+            topology=topology
+        )
+        self.snaps = [
+            toy.Snapshot(coordinates=np.array([init_pos]),
+                         velocities=np.array([init_vel]),
+                         engine=self.engine),
+            toy.Snapshot(coordinates=np.array([init_vel]),
+                         velocities=np.array([init_pos]),
+                         engine=self.engine)
+        ]
+
+    def test_generate_batch(self):
+        running = [lambda traj, trusted=False: len(traj) < 4]
+        trajs = self.batch.generate_batch(self.snaps, running)
+        assert_equal([len(t) for t in trajs], [4, 4])
+        for snap, traj in zip(self.snaps, trajs):
+            single = self.engine.generate(snap, running)
+            assert_equal(len(single), len(traj))
+            for s1, s2 in zip(single, traj):
+                np.testing.assert_allclose(s1.coordinates, s2.coordinates)
+                np.testing.assert_allclose(s1.velocities, s2.velocities)
+
+    def test_generate_batch_per_walker(self):
+        # the second walker starts with a larger distance from x0
+        cv = paths.FunctionCV("x", lambda snap: snap.xyz[0][0])
+        running = [paths.AllInXEnsemble(
+            paths.CVDefinedVolume(cv, 0.0, 0.705)).can_append]
+        trajs = self.batch.generate_batch(self.snaps, running)
+        assert_not_equal(len(trajs[0]), len(trajs[1]))
+        assert_equal(self.batch.positions, None)
+
+    def test_generate_batch_backward(self):
+        running = [lambda traj, trusted=False: len(traj) < 3]
+        trajs = self.batch.generate_batch(self.snaps, running, direction=-1)
+        for snap, traj in zip(self.snaps, trajs):
+            assert_equal(len(traj), 3)
+            assert_equal(traj[-1], snap)
+
+
 # === TESTS FOR TOY INTEGRATORS ===========================================
 
 class testLeapfrogVerletIntegrator(object):
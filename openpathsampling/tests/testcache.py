@@ -0,0 +1,101 @@
+from nose.tools import (assert_equal, assert_true, raises)
+
+import numpy as np
+
+import openpathsampling as paths
+from openpathsampling.netcdfplus import SizeAwareCache, WeakKeyCache
+from openpathsampling.netcdfplus.cache import nbytes_of
+from test_helpers import make_1d_traj
+
+
+class testSizeAwareCache(object):
+    def setup(self):
+        self.value = np.zeros(10)   # 80 bytes
+        self.spilled = []
+
+    def test_nbytes(self):
+        assert_equal(nbytes_of(self.value), 80)
+        assert_equal(nbytes_of(np.float32(1.0)), 4)
+        assert_true(nbytes_of([self.value, self.value]) > 160)
+
+    def test_hits_and_misses(self):
+        cache = SizeAwareCache(max_bytes=1000)
+        cache['a'] = self.value
+        assert_true(cache['a'] is self.value)
+        assert_equal(cache.get('b'), None)
+        assert_equal(cache.hits, 1)
+        assert_equal(cache.misses, 1)
+        assert_equal(cache.stats['hit_rate'], 0.5)
+        assert_equal(cache.nbytes, 80)
+        cache.reset_stats()
+        assert_equal(cache.hits, 0)
+
+    def test_lru_eviction(self):
+        cache = SizeAwareCache(
+            max_bytes=200, spill=lambda k, v: self.spilled.append(k))
+        cache['a'] = self.value
+        cache['b'] = self.value
+        cache['a']
+        cache['c'] = self.value
+        assert_equal(sorted(cache.keys()), ['a', 'c'])
+        assert_equal(self.spilled, ['b'])
+        assert_equal(cache.evictions, 1)
+        assert_equal(cache.nbytes, 160)
+        assert_equal(list(cache), ['c', 'a'])
+
+    def test_lfu_eviction(self):
+        cache = SizeAwareCache(max_bytes=200, policy='lfu')
+        cache['a'] = self.value
+        cache['b'] = self.value
+        cache['a']
+        cache['a']
+        cache['b']
+        cache['c'] = self.value
+        assert_equal(sorted(cache.keys()), ['a', 'c'])
+        cache['c']
+        cache['c']
+        cache['c']
+        cache['d'] = self.value
+        assert_equal(sorted(cache.keys()), ['c', 'd'])
+        cache['e'] = np.zeros(30)
+        assert_equal(cache.keys(), [])
+
+    def test_replace_and_resize(self):
+        cache = SizeAwareCache(max_bytes=1000)
+        cache['a'] = self.value
+        cache['a'] = np.zeros(20)
+        assert_equal(cache.nbytes, 160)
+        cache['b'] = self.value
+        cache.max_bytes = 100
+        assert_equal(cache.keys(), ['b'])
+        del cache['b']
+        assert_equal(cache.nbytes, 0)
+        assert_equal(len(cache), 0)
+
+    @raises(ValueError)
+    def test_bad_policy(self):
+        SizeAwareCache(policy='fifo')
+
+
+class testCVCacheLimit(object):
+    def setup(self):
+        self.traj = make_1d_traj([0.0, 1.0, 2.0, 3.0])
+        self.cv = paths.FunctionCV("x", lambda snap: snap.xyz[0][0])
+
+    def test_with_cache_limit(self):
+        values = self.cv(self.traj)
+        assert_true(isinstance(self.cv.cache, WeakKeyCache))
+        self.cv.with_cache_limit(1000, policy='lfu')
+        cache = self.cv.cache
+        assert_true(isinstance(cache, SizeAwareCache))
+        assert_equal(cache.policy, 'lfu')
+        assert_equal(len(cache), len(self.traj))
+        assert_equal(list(self.cv(self.traj)), list(values))
+        assert_equal(cache.hits, len(self.traj))
+
+    def test_budget(self):
+        nbytes = nbytes_of(self.cv(self.traj[0]))
+        self.cv.with_cache_limit(2 * nbytes)
+        self.cv(self.traj)
+        assert_equal(len(self.cv.cache), 2)
+        assert_equal(self.cv.cache.evictions, 2)
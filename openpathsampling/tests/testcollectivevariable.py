@@ -342,3 +342,164 @@ class test_FunctionCV(object):
 
             if os.path.isfile(fname):
                 os.remove(fname)
+
+    def test_storage_complete_chunked(self):
+        import os
+
+        fname = data_filename("cv_storage_test.nc")
+        if os.path.isfile(fname):
+            os.remove(fname)
+
+        traj = paths.Trajectory(list(self.traj_simple))
+        template = traj[0]
+
+        storage_w = paths.Storage(fname, "w")
+        storage_w.snapshots.save(template)
+        storage_w.trajectories.save(traj[3:])
+        storage_w.snapshots.save(traj[1].reversed)
+        storage_w.trajectories.save(traj.reversed)
+        assert (len(storage_w.snapshots) == 20)
+
+        cv1 = paths.CoordinateFunctionCV(
+            'f1',
+            lambda snapshot: snapshot.coordinates[0]
+        ).with_diskcache(
+            allow_incomplete=True
+        )
+
+        storage_w.save(cv1)
+        store = storage_w.cvs.cache_store(cv1)
+
+        # values in the CV cache are reused
+        _ = cv1(traj[0:2])
+
+        reported = []
+        storage_w.snapshots.complete_cv(
+            cv1, chunksize=3, start=4,
+            progress=lambda done, total: reported.append((done, total)))
+
+        assert (reported == [(7, 10), (10, 10)])
+        assert (len(store.vars['value']) == 6)
+
+        # running again from the start fills in the rest
+        storage_w.snapshots.complete_cv(cv1, chunksize=3)
+        assert (len(store.vars['value']) == 10)
+        assert (len(set(store.variables['index'][:])) == 10)
+
+        for idx, value in zip(
+                store.variables['index'][:],
+                store.vars['value']):
+            snap = storage_w.snapshots[
+                storage_w.snapshots.vars['uuid'][idx]]
+
+            assert_close_unit(cv1(snap), value)
+
+        storage_w.close()
+
+        if os.path.isfile(fname):
+            os.remove(fname)
+
+    def test_storage_get_list(self):
+        import os
+
+        for allow_incomplete in (True, False):
+            fname = data_filename("cv_storage_test.nc")
+            if os.path.isfile(fname):
+                os.remove(fname)
+
+            traj = paths.Trajectory(list(self.traj_simple))
+
+            storage_w = paths.Storage(fname, "w")
+            storage_w.snapshots.save(traj[0])
+
+            cv1 = paths.CoordinateFunctionCV(
+                'f1',
+                lambda x: x.coordinates[0]
+            ).with_diskcache(
+                allow_incomplete=allow_incomplete
+            )
+
+            storage_w.save(cv1)
+            storage_w.trajectories.save(traj)
+
+            # an incomplete cache only stores values that were computed
+            _ = cv1(traj)
+            storage_w.snapshots.sync_cv(cv1)
+            storage_w.close()
+
+            storage_r = paths.AnalysisStorage(fname)
+            rcv1 = storage_r.cvs['f1']
+            cv_cache = rcv1._store_dict.value_store
+
+            loaded = storage_r.trajectories[0]
+            items = list(loaded.reversed) + list(loaded)
+
+            # single and batched reads agree
+            values = cv_cache.get_list(items)
+            assert (len(values) == len(items))
+            for snap, value in zip(items, values):
+                assert_close_unit(value, cv_cache.get(snap))
+                assert_close_unit(value, cv1(snap))
+
+            # a snapshot without a value gives None
+            unknown = traj[0].copy_with_replacement(
+                coordinates=traj[0].coordinates)
+            assert (cv_cache.get_list([unknown]) == [None])
+
+            storage_r.close()
+
+            if os.path.isfile(fname):
+                os.remove(fname)
+
+    def test_storage_compute_parallel(self):
+        import os
+
+        fname = data_filename("cv_storage_test.nc")
+        if os.path.isfile(fname):
+            os.remove(fname)
+
+        traj = paths.Trajectory(list(self.traj_simple))
+        template = traj[0]
+
+        storage_w = paths.Storage(fname, "w")
+        storage_w.snapshots.save(template)
+        storage_w.trajectories.save(traj)
+        assert (len(storage_w.snapshots) == 20)
+
+        cv1 = paths.CoordinateFunctionCV(
+            'f1',
+            lambda snapshot: snapshot.coordinates[0]
+        ).with_diskcache(
+            allow_incomplete=True
+        )
+
+        storage_w.save(cv1)
+        store = storage_w.cvs.cache_store(cv1)
+
+        # values already in the diskcache are not computed again
+        storage_w.snapshots.sync_cv(cv1)
+        _ = cv1(traj[0:2])
+        storage_w.snapshots.sync_cv(cv1)
+        assert (len(store.vars['value']) == 2)
+
+        reported = []
+        storage_w.cvs.compute_parallel(
+            cv1, n_workers=2, chunksize=3,
+            progress=lambda done, total: reported.append((done, total)))
+
+        assert (reported == [(10, 10)])
+        assert (len(store.vars['value']) == 10)
+        assert (len(set(store.variables['index'][:])) == 10)
+
+        for idx, value in zip(
+                store.variables['index'][:],
+                store.vars['value']):
+            snap = storage_w.snapshots[
+                storage_w.snapshots.vars['uuid'][idx]]
+
+            assert_close_unit(cv1(snap), value)
+
+        storage_w.close()
+
+        if os.path.isfile(fname):
+            os.remove(fname)
@@ -1,5 +1,5 @@
 from nose.tools import (assert_equal, assert_not_equal, assert_items_equal,
-                        raises)
+                        assert_true, raises)
 from nose.plugins.skip import SkipTest
 from test_helpers import (CallIdentity, prepend_exception_message,
                           make_1d_traj, raises_with_message_like,
@@ -1529,6 +1529,183 @@ class testSequentialEnsembleCache(EnsembleCacheTest):
 
 
 
+class testEnsembleChecker(EnsembleTest):
+    def setUp(self):
+        self.inX = AllInXEnsemble(vol1)
+        self.outX = AllOutXEnsemble(vol1)
+        self.hitX = PartInXEnsemble(vol1)
+        self.leaveX0 = PartOutXEnsemble(vol2)
+        self.length1 = LengthEnsemble(1)
+        self.pseudo_minus = SequentialEnsemble([
+            self.inX & self.length1,
+            self.outX,
+            self.inX,
+            self.outX,
+            self.inX & self.length1
+        ])
+        self.tis = SequentialEnsemble([
+            self.inX & self.length1,
+            self.outX & self.leaveX0,
+            self.inX & self.length1,
+        ])
+        self.optional = SequentialEnsemble([
+            OptionalEnsemble(self.inX),
+            self.outX,
+            SingleFrameEnsemble(self.inX)
+        ])
+        self.exitsX = ExitsXEnsemble(vol1)
+        self.entersX = EntersXEnsemble(vol1)
+        self.ensembles = [self.inX, self.outX, self.hitX, self.leaveX0,
+                          self.inX | self.length1, self.tis,
+                          self.pseudo_minus, self.optional,
+                          MinusInterfaceEnsemble(vol1, vol2),
+                          self.exitsX, self.entersX,
+                          self.hitX & self.exitsX,
+                          SequentialEnsemble([self.entersX, self.inX]),
+                          SlicedTrajectoryEnsemble(self.inX, slice(1, None)),
+                          SlicedTrajectoryEnsemble(self.outX, -1),
+                          SlicedTrajectoryEnsemble(self.hitX, slice(0, 3)),
+                          SlicedTrajectoryEnsemble(self.exitsX,
+                                                   slice(None, -1)),
+                          SlicedTrajectoryEnsemble(self.inX,
+                                                   slice(None, None, 2)),
+                          ReversedTrajectoryEnsemble(self.tis),
+                          ReversedTrajectoryEnsemble(self.exitsX)]
+
+    def _check_growth(self, ensemble, traj, direction):
+        checker = ensemble.checker(direction)
+        for i in range(len(traj)):
+            if direction > 0:
+                checker.append(traj[i])
+                subtraj = traj[:i+1]
+                can_extend = ensemble.can_append(subtraj)
+            else:
+                checker.prepend(traj[-1-i])
+                subtraj = traj[-1-i:]
+                can_extend = ensemble.can_prepend(subtraj)
+            failmsg = ("Failure in " + str(direction) + " " +
+                       tstr(subtraj) + ": ")
+            self._single_test(lambda t: checker.can_extend, subtraj,
+                              can_extend, failmsg)
+            self._single_test(lambda t: checker.in_ensemble, subtraj,
+                              ensemble(subtraj), failmsg)
+
+    def test_checker_append(self):
+        for ensemble in self.ensembles:
+            for traj in ttraj.values():
+                self._check_growth(ensemble, traj, +1)
+
+    def test_checker_prepend(self):
+        for ensemble in self.ensembles:
+            for traj in ttraj.values():
+                self._check_growth(ensemble, traj, -1)
+
+    def test_call_as_running_condition(self):
+        traj = ttraj['upper_in_out_in_in_out_in']
+        checker = self.pseudo_minus.checker(+1)
+        for i in range(1, len(traj) + 1):
+            assert_equal(checker(traj[:i], trusted=(i > 1)),
+                         self.pseudo_minus.can_append(traj[:i]))
+        assert_equal(len(checker.trajectory), len(traj))
+        # untrusted or non-contiguous calls start over
+        assert_equal(checker(traj[2:4], trusted=True),
+                     self.pseudo_minus.can_append(traj[2:4]))
+        assert_equal(len(checker.trajectory), 2)
+
+    def test_prefix_suffix_checker(self):
+        traj = ttraj['upper_in_out_in_in_out_in']
+        prefix = PrefixTrajectoryEnsemble(self.pseudo_minus, traj[:2])
+        checker = prefix.checker(+1)
+        for i in range(2, len(traj)):
+            checker.append(traj[i])
+            assert_equal(checker.can_extend, prefix.can_append(traj[2:i+1]))
+
+        suffix = SuffixTrajectoryEnsemble(self.pseudo_minus, traj[-2:])
+        checker = suffix.checker(-1)
+        backward = traj[:-2].reversed
+        for i in range(len(backward)):
+            checker.append(backward[i])
+            assert_equal(checker.can_extend,
+                         suffix.can_prepend(backward[:i+1]))
+
+    def test_running_conditions_use_checkers(self):
+        condition = paths.engines.DynamicsEngine._as_checker(self.tis.can_append)
+        assert_true(isinstance(condition, EnsembleChecker))
+        assert_equal(condition.direction, +1)
+        condition = paths.engines.DynamicsEngine._as_checker(self.tis.can_prepend)
+        assert_equal(condition.direction, -1)
+        function = lambda traj, trusted: True
+        assert_equal(paths.engines.DynamicsEngine._as_checker(function), function)
+
+
+class testCompiledEnsemble(EnsembleTest):
+    def setUp(self):
+        self.inX = AllInXEnsemble(vol1)
+        self.outX = AllOutXEnsemble(vol1)
+        self.length1 = LengthEnsemble(1)
+        self.pseudo_minus = SequentialEnsemble([
+            self.inX & self.length1,
+            self.outX,
+            self.inX,
+            self.outX,
+            self.inX & self.length1
+        ])
+        self.tis = SequentialEnsemble([
+            self.inX & self.length1,
+            self.outX & PartOutXEnsemble(vol2),
+            self.inX & self.length1,
+        ])
+        self.ensembles = [
+            self.inX, self.outX, PartInXEnsemble(vol1),
+            ExitsXEnsemble(vol1), EntersXEnsemble(vol1),
+            self.inX | self.length1, self.tis, self.pseudo_minus,
+            SequentialEnsemble([OptionalEnsemble(self.inX), self.outX,
+                                SingleFrameEnsemble(self.inX)]),
+            SequentialEnsemble([self.inX, SlicedTrajectoryEnsemble(
+                AllOutXEnsemble(vol1), slice(1, None))]),
+            MinusInterfaceEnsemble(vol1, vol2),
+            LengthEnsemble(slice(2, 4)) & ~self.inX
+        ]
+
+    def test_volumes(self):
+        compiled = self.tis.compiled()
+        assert_equal(compiled.volumes, [vol1, vol2])
+        traj = ttraj['upper_in_out_in']
+        masks = compiled.masks(traj).masks
+        assert_equal(masks.shape, (2, 3))
+        assert_equal(masks[0].tolist(), [True, False, True])
+
+    def test_same_results(self):
+        functions = ['__call__', 'can_append', 'can_prepend',
+                     'strict_can_append', 'strict_can_prepend']
+        for ensemble in self.ensembles:
+            compiled = ensemble.compiled()
+            for test in ttraj.keys():
+                traj = ttraj[test]
+                for fname in functions:
+                    failmsg = ("Failure in " + fname + " " + test + "(" +
+                               str(traj) + ") for " + repr(ensemble) + ": ")
+                    self._single_test(getattr(compiled, fname), traj,
+                                      getattr(ensemble, fname)(traj),
+                                      failmsg)
+
+    def test_split(self):
+        traj = ttraj['upper_in_out_in_in_out_in']
+        traj = traj + ttraj['lower_in_out_in_in'] + traj
+        for ensemble in self.ensembles:
+            compiled = ensemble.compiled()
+            for reverse in [False, True]:
+                for overlap in [0, 1]:
+                    assert_equal(
+                        list(compiled.iter_valid_slices(
+                            traj, overlap=overlap, reverse=reverse)),
+                        list(ensemble.iter_valid_slices(
+                            traj, overlap=overlap, reverse=reverse))
+                    )
+            assert_equal(compiled.split(traj, n_results=1),
+                         ensemble.split(traj, n_results=1))
+
+
 class testSlicedTrajectoryEnsemble(EnsembleTest):
     def test_sliced_ensemble_init(self):
         init_as_int = SlicedTrajectoryEnsemble(AllInXEnsemble(vol1), 3)
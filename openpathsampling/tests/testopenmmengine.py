@@ -2,9 +2,11 @@
 @author David W.H. Swenson
 """
 
+import os
+
 import numpy as np
 import simtk.openmm as mm
-from nose.tools import (assert_equal)
+from nose.tools import (assert_equal, assert_raises)
 from simtk import unit as u
 from simtk.openmm import app
 
@@ -12,6 +14,7 @@ import openpathsampling.engines.openmm as peng
 import openpathsampling.engines as dyn
 
 import openpathsampling as paths
+from openpathsampling.storage import Storage
 
 from openpathsampling.ensemble import EnsembleFactory as ef
 
@@ -253,3 +256,128 @@ class testOpenMMEngine(object):
 
         # make sure there is no change!
         assert_equal(init_samp[0].trajectory, init_traj)
+
+    def test_context_pool(self):
+        pool = peng.context_pool
+        pool.clear()
+        integrator = mm.LangevinIntegrator(
+            300*u.kelvin,
+            1.0/u.picoseconds,
+            2.0*u.femtoseconds
+        )
+        engine = peng.Engine(
+            template.topology,
+            system,
+            integrator,
+            options={'n_steps_per_frame': 2, 'n_frames_max': 5,
+                     'use_context_pool': True}
+        )
+        engine.initialize('CPU')
+        engine.current_snapshot = template
+        traj = engine.generate_n_frames(2)
+        assert_equal(len(traj), 2)
+
+        # the simulation went back to the pool after the trajectory
+        assert(engine._simulation is None)
+        assert_equal(pool.usage()['CPU']['contexts'], 1)
+        assert_equal(pool.usage()['CPU']['in_use'], 0)
+        assert(engine.current_snapshot is traj[-1])
+
+        # a different temperature reuses the context
+        hot_integrator = mm.LangevinIntegrator(
+            400*u.kelvin,
+            1.0/u.picoseconds,
+            2.0*u.femtoseconds
+        )
+        hot_engine = engine.from_new_options(integrator=hot_integrator)
+        hot_engine.initialize('CPU')
+        assert_equal(len(pool), 1)
+        assert_equal(
+            hot_engine.simulation.integrator.getTemperature(),
+            400*u.kelvin)
+        assert_equal(integrator.getTemperature(), 300*u.kelvin)
+
+        # while it is in use another engine gets a new context
+        engine.initialize('CPU')
+        assert_equal(pool.usage()['CPU']['contexts'], 2)
+        assert_equal(pool.usage()['CPU']['in_use'], 2)
+        # and the state of the engine is restored into it
+        state = engine.simulation.context.getState(getPositions=True)
+        np.testing.assert_almost_equal(
+            state.getPositions(asNumpy=True) / u.nanometers,
+            traj[-1].coordinates / u.nanometers, decimal=5)
+
+        # the seed is only read on creation, so it needs its own context
+        hot_engine.unload_context()
+        seeded_integrator = mm.LangevinIntegrator(
+            300*u.kelvin,
+            1.0/u.picoseconds,
+            2.0*u.femtoseconds
+        )
+        seeded_integrator.setRandomNumberSeed(17)
+        seeded_engine = engine.from_new_options(integrator=seeded_integrator)
+        seeded_engine.initialize('CPU')
+        assert_equal(pool.usage()['CPU']['contexts'], 3)
+        assert_equal(
+            seeded_engine.simulation.integrator.getRandomNumberSeed(), 17)
+
+        seeded_engine.unload_context()
+        engine.unload_context()
+        pool.clear()
+        assert_equal(len(pool), 0)
+
+    def test_subset_frames(self):
+        solute = range(22)
+        engine = self.engine.from_new_options(options={
+            'subset_atom_indices': solute,
+            'full_frame_interval': 2
+        })
+        assert_equal(engine.descriptor.dimensions['n_subset_atoms'], 22)
+        engine.initialize('CPU')
+        engine.current_snapshot = template
+        traj = engine.generate_n_frames(5)
+
+        partial = peng.features.PartialStaticContainer
+        # every second frame and the last one are complete
+        assert_equal(
+            [isinstance(snap.statics, partial) for snap in traj],
+            [True, False, True, False, False])
+        assert_equal(traj[0].xyz.shape, traj[1].xyz.shape)
+        assert(not np.any(np.isnan(traj[0].xyz[:22])))
+        assert(np.all(np.isnan(traj[0].xyz[22:])))
+        assert(np.all(np.isnan(traj[0].kinetics.velocities._value[22:])))
+
+        # partial frames cannot be used to start
+        assert_raises(
+            ValueError, setattr, engine, 'current_snapshot', traj[0])
+
+        # and are never picked as shooting points
+        selector = paths.UniformSelector(pad_start=0, pad_end=0)
+        assert_equal(selector.sum_bias(traj), 3.0)
+        assert_equal(selector.probability(traj[0], traj), 0.0)
+        for _ in range(10):
+            assert(not isinstance(traj[selector.pick(traj)].statics, partial))
+
+        # returned frames are not changed by later frames
+        engine.current_snapshot = template
+        first = engine.generate_next_frame()
+        assert(isinstance(first.statics, partial))
+        statics = first.statics
+        engine.generate_next_frame()
+        assert(first.statics is statics)
+
+        filename = data_filename("subset_frames_test.nc")
+        store = Storage(filename=filename, mode='w')
+        store.trajectories.save(traj)
+        store.close()
+
+        store = Storage(filename=filename, mode='r')
+        loaded = store.trajectories[0]
+        for snap, loaded_snap in zip(traj, loaded):
+            assert_equal(isinstance(loaded_snap.statics, partial),
+                         isinstance(snap.statics, partial))
+            np.testing.assert_almost_equal(
+                loaded_snap.xyz[:22], snap.xyz[:22], decimal=5)
+
+        store.close()
+        os.remove(filename)
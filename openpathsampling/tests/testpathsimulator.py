@@ -310,6 +310,72 @@ class testCommittorSimulation(object):
         assert_true(counts['bkwd'] > 0)
         assert_equal(counts['fwd'] + counts['bkwd'], 20)
 
+    def _parallel_engines(self):
+        return [
+            toys.Engine(
+                options={
+                    'integ': toys.LeapfrogVerletIntegrator(0.1),
+                    'n_frames_max': 100000,
+                    'n_steps_per_frame': 5
+                },
+                topology=self.engine.topology
+            ) for _ in range(2)
+        ]
+
+    def _check_parallel_steps(self, engines):
+        assert_equal(len(self.simulation.storage.steps), 10)
+        movers = [self.simulation.forward_mover,
+                  self.simulation.backward_mover]
+        for idx, step in enumerate(self.simulation.storage.steps):
+            assert_equal(step.mccycle, idx)
+            step.active.sanity_check()
+            # the steps use the original objects and not copies
+            canonical = step.change.canonical
+            assert_true(any(canonical.mover is mover for mover in movers))
+            assert_true(step.active[0].ensemble in [
+                self.simulation.forward_ensemble,
+                self.simulation.backward_ensemble])
+            assert_true(
+                any(snap in [self.snap0, self.snap0.reversed]
+                    for snap in canonical.trials[0].trajectory))
+            new_engines = set([
+                snap.engine for snap in canonical.trials[0].trajectory
+                if snap.engine is not self.engine])
+            assert_equal(len(new_engines), 1)
+            assert_true(new_engines.pop() in engines)
+            # movers are not rebound outside of the workers
+            assert_true(canonical.mover.engine is self.engine)
+
+    def test_committor_run_parallel(self):
+        engines = self._parallel_engines()
+        self.simulation.run_parallel(n_per_snapshot=10, engines=engines)
+        self._check_parallel_steps(engines)
+
+    def test_committor_run_parallel_processes(self):
+        engines = self._parallel_engines()
+        self.simulation.run_parallel(n_per_snapshot=10, engines=engines,
+                                     executor='process')
+        self._check_parallel_steps(engines)
+
+    @raises(ValueError)
+    def test_run_parallel_no_engines(self):
+        self.simulation.run_parallel(n_per_snapshot=2, executor='process')
+
+    @raises(ValueError)
+    def test_run_parallel_other_engine(self):
+        engines = self._parallel_engines()
+        self.simulation.forward_mover.engine = engines[0]
+        self.simulation.run_parallel(n_per_snapshot=2, engines=engines)
+
+    @raises(TypeError)
+    def test_run_parallel_unbindable_mover(self):
+        engines = self._parallel_engines()
+        mover = paths.PathReversalMover(self.simulation.starting_ensemble)
+        mover.engine = self.engine
+        self.simulation.mover = paths.RandomChoiceMover(
+            [self.simulation.forward_mover, mover])
+        self.simulation.run_parallel(n_per_snapshot=2, engines=engines)
+
     def test_forward_only_committor(self):
         sim = CommittorSimulation(storage=self.storage,
                                   engine=self.engine,
@@ -610,3 +676,125 @@ class testDirectSimulation(object):
         assert_equal(len(traj), 201)
         read_store.close()
         os.remove(tmpfile)
+
+
+class testPathSamplingParallel(object):
+    def setup(self):
+        cv = paths.FunctionCV("Id", lambda snap: snap.xyz[0][0])
+        self.stateA = paths.CVDefinedVolume(cv, -1.0, 0.0)
+        self.stateB = paths.CVDefinedVolume(cv, 1.0, 2.0)
+        interfaces = paths.VolumeInterfaceSet(cv, -1.0, [0.0, 0.2, 0.4])
+        network = paths.MISTISNetwork([
+            (self.stateA, interfaces, self.stateB)
+        ])
+        transition = network.input_transitions[(self.stateA, self.stateB)]
+        self.ensembles = transition.ensembles
+        self.movers = [paths.PathReversalMover(ens)
+                       for ens in self.ensembles]
+        root = paths.RandomChoiceMover(self.movers)
+        scheme = paths.LockedMoveScheme(root, network)
+        init_traj = make_1d_traj([-0.5, 0.5, 1.5])
+        init_conds = paths.SampleSet([
+            paths.Sample(replica=i, trajectory=init_traj, ensemble=ens)
+            for (i, ens) in enumerate(self.ensembles)
+        ])
+        self.sim = paths.PathSampling(storage=None,
+                                      move_scheme=scheme,
+                                      sample_set=init_conds)
+        self.sim.output_stream = open(os.devnull, "w")
+
+    def test_mover_resources(self):
+        res = [PathSampling._mover_resources(m) for m in self.movers]
+        assert_true(res[0].isdisjoint(res[1]))
+        assert_true(res[1].isdisjoint(res[2]))
+        assert_equal(res[0], set([self.ensembles[0]]))
+
+    def test_run_parallel(self):
+        self.sim.run_parallel(6, n_workers=2)
+        assert_equal(self.sim.step, 6)
+        assert_equal(self.sim.current_step.mccycle, 6)
+        assert_equal(len(self.sim.sample_set), len(self.ensembles))
+        change = self.sim.current_step.change
+        assert_true(isinstance(change, paths.PathSimulatorMoveChange))
+        assert_true(change.subchange.subchange.mover in self.movers)
+        self.sim.sample_set.sanity_check()
+
+
+class testStepStatistics(object):
+    def setup(self):
+        cv = paths.FunctionCV("Id", lambda snap: snap.xyz[0][0])
+        self.stateA = paths.CVDefinedVolume(cv, -1.0, 0.0)
+        self.stateB = paths.CVDefinedVolume(cv, 1.0, 2.0)
+        interfaces = paths.VolumeInterfaceSet(cv, -1.0, [0.0, 0.2, 0.4])
+        network = paths.MISTISNetwork([
+            (self.stateA, interfaces, self.stateB)
+        ])
+        transition = network.input_transitions[(self.stateA, self.stateB)]
+        self.ensembles = transition.ensembles
+        movers = [paths.PathReversalMover(ens) for ens in self.ensembles]
+        movers.append(paths.ReplicaExchangeMover(
+            self.ensembles[0], self.ensembles[1]))
+        root = paths.RandomChoiceMover(movers)
+        self.scheme = paths.LockedMoveScheme(root, network)
+        init_traj = make_1d_traj([-0.5, 0.5, 1.5])
+        init_conds = paths.SampleSet([
+            paths.Sample(replica=i, trajectory=init_traj, ensemble=ens)
+            for (i, ens) in enumerate(self.ensembles)
+        ])
+
+        self.filename = data_filename("step_statistics_test.nc")
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+        self.storage = paths.Storage(self.filename, "w", init_traj[0])
+        self.sim = paths.PathSampling(storage=self.storage,
+                                      move_scheme=self.scheme,
+                                      sample_set=init_conds)
+        self.sim.output_stream = open(os.devnull, "w")
+        self.sim.run(20)
+
+    def teardown(self):
+        self.storage.close()
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+    def test_table(self):
+        steps = self.storage.steps
+        assert_true(steps.has_statistics)
+        table = steps.statistics()
+        assert_equal(len(table), 21)
+        assert_equal(table.mccycle.tolist(), range(21))
+        assert_true(np.isnan(table.timing[0]))
+        assert_true(np.all(table.timing[1:] >= 0.0))
+        for pos, step in enumerate(steps):
+            active = step.active
+            assert_equal(table.replicas[pos].tolist(),
+                         [s.replica for s in active])
+            assert_equal([table.ensemble(idx) for idx in table.ensembles[pos]],
+                         [s.ensemble for s in active])
+            assert_equal(table.lengths[pos].tolist(),
+                         [len(s.trajectory) for s in active])
+            assert_equal(
+                table.mover(table.movers[pos][table.canonical(pos)]),
+                step.change.canonical.mover)
+            assert_equal(table.accepted[pos].tolist(),
+                         [int(m.accepted) for m in step.change])
+
+        part = table.store.statistics([3, 1])
+        assert_equal(part.mccycle.tolist(), [3, 1])
+
+    def test_analysis_from_table(self):
+        steps = list(self.storage.steps)
+
+        self.scheme._mover_acceptance = {}
+        self.scheme.move_acceptance(steps)
+        expected = self.scheme._mover_acceptance
+        self.scheme._mover_acceptance = {}
+        self.scheme.move_acceptance(self.storage.steps)
+        assert_equal(self.scheme._mover_acceptance, expected)
+
+        repx = paths.ReplicaNetwork(self.scheme, steps)
+        expected = repx.analyze_exchanges(steps, force=True)
+        assert_equal(
+            repx.analyze_exchanges(self.storage.steps, force=True),
+            expected)
@@ -5,14 +5,16 @@
 import os
 
 import mdtraj as md
-from nose.tools import (assert_equal)
+from simtk import unit as u
+from nose.tools import (assert_equal, assert_raises)
 
 import openpathsampling as paths
 
 import openpathsampling.engines.openmm as peng
 import openpathsampling.engines.toy as toys
 
-from openpathsampling.netcdfplus import ObjectJSON
+from openpathsampling.netcdfplus import ObjectJSON, ObjectBinary, \
+    BackgroundWriter, WriteBuffer
 from openpathsampling.storage import Storage
 from test_helpers import (data_filename,
                           compare_snapshot
@@ -361,6 +363,382 @@ class testStorage(object):
         assert(len(store.dimensions['snapshots']) == 1)
         store.close()
 
+    def test_write_buffer(self):
+        store = Storage(filename=self.filename, mode='w')
+        store.set_write_buffer()
+
+        n_stored = len(store.dimensions['snapshots'])
+        store.trajectories.save(self.traj)
+
+        # rows are pending but can be read
+        assert_equal(len(store.dimensions['snapshots']), n_stored)
+        assert_equal(len(store.dimensions['trajectories']), 0)
+        assert_equal(
+            store.snapshots.vars['uuid'][n_stored], self.traj[0].__uuid__)
+        assert_equal(
+            store.trajectories.vars['uuid'][0], self.traj.__uuid__)
+
+        store.sync()
+        assert_equal(
+            len(store.dimensions['snapshots']), n_stored + len(self.traj))
+        assert_equal(len(store.dimensions['trajectories']), 1)
+
+        # the length of a store includes pending rows
+        reversed_traj = self.traj.reversed
+        store.trajectories.save(reversed_traj)
+        assert_equal(len(store.trajectories), 2)
+        store.close()
+
+        store = Storage(filename=self.filename, mode='r')
+        loaded = store.trajectories[0]
+        assert_equal(len(loaded), len(self.traj))
+        for snap, loaded_snap in zip(self.traj, loaded):
+            compare_snapshot(loaded_snap, snap, True)
+
+        assert_equal(store.trajectories[1].__uuid__, reversed_traj.__uuid__)
+        store.close()
+
+    def test_load_bulk(self):
+        store = Storage(filename=self.filename, mode='w')
+        store.trajectories.save(self.traj)
+        store.close()
+
+        store = Storage(filename=self.filename, mode='r')
+        loaded = store.trajectories[0]
+        snapshots = loaded.preload()
+
+        assert_equal(len(snapshots), len(self.traj))
+        for snap, loaded_snap in zip(self.traj, snapshots):
+            assert_equal(loaded_snap.__uuid__, snap.__uuid__)
+            compare_snapshot(loaded_snap, snap, True)
+
+        # the snapshots are now taken from the cache
+        for frame, loaded_snap in enumerate(snapshots):
+            assert(loaded[frame] is loaded_snap)
+
+        store.snapshots.cache.clear()
+        idxs = [store.idx(self.traj[2]), store.idx(self.traj[0].reversed)]
+        snap2, snap0_rev = store.snapshots.load_bulk(idxs)
+        compare_snapshot(snap2, self.traj[2], True)
+        compare_snapshot(snap0_rev, self.traj[0].reversed, True)
+
+        store.close()
+
+    def test_export_mmap(self):
+        store = Storage(filename=self.filename, mode='w')
+        store.trajectories.save(self.traj)
+        store.close()
+
+        store = Storage(filename=self.filename, mode='r')
+        snapshot_store = store.snapshots.store_snapshot_list[0]
+        statics = store.stores[snapshot_store.prefix + 'statics']
+        coordinates = statics.coordinates_as_numpy()
+
+        filenames = store.export_mmap()
+        var_name = statics.prefix + '_coordinates'
+        assert(store.mmap_filename(var_name) in filenames)
+        assert(store.mmap(var_name) is not None)
+
+        mapped = statics.coordinates_as_numpy()
+        assert(isinstance(mapped, np.memmap))
+        np.testing.assert_array_equal(mapped, coordinates)
+        np.testing.assert_array_equal(
+            statics.coordinates_as_numpy([1, 2], [0, 3]),
+            coordinates[[1, 2]][:, [0, 3]])
+
+        loaded = store.trajectories[0].preload()
+        for snap, loaded_snap in zip(self.traj, loaded):
+            compare_snapshot(loaded_snap, snap, True)
+
+        store.use_mmap = False
+        assert(store.mmap(var_name) is None)
+        store.close()
+
+        for filename in filenames:
+            os.remove(filename)
+
+    def test_background_writer(self):
+        store = Storage(filename=self.filename, mode='w')
+        store.set_background_writer(max_jobs=2)
+        assert(store.trajectories.write_buffer is not None)
+        assert(store.trajectories.write_buffer.writer is store.writer)
+
+        store.trajectories.save(self.traj)
+        store.trajectories.write_buffer.flush_async()
+        store.sync()
+
+        # reads wait for the writer
+        assert_equal(len(store.trajectories), 1)
+        loaded = store.trajectories[0]
+        for snap, loaded_snap in zip(self.traj, loaded):
+            compare_snapshot(loaded_snap, snap, True)
+
+        store.flush()
+        assert(not store.writer.busy)
+        store.close()
+
+        store = Storage(filename=self.filename, mode='r')
+        loaded = store.trajectories[0]
+        for snap, loaded_snap in zip(self.traj, loaded):
+            compare_snapshot(loaded_snap, snap, True)
+        store.close()
+
+    def test_background_writer_error(self):
+        def fail():
+            raise ValueError('failed')
+
+        writer = BackgroundWriter()
+        writer.submit(fail)
+        assert_raises(ValueError, writer.wait)
+        writer.stop()
+        assert_raises(RuntimeError, writer.submit, fail)
+
+    def test_write_buffer_error(self):
+        class FailingVariable(object):
+            dtype = np.dtype('float32')
+            shape = (0,)
+
+            def __init__(self):
+                self.rows = {}
+                self.fail = True
+
+            def __setitem__(self, key, value):
+                if self.fail:
+                    raise IOError('failed')
+
+                if type(key) is slice:
+                    for pos, idx in enumerate(range(key.start, key.stop)):
+                        self.rows[idx] = value[pos]
+                else:
+                    self.rows[key] = value
+
+        variable = FailingVariable()
+        buffer = WriteBuffer()
+        buffer.add(variable, 0, 1.0)
+        buffer.add(variable, 1, 2.0)
+        assert_raises(IOError, buffer.flush)
+
+        # the rows are still pending after a failed write
+        assert_equal(len(buffer), 2)
+        assert_equal(buffer.get(variable, 1), 2.0)
+
+        variable.fail = False
+        buffer.flush()
+        assert_equal(len(buffer), 0)
+        assert_equal(variable.rows, {0: 1.0, 1: 2.0})
+
+        # the same for rows handed to a background writer
+        variable.fail = True
+        buffer.writer = BackgroundWriter()
+        buffer.add(variable, 2, 3.0)
+        buffer.flush_async()
+        buffer.add(variable, 3, 4.0)
+        assert_raises(IOError, buffer.wait)
+        assert_equal(len(buffer), 2)
+
+        variable.fail = False
+        buffer.flush()
+        assert_equal(variable.rows[2], 3.0)
+        assert_equal(variable.rows[3], 4.0)
+        buffer.writer.stop()
+
+    def test_container_deduplication(self):
+        store = Storage(filename=self.filename, mode='w')
+        snap = self.traj[0]
+        store.snapshots.save(snap)
+
+        statics = store.stores[
+            store.snapshots.store_snapshot_list[0].prefix + 'statics']
+        n_statics = len(statics)
+
+        # a new container with the same coordinates is not stored again
+        same = snap.copy_with_replacement(coordinates=snap.coordinates)
+        assert(same.statics is not snap.statics)
+        store.snapshots.save(same)
+        assert_equal(len(statics), n_statics)
+        assert_equal(len(store.snapshots), 4)
+
+        statics.deduplicate = False
+        other = snap.copy_with_replacement(coordinates=snap.coordinates)
+        store.snapshots.save(other)
+        assert_equal(len(statics), n_statics + 1)
+        store.close()
+
+        store = Storage(filename=self.filename, mode='r')
+        compare_snapshot(store.snapshots[same.__uuid__], same, True)
+        store.close()
+
+    def test_binary_serialization(self):
+        binary = ObjectBinary(ObjectJSON())
+        data = {
+            'int': 1,
+            'long': 2 ** 70,
+            'inf': float('inf'),
+            'bool': True,
+            'none': None,
+            'unicode': u'\xe9',
+            'list': ['a', 'a', (1, 2.5)],
+            'tuple_key': {(1, 2): 'b'},
+            'array': np.arange(6, dtype=np.float32).reshape(2, 3),
+            'scalar': np.float64(0.5),
+            'quantity': 2.0 * u.nanometers,
+            'type': int
+        }
+        result = binary.from_binary(binary.to_binary(data))
+
+        assert_equal(sorted(result.keys()), sorted(data.keys()))
+        for key in ['int', 'long', 'inf', 'bool', 'none', 'unicode',
+                    'list', 'tuple_key', 'scalar', 'quantity', 'type']:
+            assert_equal(result[key], data[key])
+
+        assert_equal(result['array'].dtype, np.float32)
+        np.testing.assert_array_equal(result['array'], data['array'])
+
+        store = Storage(filename=self.filename, mode='w')
+        assert_equal(store.details.json, 'binobj')
+        details = paths.MoveDetails(
+            probability=np.float64(0.25),
+            values=np.arange(3),
+            snapshot=self.template_snapshot)
+        store.details.save(details)
+        store.close()
+
+        store = Storage(filename=self.filename, mode='r')
+        loaded = store.details[0]
+        assert_equal(loaded.probability, 0.25)
+        np.testing.assert_array_equal(loaded.values, np.arange(3))
+        compare_snapshot(loaded.snapshot, self.template_snapshot)
+        store.close()
+
+    def test_lazy_open(self):
+        store = Storage(filename=self.filename, mode='w')
+        store.trajectories.save(self.traj)
+        store.close()
+
+        store = Storage(filename=self.filename, mode='r', lazy=True)
+        assert('trajectories' in store._lazy_stores)
+        assert('trajectories_snapshots' not in store.vars)
+
+        loaded = store.trajectories[0]
+        assert('trajectories' not in store._lazy_stores)
+        assert(not store.trajectories._restore_pending)
+        for snap, loaded_snap in zip(self.traj, loaded):
+            compare_snapshot(loaded_snap, snap, True)
+
+        # stores reached without attribute access restore on first use
+        assert(not store.objects['snapshots']._restore_pending)
+        assert(store.objects['samples']._restore_pending)
+        store.close()
+
+        store = Storage(
+            filename=self.filename, mode='r', stores=['trajectories'])
+        assert('trajectories' not in store._lazy_stores)
+        assert(store.trajectories.index[self.traj.__uuid__] == 0)
+        assert('samples' in store._lazy_stores)
+        assert_equal(len(store.samples), 0)
+        store.close()
+
+    def test_uuid_index(self):
+        store = Storage(filename=self.filename, mode='w')
+        store.trajectories.save(self.traj)
+        store.close()
+
+        store = Storage(filename=self.filename, mode='a')
+        assert(store.snapshots.index._base is not None)
+        assert(self.traj[3].__uuid__ in store.snapshots.index)
+        assert(self.traj[3].reversed.__uuid__ in store.snapshots.index)
+        assert_equal(store.snapshots.index[self.traj[3].reversed.__uuid__],
+                     store.snapshots.index[self.traj[3].__uuid__] ^ 1)
+        assert_equal(store.snapshots.index.index(
+            store.snapshots.index[self.traj[3].__uuid__]),
+            self.traj[3].__uuid__)
+
+        filenames = store.export_uuid_index()
+        assert(store.snapshots.uuid_index_filename in filenames)
+
+        # objects stored after the export are read from the file
+        reversed_traj = self.traj.reversed
+        store.trajectories.save(reversed_traj)
+        store.close()
+
+        store = Storage(filename=self.filename, mode='r')
+        index = store.trajectories.index
+        assert_equal(len(index), 2)
+        assert_equal(index[reversed_traj.__uuid__], 1)
+        assert_equal(index.list, [self.traj.__uuid__, reversed_traj.__uuid__])
+        compare_snapshot(
+            store.snapshots[self.traj[2].__uuid__], self.traj[2], True)
+        assert_equal(len(list(store.trajectories)), 2)
+        store.close()
+
+        for filename in filenames:
+            os.remove(filename)
+
+    def test_snapshot_index(self):
+        store = Storage(filename=self.filename, mode='w')
+        store.trajectories.save(self.traj)
+        assert_equal(store.trajectories.trajectory_indices(self.traj[0]), [0])
+
+        # the index is updated on save once it is built
+        sub_traj = paths.Trajectory(self.traj[1:3])
+        store.trajectories.save(sub_traj)
+        assert_equal(store.trajectories.trajectory_indices(self.traj[1]),
+                     [0, 1])
+        assert_equal(store.trajectories.trajectory_indices(self.traj[0]), [0])
+        assert_equal(
+            store.trajectories.correlated_indices(
+                paths.Trajectory([self.traj[2]])),
+            [0, 1])
+        store.close()
+
+        # and rebuilt when a file is opened again
+        store = Storage(filename=self.filename, mode='r')
+        assert_equal(store.trajectories.trajectory_indices(self.traj[2]),
+                     [0, 1])
+        assert_equal(
+            store.trajectories.trajectory_indices(self.traj[2].reversed),
+            [])
+        assert_equal(
+            store.trajectories.trajectory_indices(
+                self.traj[2].reversed, time_reversal=True),
+            [0, 1])
+        assert_equal(
+            len(store.trajectories.trajectories_containing(self.traj[4])), 1)
+
+        # reading the references in blocks gives the same index
+        full_index = store.trajectories.snapshot_index
+        store.trajectories.snapshot_index_block_size = 1
+        store.trajectories.build_snapshot_index()
+        assert_equal(store.trajectories.snapshot_index, full_index)
+        store.close()
+
+    def test_layout(self):
+        store = Storage(filename=self.filename, mode='w', layout='compact')
+        assert(store.layout == 'compact')
+        store.trajectories.save(self.traj)
+
+        snapshot_store = store.snapshots.store_snapshot_list[0]
+        statics = store.stores[snapshot_store.prefix + 'statics']
+        variable = store.variables[statics.prefix + '_coordinates']
+        assert(variable.filters()['zlib'])
+        assert(variable.filters()['shuffle'])
+        assert(variable.least_significant_digit == 4)
+        assert(variable.layout == 'compact')
+        assert(variable.chunking()[1:] == list(variable.shape[1:]))
+        store.close()
+
+        store = Storage(filename=self.filename, mode='a', layout='default')
+        assert(store.layout == 'compact')
+        statics = store.stores[snapshot_store.prefix + 'statics']
+        np.testing.assert_array_almost_equal(
+            statics.coordinates_as_numpy()[0],
+            np.asarray(self.traj[0].coordinates._value), decimal=4)
+        store.close()
+
+        assert_raises(
+            ValueError, Storage,
+            filename=self.filename, mode='w', layout='unknown')
+
     def test_version(self):
         store = Storage(
             filename=self.filename, mode='w')
@@ -146,6 +146,16 @@ class testCVRangeVolume(object):
         assert_equal((volA2 - volA),
                      volume.RelativeComplementVolume(volA2, volA))
 
+    def test_evaluate(self):
+        values = [-0.8, -0.5, -0.3, 0.0, 0.25, 0.4, 0.5, 0.6, 0.75, 1.0]
+        volumes = [volA, ~volA, volA & volA2, volA | volB, volA ^ volA2,
+                   volA2 - volA, volD - volA, volume.EmptyVolume(),
+                   volume.FullVolume()]
+        for vol in volumes:
+            assert_equal(vol.evaluate(values).tolist(),
+                         [vol(val) for val in values])
+        assert_equal(volA.evaluate([]).tolist(), [])
+
     def test_str(self):
         assert_equal(volA.__str__(), "{x|Id(x) in [-0.5, 0.5]}")
         assert_equal((~volA).__str__(), "(not {x|Id(x) in [-0.5, 0.5]})")
@@ -350,6 +360,18 @@ class testCVRangeVolumePeriodic(object):
                      volume.PeriodicCVDefinedVolume(op_id, -100, 75))
 
 
+    def test_evaluate(self):
+        values = range(-400, 400, 10)
+        volumes = [self.pvolA, self.pvolA_, self.pvolD - self.pvolA,
+                   self.pvolE - self.pvolD,
+                   volume.PeriodicCVDefinedVolume(op_id, -30, 90, -180, 180),
+                   volume.PeriodicCVDefinedVolume(op_id, 150, -150, -180,
+                                                  180)]
+        for vol in volumes:
+            assert_equal(vol.evaluate(values).tolist(),
+                         [vol(val) for val in values])
+
+
 class testVolumeFactory(object):
     def test_check_minmax(self):
         minmax1 = volume.VolumeFactory._check_minmax(0, [2, 2])
@@ -6,6 +6,7 @@ Created on 03.09.2014
 
 import range_logic
 import abc
+import numpy as np
 from openpathsampling.netcdfplus import StorableNamedObject
 
 # TODO: Make Full and Empty be Singletons to avoid storing them several times!
@@ -32,6 +33,14 @@ def join_volumes(volume_list):
     return volume
 
 
+def _as_snapshots(trajectory):
+    # keep lazy proxies: volumes and CVs can handle them
+    try:
+        return trajectory.as_proxies()
+    except AttributeError:
+        return list(trajectory)
+
+
 class Volume(StorableNamedObject):
     """
     A Volume describes a set of snapshots 
@@ -49,7 +58,27 @@ class Volume(StorableNamedObject):
         '''
         
         return False # pragma: no cover
-                
+
+    def evaluate(self, trajectory):
+        """
+        Test all snapshots of a trajectory at once
+
+        Subclasses can override this to use the list evaluation of their
+        collective variables and numpy instead of one call per snapshot.
+
+        Parameters
+        ----------
+        trajectory : :class:`openpathsampling.Trajectory` or list of snapshots
+            the snapshots to be tested
+
+        Returns
+        -------
+        numpy.ndarray, dtype=bool
+            `True` for each snapshot that is in the volume
+        """
+        return np.array([bool(self(snap))
+                         for snap in _as_snapshots(trajectory)], dtype=bool)
+
     def __str__(self):
         '''
         Returns a string representation of the volume
@@ -110,6 +139,10 @@ class VolumeCombination(Volume):
     This should be treated as an abstract class. For storage purposes, use
     specific subclasses in practice.
     """
+
+    # elementwise numpy version of fnc, used by evaluate
+    _np_fnc = None
+
     def __init__(self, volume1, volume2, fnc, str_fnc):
         super(VolumeCombination, self).__init__()
         self.volume1 = volume1
@@ -129,6 +162,22 @@ class VolumeCombination(Volume):
             return self.fnc(a, b)
         #return self.fnc(self.volume1.__call__(snapshot),
                         #self.volume2.__call__(snapshot))
+
+    def evaluate(self, trajectory):
+        if self._np_fnc is None:
+            return super(VolumeCombination, self).evaluate(trajectory)
+
+        snapshots = _as_snapshots(trajectory)
+        a = self.volume1.evaluate(snapshots)
+        # short circuit: only evaluate volume2 where the result depends on
+        # it
+        res_true = self._np_fnc(a, True)
+        needed = np.flatnonzero(res_true != self._np_fnc(a, False))
+        result = res_true
+        if len(needed) > 0:
+            b = self.volume2.evaluate([snapshots[i] for i in needed])
+            result[needed] = self._np_fnc(a[needed], b)
+        return result
     
     def __str__(self):
         return '(' + self.sfnc.format(str(self.volume1), str(self.volume2)) + ')'
@@ -139,24 +188,32 @@ class VolumeCombination(Volume):
 
 class UnionVolume(VolumeCombination):
     """ "Or" combination (union) of two volumes."""
+    _np_fnc = staticmethod(np.logical_or)
+
     def __init__(self, volume1, volume2):
         super(UnionVolume, self).__init__(volume1, volume2, lambda a,b : a or b, str_fnc = '{0} or {1}')
 
 
 class IntersectionVolume(VolumeCombination):
     """ "And" combination (intersection) of two volumes."""
+    _np_fnc = staticmethod(np.logical_and)
+
     def __init__(self, volume1, volume2):
         super(IntersectionVolume, self).__init__(volume1, volume2, lambda a,b : a and b, str_fnc = '{0} and {1}')
 
 
 class SymmetricDifferenceVolume(VolumeCombination):
     """ "Xor" combination of two volumes."""
+    _np_fnc = staticmethod(np.logical_xor)
+
     def __init__(self, volume1, volume2):
         super(SymmetricDifferenceVolume, self).__init__(volume1, volume2, lambda a,b : a ^ b, str_fnc = '{0} xor {1}')
 
 
 class RelativeComplementVolume(VolumeCombination):
     """ "Subtraction" combination (relative complement) of two volumes."""
+    _np_fnc = staticmethod(lambda a, b: np.logical_and(a, np.logical_not(b)))
+
     def __init__(self, volume1, volume2):
         super(RelativeComplementVolume, self).__init__(volume1, volume2, lambda a,b : a and not b, str_fnc = '{0} and not {1}')
 
@@ -169,6 +226,9 @@ class NegatedVolume(Volume):
 
     def __call__(self, snapshot):
         return not self.volume(snapshot)
+
+    def evaluate(self, trajectory):
+        return np.logical_not(self.volume.evaluate(trajectory))
     
     def __str__(self):
         return '(not ' + str(self.volume) + ')'
@@ -182,6 +242,9 @@ class EmptyVolume(Volume):
     def __call__(self, snapshot):
         return False
 
+    def evaluate(self, trajectory):
+        return np.zeros(len(trajectory), dtype=bool)
+
     def __and__(self, other):
         return self
 
@@ -209,6 +272,9 @@ class FullVolume(Volume):
     def __call__(self, snapshot):
         return True
 
+    def evaluate(self, trajectory):
+        return np.ones(len(trajectory), dtype=bool)
+
     def __invert__(self):
         return EmptyVolume()
 
@@ -379,6 +445,32 @@ class CVDefinedVolume(Volume):
 
         return True
 
+    def _cv_values(self, snapshots):
+        """Values of the collective variable as a float array.
+
+        Uses a single call of the collective variable for all snapshots.
+        """
+        values = self.collectivevariable(snapshots)
+        try:
+            return np.asarray(values, dtype=float).reshape(len(snapshots))
+        except (TypeError, ValueError):
+            # e.g. values with units
+            return np.array([value.__float__() for value in values])
+
+    def evaluate(self, trajectory):
+        if len(trajectory) == 0:
+            return np.zeros(0, dtype=bool)
+        l = self._cv_values(_as_snapshots(trajectory))
+        # same tests as in __call__
+        result = np.ones(len(l), dtype=bool)
+        if self.lambda_min != float('-inf'):
+            result &= ~(self.lambda_min > l)
+
+        if self.lambda_min != float('inf'):
+            result &= ~(self.lambda_max < l)
+
+        return result
+
     def __str__(self):
         return '{{x|{2}(x) in [{0}, {1}]}}'.format(
             self.lambda_min, self.lambda_max, self.collectivevariable.name)
@@ -478,6 +570,32 @@ class PeriodicCVDefinedVolume(CVDefinedVolume):
         else:
             return self.lambda_min <= l <= self.lambda_max
 
+    def _np_wrap(self, values):
+        """Version of `do_wrap` for an array of values."""
+        val = values - self._period_shift
+        positive = val > 0
+        # int() in do_wrap truncates positive numbers, like floor
+        wrapped = np.where(
+            positive,
+            values - np.floor(val / self._period_len) * self._period_len,
+            values + np.floor((self._period_len - val) / self._period_len)
+            * self._period_len
+        )
+        too_large = np.logical_and(~positive, wrapped >= self._period_len)
+        wrapped[too_large] -= self._period_len
+        return wrapped
+
+    def evaluate(self, trajectory):
+        if len(trajectory) == 0:
+            return np.zeros(0, dtype=bool)
+        l = self._cv_values(_as_snapshots(trajectory))
+        if self.wrap:
+            l = self._np_wrap(l)
+        if self.lambda_min > self.lambda_max:
+            return np.logical_or(l >= self.lambda_min, l <= self.lambda_max)
+        else:
+            return np.logical_and(self.lambda_min <= l, l <= self.lambda_max)
+
     def __str__(self):
         if self.wrap:
             fcn = 'x|({0}(x) - {2}) % {1} + {2}'.format(